@@ -1,21 +1,76 @@
-
-
 import streamlit as st
 import os
 import tempfile
 import sys
 from dotenv import load_dotenv
 
-# Add the project root to Python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add src folder to Python path (its modules import each other by bare name)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
 try:
-    from src.main import ResumeQueryBuilder
+    from main import ResumeQueryBuilder
+    from llm_parser import UniversalCVData
+    from cache import content_hash
 except ImportError as e:
     st.error(f"Import error: {e}")
     st.info("Please check that all required files exist in the correct locations.")
     st.stop()
 
+# Progress shown after each pipeline stage completes
+STAGE_PROGRESS = {
+    'text': (0.25, "Text extracted, splitting sections..."),
+    'sections': (0.35, "Sections found, running quick parse..."),
+    'fast_parse': (0.45, "Quick parse done, asking Gemini..."),
+    'llm_chunk': (0.6, "Gemini is reading the resume..."),
+    'parsed': (0.8, "Profile extracted, building job query..."),
+    'job_query': (1.0, "Done"),
+}
+
+@st.cache_resource(show_spinner="Loading pipeline...")
+def get_pipeline(api_key: str) -> ResumeQueryBuilder:
+    """One pipeline per API key, kept across reruns and sessions"""
+    return ResumeQueryBuilder(api_key)
+
+def process_upload(uploaded_file, api_key: str) -> dict:
+    """Run the pipeline once per (upload, API key); widget reruns reuse the stored result"""
+    file_bytes = uploaded_file.getvalue()
+    key = content_hash(file_bytes, api_key)
+    results = st.session_state.setdefault('results', {})
+    if key in results:
+        return results[key]
+    
+    with tempfile.NamedTemporaryFile(delete=False, 
+                                   suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_path = tmp_file.name
+    
+    try:
+        file_type = os.path.splitext(uploaded_file.name)[1].lower()[1:]
+        processor = get_pipeline(api_key)
+        
+        progress = st.progress(0.0, text="Extracting text...")
+        result = {}
+        for event, payload in processor.process_resume_stream(tmp_path, file_type):
+            if event == 'text':
+                result.update(payload)
+            elif event == 'sections':
+                result['sections'] = payload
+            elif event in ('fast_parse', 'parsed'):
+                result['parsed_data'] = UniversalCVData(**payload)
+            elif event == 'job_query':
+                result['job_query'] = payload['job_query']
+            value, text = STAGE_PROGRESS[event]
+            progress.progress(value, text=text)
+        progress.empty()
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    
+    # Keep only the latest upload per session
+    results.clear()
+    results[key] = result
+    return result
+
 def main():
     st.set_page_config(
         page_title="Universal Resume Query Builder",
@@ -39,23 +94,14 @@ def main():
         return
     
     uploaded_file = st.file_uploader(
-        "Upload Resume (PDF, DOCX, TXT)",
-        type=['pdf', 'docx', 'txt'],
+        "Upload Resume (PDF, DOCX, DOC, ODT, RTF, HTML, TXT or image)",
+        type=['pdf', 'docx', 'doc', 'odt', 'rtf', 'html', 'htm', 'txt', 'png', 'jpg', 'jpeg', 'tif', 'tiff'],
         help="Supports resumes from any profession: engineering, finance, healthcare, management, etc."
     )
     
     if uploaded_file is not None:
-        with tempfile.NamedTemporaryFile(delete=False, 
-                                       suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_path = tmp_file.name
-        
         try:
-            file_type = os.path.splitext(uploaded_file.name)[1].lower()[1:]
-            
-            with st.spinner("Processing resume..."):
-                processor = ResumeQueryBuilder(api_key)
-                result = processor.process_resume(tmp_path, file_type)
+            result = process_upload(uploaded_file, api_key)
             
             # Display results
             col1, col2 = st.columns(2)
@@ -119,10 +165,7 @@ def main():
             import traceback
             with st.expander("Error Details"):
                 st.code(traceback.format_exc())
-        
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
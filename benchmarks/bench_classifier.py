@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for profession classification as the rule-based parser
+pays for it: the previous per-CV loop over every category's keywords, on
+top of the taxonomy keyword scan the other extractors need anyway, vs
+KeywordClassifier scoring a whole batch with one matrix product from that
+same scan.
+
+    python benchmarks/bench_classifier.py [--batch-sizes 1,100,1000,10000]
+
+Also reports how often the two disagree; they should only differ on ties,
+which the classifier breaks towards longer keyword matches.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from taxonomy import load_taxonomy
+
+FILLER = ("Responsible for delivering results across teams, reporting to leadership and "
+          "working with stakeholders on quarterly goals. ").split()
+
+
+def synthetic_cvs(taxonomy, count, seed=0):
+    rng = random.Random(seed)
+    keywords = [keyword for _, words in taxonomy.grouped['professions'] for keyword in words]
+    cvs = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(400)]
+        for _ in range(rng.randint(0, 8)):
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        cvs.append(' '.join(words).lower())
+    return cvs
+
+
+def loop_classify(taxonomy, texts):
+    """The previous _detect_profession_universal, one CV at a time"""
+    labels = []
+    for text in texts:
+        taxonomy.present(text)
+        scores = {}
+        for name, words in taxonomy.grouped['professions']:
+            hits = sum(1 for keyword in words if keyword in text)
+            if hits:
+                scores[name] = hits
+        labels.append(max(scores.items(), key=lambda x: x[1])[0] if scores else "Professional")
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', default='1,100,1000,10000')
+    args = parser.parse_args()
+
+    # Separate instances, so neither side reuses the other's keyword scans
+    taxonomy = load_taxonomy()
+    classifier = load_taxonomy().classifier('professions')
+    print(f"{len(classifier.terms)} terms x {len(classifier.labels)} professions, "
+          f"{len(taxonomy.keywords)} taxonomy keywords")
+    print(f"{'batch':>7} {'loop ms':>10} {'matrix ms':>10} {'speedup':>8} {'disagree':>9}")
+    for size in (int(value) for value in args.batch_sizes.split(',')):
+        texts = synthetic_cvs(taxonomy, size)
+
+        start = time.perf_counter()
+        looped = loop_classify(taxonomy, texts)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = classifier.classify(texts, "Professional")
+        matrix_time = time.perf_counter() - start
+
+        disagree = sum(1 for a, b in zip(looped, batched) if a != b)
+        print(f"{size:>7} {loop_time * 1000:>10.1f} {matrix_time * 1000:>10.1f} "
+              f"{loop_time / matrix_time:>7.1f}x {disagree:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+DOCX extraction benchmark: python-docx paragraphs (previous path) vs the
+streaming docx_reader.
+
+    python benchmarks/bench_docx.py [--paragraphs 2000] [--rows 300] [--repeat 5]
+
+A synthetic CV is generated with a unique marker token in every paragraph,
+table cell, header, footer and text box; completeness is the share of
+markers each path recovers.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from docx_reader import extract_docx_text
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>
+<Override PartName="/word/footer1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml"/>
+</Types>"""
+
+ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOC_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer" Target="footer1.xml"/>
+</Relationships>"""
+
+
+def _p(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def build_docx(path, paragraphs, rows):
+    """Write a synthetic DOCX and return the list of marker tokens it contains"""
+    markers = []
+    body = []
+
+    for i in range(paragraphs):
+        marker = f'para{i}marker'
+        markers.append(marker)
+        body.append(_p(f'Led a team of engineers on project {marker} delivering results'))
+
+    table = ['<w:tbl>']
+    for r in range(rows):
+        cells = []
+        for c in range(3):
+            marker = f'cell{r}x{c}marker'
+            markers.append(marker)
+            cells.append(f'<w:tc>{_p("Skill " + marker)}</w:tc>')
+        table.append(f'<w:tr>{"".join(cells)}</w:tr>')
+    table.append('</w:tbl>')
+    body.append(''.join(table))
+
+    markers.append('textboxmarker')
+    body.append(
+        f'<w:p><w:r><mc:AlternateContent><mc:Choice Requires="wps"><w:drawing>'
+        f'<w:txbxContent>{_p("Contact textboxmarker")}</w:txbxContent>'
+        f'</w:drawing></mc:Choice><mc:Fallback><w:pict>'
+        f'<w:txbxContent>{_p("Contact textboxmarker")}</w:txbxContent>'
+        f'</w:pict></mc:Fallback></mc:AlternateContent></w:r></w:p>'
+    )
+
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W}" xmlns:mc="{MC}"><w:body>{"".join(body)}'
+        f'<w:sectPr><w:headerReference w:type="default" r:id="rId1" '
+        f'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"/>'
+        f'<w:footerReference w:type="default" r:id="rId2" '
+        f'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"/>'
+        f'</w:sectPr></w:body></w:document>'
+    )
+    markers += ['headermarker', 'footermarker']
+    header = f'<w:hdr xmlns:w="{W}">{_p("Jane Doe headermarker")}</w:hdr>'
+    footer = f'<w:ftr xmlns:w="{W}">{_p("Page footermarker")}</w:ftr>'
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', ROOT_RELS)
+        archive.writestr('word/_rels/document.xml.rels', DOC_RELS)
+        archive.writestr('word/document.xml', document)
+        archive.writestr('word/header1.xml', header)
+        archive.writestr('word/footer1.xml', footer)
+    return markers
+
+
+def python_docx_path(path):
+    """The previous _parse_docx body"""
+    from docx import Document
+    doc = Document(path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+
+def measure(name, fn, path, markers, repeat):
+    try:
+        fn(path)
+    except ImportError as e:
+        print(f"{name:<14} skipped ({e})")
+        return
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = fn(path)
+    elapsed = (time.perf_counter() - start) / repeat
+    found = sum(1 for marker in markers if marker in text)
+    print(f"{name:<14} {elapsed * 1000:9.2f} ms   completeness {found}/{len(markers)} "
+          f"({found / len(markers):.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.docx')
+        markers = build_docx(path, args.paragraphs, args.rows)
+        print(f"{os.path.getsize(path) / 1024:.0f} KiB DOCX, {len(markers)} markers")
+        measure('python-docx', python_docx_path, path, markers, args.repeat)
+        measure('docx_reader', extract_docx_text, path, markers, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
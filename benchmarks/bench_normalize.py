@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for text normalization: the previous two-regex _clean_text
+vs text_normalizer.normalize_text.
+
+    python benchmarks/bench_normalize.py [--sizes 5000,50000,500000]
+
+Also reports how many technical tokens survive each, on a synthetic CV that
+mixes PDF ligatures, Unicode punctuation and bullets.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from text_normalizer import normalize_text
+
+TECHNICAL_TOKENS = ['C++', 'C#', 'F#', 'CI/CD', 'TCP/IP', 'R&D', 'A/B', '.NET', 'Node.js']
+
+CV_CHUNK = (
+    "PROFESSIONAL EXPERIENCE\r\n"
+    "• Senior Software Engineer — Acme Corp (2018 – Present)\r\n"
+    "  ▪ Built CI/CD pipelines for C++ and C# services; ran A/B tests\r\n"
+    "  ▪ Led R&D on TCP/IP stacks, .NET and Node.js tooling  ﬁnance ﬂows\r\n"
+    "\r\n"
+    "SKILLS F#, “Python”, Kubernetes | Terraform​ | Excel™\r\n\r\n"
+)
+
+
+def old_clean_text(text):
+    """The previous TextExtractor._clean_text"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?;:()\-@]', '', text)
+    return text.strip()
+
+
+def timed(fn, text, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def surviving(text):
+    return sum(1 for token in TECHNICAL_TOKENS if token in text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='5000,50000,500000')
+    args = parser.parse_args()
+
+    corpora = {
+        'pdf unicode': CV_CHUNK,
+        'plain ascii': CV_CHUNK.encode('ascii', 'ignore').decode('ascii'),
+    }
+    print(f"{'text':<13}{'chars':>9}{'old ms':>10}{'new ms':>10}{'old lines':>11}{'new lines':>11}")
+    for name, chunk in corpora.items():
+        for size in (int(size) for size in args.sizes.split(',')):
+            text = (chunk * (size // len(chunk) + 1))[:size]
+            old, new = old_clean_text(text), normalize_text(text)
+            print(f"{name:<13}{size:>9}{timed(old_clean_text, text) * 1000:>10.2f}"
+                  f"{timed(normalize_text, text) * 1000:>10.2f}"
+                  f"{old.count(chr(10)) + 1:>11}{new.count(chr(10)) + 1:>11}")
+
+    print(f"\ntechnical tokens kept ({len(TECHNICAL_TOKENS)}): "
+          f"old {surviving(old_clean_text(CV_CHUNK))}, new {surviving(normalize_text(CV_CHUNK))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+OCR throughput: the previous per-page path (pdftoppm + pytesseract, one
+tesseract process per page) vs PyMuPDF rendering + the persistent engine
+from src/ocr_engine.py at the fixed DPI, vs the adaptive path used by
+TextExtractor (DPI from a probe, binarize/deskew/crop, low-confidence retry).
+
+    python benchmarks/bench_ocr.py [--pages 10] [--dpi 300]
+
+Builds a synthetic image-only PDF so both paths must OCR every page.
+With tesserocr installed the engine keeps one initialized tesseract API per
+thread; without it the comparison still shows the cost of rasterizing
+through pdftoppm. Needs the tesseract binary (and pdftoppm for the old path).
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import fitz
+import pytesseract
+from pdf2image import convert_from_path
+from PIL import Image, ImageDraw
+
+from extract_text import TextExtractor
+from ocr_engine import get_ocr_engine
+
+LINES = [
+    "Jane Doe - Registered Nurse",
+    "Experience: 2016 - Present, St. Mary's Hospital, ICU",
+    "Skills: patient care, triage, medication administration",
+    "Education: BSc Nursing, University of Leeds",
+    "Certifications: BLS, ACLS, PALS",
+]
+
+
+def scanned_pdf(path, pages):
+    """Image-only PDF: each page is a rendered bitmap with no text layer"""
+    doc = fitz.open()
+    for number in range(pages):
+        image = Image.new('L', (1654, 2339), 255)  # A4 at 200 DPI
+        draw = ImageDraw.Draw(image)
+        for row in range(40):
+            draw.text((120, 120 + row * 52), f"{LINES[row % len(LINES)]} ({number + 1}.{row})", fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    doc.save(path)
+
+
+def cpu_seconds():
+    """CPU time of this process plus finished children (tesseract/pdftoppm subprocesses)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def old_path(path, pages, dpi):
+    texts = []
+    for index in range(pages):
+        for image in convert_from_path(path, dpi=dpi, first_page=index + 1, last_page=index + 1):
+            texts.append(pytesseract.image_to_string(image))
+    return "".join(texts)
+
+
+def new_path(path, pages, dpi):
+    extractor = TextExtractor()
+    engine = get_ocr_engine()
+    return "".join(engine.recognize(image).text
+                   for index in range(pages)
+                   for image in extractor._render_pdf_page(path, index, dpi))
+
+
+def adaptive_path(path, pages, dpi):
+    extractor = TextExtractor()
+    engine = get_ocr_engine()
+    sizes = extractor._pdf_page_sizes(path)
+    deadline = time.monotonic() + 600
+    return "".join(extractor._ocr_pdf_page(path, index, sizes[index], engine, deadline)
+                   for index in range(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--dpi', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scanned.pdf')
+        scanned_pdf(path, args.pages)
+        print(f"engine: {get_ocr_engine().name}, {args.pages} pages at {args.dpi} DPI")
+        paths = (('pdftoppm + pytesseract', old_path), ('pymupdf + engine', new_path), ('adaptive', adaptive_path))
+        for name, fn in paths:
+            start, cpu_start = time.perf_counter(), cpu_seconds()
+            text = fn(path, args.pages, args.dpi)
+            elapsed = time.perf_counter() - start
+            cpu = cpu_seconds() - cpu_start
+            print(f"{name:<24}{elapsed:>8.2f} s{elapsed / args.pages * 1000:>10.0f} ms/page"
+                  f"{cpu / args.pages * 1000:>10.0f} cpu ms/page{len(text):>9} chars")
+
+
+if __name__ == '__main__':
+    main()
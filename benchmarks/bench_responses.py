@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for /analyze_resume/ response serialization: the previous
+FastAPI path (jsonable_encoder + JSONResponse) vs FastJSONResponse for the
+full, compact and projected responses.
+
+    python benchmarks/bench_responses.py [--repeat 2000]
+
+Reports serialization time per response and bytes on the wire, raw and
+gzipped, for a richly populated profile.
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api_response import COMPACT, FULL, FastJSONResponse, orjson, parse_fields, shape
+from extract_text import ExtractionResult
+from llm_parser import UniversalCVData
+
+
+def sample_payload():
+    cv_data = UniversalCVData(
+        profession_field="Software Engineering",
+        experience_years=9.5,
+        education=[{"degree": "Master's", "field": "Computer Science", "institution": f"University {i}"}
+                   for i in range(3)],
+        skills=[f"Skill number {i}" for i in range(15)],
+        job_titles=["Senior Software Engineer", "Backend Engineer", "Software Developer"],
+        industries=["Technology", "Finance"],
+        technical_skills=["Python", "Go", "PostgreSQL", "Kubernetes", "Terraform", "Kafka"],
+        soft_skills=["Leadership", "Mentoring", "Communication"],
+        tools_technologies=["Jira", "Slack", "Figma"],
+        certifications=["AWS Certified Solutions Architect"],
+        languages=["English", "Spanish"],
+        key_achievements=[f"Reduced p99 latency of service {i} by 40% through caching and batching" for i in range(5)],
+        education_level="Master's",
+        summary="Backend engineer with nine years building high-throughput Python and Go services. " * 3,
+    )
+    extraction = ExtractionResult(format='pdf', pages_total=2, pages_processed=2)
+    return {
+        "status": "success",
+        "parsed_data": cv_data.dict(),
+        "job_query": "Senior Backend Engineer Python Go Kubernetes",
+        "extraction": extraction.dict(exclude={'text'}),
+    }
+
+
+def timed(render, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = render()
+    return (time.perf_counter() - start) / repeat, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = sample_payload()
+    paths = parse_fields("job_query,parsed_data.profession_field,parsed_data.technical_skills")
+    cases = [
+        ('previous: jsonable_encoder + JSONResponse', lambda: JSONResponse(jsonable_encoder(payload)).body),
+        ('FastJSONResponse full', lambda: FastJSONResponse(shape(payload, None, FULL)).body),
+        ('FastJSONResponse compact', lambda: FastJSONResponse(shape(payload, None, COMPACT)).body),
+        ('FastJSONResponse fields=3 paths', lambda: FastJSONResponse(shape(payload, paths, FULL)).body),
+    ]
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'response':<44} {'us/resp':>8} {'bytes':>7} {'gzipped':>8}")
+    for name, render in cases:
+        seconds, body = timed(render, args.repeat)
+        print(f"{name:<44} {seconds * 1e6:>8.1f} {len(body):>7} {len(gzip.compress(body)):>8}")
+
+
+if __name__ == '__main__':
+    main()
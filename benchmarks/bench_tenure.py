@@ -0,0 +1,83 @@
+"""
+Worst-case benchmark for experience extraction: the previous regex patterns
+vs the tokenizer-based TenureEngine.
+
+    python benchmarks/bench_tenure.py [--sizes 5000,10000,20000,40000]
+
+_clean_text flattens a CV onto one line, so a lazy `experience.*?(\\d+)`
+retries from every "experience" across the whole document, and a greedy
+`(\\d+)\\s*years?.*experience` scans to the end from every year mention.
+The adversarial inputs below trigger both; the old timings grow
+quadratically while TenureEngine stays linear.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tenure import TenureEngine
+
+OLD_PATTERNS = [
+    r'(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*yrs?',
+    r'experience.*?(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*years?.*experience',
+]
+OLD_DATE_PATTERN = r'(\d{4})\s*[-–]\s*(\d{4}|present|current|now)'
+
+
+def old_extract(text_lower):
+    """The previous _extract_experience_universal"""
+    max_years = 0
+    for pattern in OLD_PATTERNS:
+        for match in re.findall(pattern, text_lower):
+            max_years = max(max_years, float(match))
+    total_years = 0
+    for start, end in re.findall(OLD_DATE_PATTERN, text_lower):
+        end_year = 2024 if end in ['present', 'current', 'now'] else int(end)
+        total_years += end_year - int(start)
+    return max(max_years, total_years)
+
+
+def adversarial_inputs(size):
+    """Inputs that maximise backtracking for the old patterns"""
+    unit_a = "experience with 12 34 56 78 "           # many digits, never followed by "years"
+    unit_b = "3 years 4 years 5 years "                 # many mentions, "experience" never follows
+    unit_c = "2019 - 2021 2018 - 2020 2017 - present "  # many overlapping ranges
+    return {
+        'lazy experience.*?N': (unit_a * (size // len(unit_a) + 1))[:size],
+        'greedy N years.*exp': (unit_b * (size // len(unit_b) + 1))[:size],
+        'overlapping ranges': (unit_c * (size // len(unit_c) + 1))[:size],
+    }
+
+
+def timed(fn, text, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='5000,10000,20000,40000')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    engine = TenureEngine()
+
+    print(f"{'input':<22}{'chars':>8}{'old ms':>12}{'new ms':>10}{'old yrs':>9}{'new yrs':>9}")
+    for size in sizes:
+        for name, text in adversarial_inputs(size).items():
+            old_ms = timed(old_extract, text) * 1000
+            new_ms = timed(engine.extract_years, text) * 1000
+            print(f"{name:<22}{size:>8}{old_ms:>12.2f}{new_ms:>10.2f}"
+                  f"{old_extract(text):>9.1f}{engine.extract_years(text):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
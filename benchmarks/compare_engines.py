@@ -0,0 +1,282 @@
+"""
+Engine comparison harness: runs every parsing engine over a labeled local
+corpus and reports, per engine, latency and LLM cost per CV, accuracy
+against the labels and agreement with a reference engine, overall and
+per field.
+
+    python benchmarks/compare_engines.py CORPUS_DIR [--engines rules,pipeline,llm:gemini-2.5-flash]
+                                         [--reference rules] [--json out.json]
+
+CORPUS_DIR holds the CV files plus a labels.jsonl with one line per CV:
+
+    {"file": "alice.pdf", "labels": {"profession_field": "Nursing", "experience_years": 7,
+                                     "skills": ["Triage", "Patient care"]}}
+
+Only labeled fields are scored, so labels can be partial. Without
+labels.jsonl every file in the directory is parsed and only agreement is
+reported.
+
+Engines:
+  rules          UniversalParser._truly_universal_parse
+  llm:<model>    UniversalParser._parse_with_llm pinned to one model (raw LLM output)
+  pipeline       UniversalParser.parse_cv as deployed: policy, routing, merge with rules
+New fast paths are compared by adding a factory to ENGINES.
+
+Extraction runs once per CV and is not part of the engine timings. LLM
+responses are not cached, so every engine pays for its own calls; cost
+uses the usage ledger's price table (CV_MODEL_PRICES overrides it).
+CV_LLM_STUB=1 exercises the LLM engines without quota.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from extract_text import TextExtractor
+from llm_parser import UniversalCVData, UniversalParser
+from metrics import METRICS
+from model_router import DEFAULT_TIER_MODELS, TIERS
+from section_splitter import UniversalSectionSplitter
+from usage import cost_usd, price_table
+
+# Years of experience within this many years of the label count as correct
+EXPERIENCE_TOLERANCE = 1.0
+
+
+def _rules_engine(api_key: str):
+    parser = UniversalParser(api_key=None)
+    parser.router = None
+    return parser, lambda document: parser._truly_universal_parse(document['text'])
+
+
+def _pipeline_engine(api_key: str):
+    parser = UniversalParser(api_key)
+    return parser, lambda document: parser.parse_cv(document['text'], document['sections'], document['ocr_used'])
+
+
+def _model_engine(model: str) -> Callable:
+    def factory(api_key: str):
+        parser = UniversalParser(api_key)
+        # Every tier is the same model, so validation retries stay on it
+        parser.router.tier_models = {tier: model for tier in TIERS}
+        return parser, lambda document: parser._parse_with_llm(document['text'], TIERS[0])
+    return factory
+
+
+# Engine name -> factory(api_key) returning (parser, run); run(document) -> UniversalCVData
+ENGINES: Dict[str, Callable] = {
+    'rules': _rules_engine,
+    'pipeline': _pipeline_engine,
+}
+for _model in dict.fromkeys(os.getenv(f'CV_MODEL_{tier.upper()}', model) for tier, model in DEFAULT_TIER_MODELS.items()):
+    ENGINES[f'llm:{_model}'] = _model_engine(_model)
+
+
+def _normalize(value) -> str:
+    return re.sub(r'[^\w+#.]+', ' ', str(value or '').lower()).strip()
+
+
+def _f1(expected: set, actual: set) -> float:
+    if not expected and not actual:
+        return 1.0
+    if not expected or not actual:
+        return 0.0
+    overlap = len(expected & actual)
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(actual), overlap / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _education_items(entries) -> set:
+    items = set()
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            items.update(_normalize(entry.get(key)) for key in ('degree', 'field'))
+    return items - {'', 'unknown'}
+
+
+def field_score(field: str, expected, actual) -> float:
+    """0-1 match of one field: tolerance for years, set F1 for lists, token F1 for the summary, else exact"""
+    if field == 'experience_years':
+        return float(abs(float(expected or 0) - float(actual or 0)) <= EXPERIENCE_TOLERANCE)
+    if field == 'education':
+        return _f1(_education_items(expected), _education_items(actual))
+    if field == 'summary':
+        return _f1(set(_normalize(expected).split()), set(_normalize(actual).split()))
+    if isinstance(expected, list) or isinstance(actual, list):
+        return _f1({_normalize(item) for item in expected or []} - {''},
+                   {_normalize(item) for item in actual or []} - {''})
+    return float(_normalize(expected) == _normalize(actual))
+
+
+def load_corpus(corpus_dir: str) -> List[dict]:
+    labels_path = os.path.join(corpus_dir, 'labels.jsonl')
+    if os.path.exists(labels_path):
+        with open(labels_path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    else:
+        entries = [{'file': name, 'labels': {}} for name in sorted(os.listdir(corpus_dir))
+                   if os.path.isfile(os.path.join(corpus_dir, name))]
+
+    unknown = {field for entry in entries for field in entry.get('labels', {})} - set(UniversalCVData.__fields__)
+    if unknown:
+        raise ValueError(f"Unknown label fields: {', '.join(sorted(unknown))}")
+
+    extractor, splitter = TextExtractor(), UniversalSectionSplitter()
+    documents = []
+    for entry in entries:
+        path = os.path.join(corpus_dir, entry['file'])
+        start = time.perf_counter()
+        extraction = extractor.extract(path, os.path.splitext(path)[1].lower()[1:])
+        documents.append({
+            'file': entry['file'],
+            'labels': entry.get('labels', {}),
+            'text': extraction.text,
+            'sections': splitter.split_into_sections(extraction.text),
+            'ocr_used': extraction.ocr_used,
+            'extraction_seconds': time.perf_counter() - start,
+        })
+    return documents
+
+
+def _tokens_by_tier() -> Dict[str, tuple]:
+    return {tier: (METRICS.counter('llm_tokens', tier=tier, kind='prompt'),
+                   METRICS.counter('llm_tokens', tier=tier, kind='response')) for tier in TIERS}
+
+
+def run_engine(name: str, parser: UniversalParser, run: Callable, documents: List[dict], prices: dict) -> List[dict]:
+    """Parse every document; one record per CV with output, latency, tokens, cost and error"""
+    records = []
+    for document in documents:
+        before = _tokens_by_tier()
+        start = time.perf_counter()
+        output, error = None, None
+        try:
+            output = run(document).dict()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+
+        tokens, cost = 0, 0.0
+        for tier, (prompt_after, response_after) in _tokens_by_tier().items():
+            prompt_tokens = int(prompt_after - before[tier][0])
+            response_tokens = int(response_after - before[tier][1])
+            tokens += prompt_tokens + response_tokens
+            if parser.router is not None:
+                cost += cost_usd(prices, parser.router.tier_models[tier], prompt_tokens, response_tokens)
+        records.append({'engine': name, 'file': document['file'], 'seconds': seconds, 'tokens': tokens,
+                        'cost_usd': cost, 'error': error, 'output': output})
+    return records
+
+
+def _mean(values: List[float]):
+    return sum(values) / len(values) if values else None
+
+
+def score(records: Dict[str, List[dict]], documents: List[dict], reference: str) -> Dict[str, dict]:
+    """Per engine: per-field accuracy against labels and agreement with the reference engine"""
+    summary = {}
+    for name, engine_records in records.items():
+        accuracy, agreement = {}, {}
+        for index, (record, document) in enumerate(zip(engine_records, documents)):
+            output = record['output'] or {}
+            for field, expected in document['labels'].items():
+                accuracy.setdefault(field, []).append(field_score(field, expected, output.get(field)))
+            reference_output = records[reference][index]['output'] if reference in records else None
+            if reference_output is not None and record['output'] is not None:
+                for field in UniversalCVData.__fields__:
+                    agreement.setdefault(field, []).append(
+                        field_score(field, reference_output.get(field), output.get(field)))
+
+        seconds = sorted(record['seconds'] for record in engine_records)
+        field_accuracy = {field: _mean(values) for field, values in accuracy.items()}
+        field_agreement = {field: _mean(values) for field, values in agreement.items()}
+        summary[name] = {
+            'cvs': len(engine_records),
+            'errors': sum(1 for record in engine_records if record['error']),
+            'mean_seconds': _mean(seconds),
+            'p95_seconds': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] if seconds else None,
+            'tokens_per_cv': _mean([record['tokens'] for record in engine_records]),
+            'cost_per_cv_usd': _mean([record['cost_usd'] for record in engine_records]),
+            'accuracy': _mean(list(field_accuracy.values())),
+            'agreement': _mean(list(field_agreement.values())),
+            'field_accuracy': field_accuracy,
+            'field_agreement': field_agreement,
+        }
+    return summary
+
+
+def _cell(value, pattern='{:.2f}') -> str:
+    return '-' if value is None else pattern.format(value)
+
+
+def print_report(summary: Dict[str, dict], reference: str):
+    print(f"{'engine':<28} {'CVs':>4} {'errors':>6} {'mean ms':>8} {'p95 ms':>8} {'tokens/CV':>9} "
+          f"{'$/CV':>9} {'accuracy':>8} {'agree':>6}")
+    for name, stats in summary.items():
+        print(f"{name:<28} {stats['cvs']:>4} {stats['errors']:>6} "
+              f"{_cell(stats['mean_seconds'] and stats['mean_seconds'] * 1000, '{:.1f}'):>8} "
+              f"{_cell(stats['p95_seconds'] and stats['p95_seconds'] * 1000, '{:.1f}'):>8} "
+              f"{_cell(stats['tokens_per_cv'], '{:.0f}'):>9} {_cell(stats['cost_per_cv_usd'], '{:.5f}'):>9} "
+              f"{_cell(stats['accuracy']):>8} {_cell(stats['agreement']):>6}")
+
+    fields = [field for field in UniversalCVData.__fields__
+              if any(field in stats['field_accuracy'] or field in stats['field_agreement'] for stats in summary.values())]
+    print(f"\nPer field: accuracy against labels / agreement with {reference}")
+    width = max(13, *(len(name) for name in summary))
+    print(f"{'field':<20} " + " ".join(f"{name:>{width}}" for name in summary))
+    for field in fields:
+        cells = [f"{_cell(stats['field_accuracy'].get(field))} / {_cell(stats['field_agreement'].get(field))}"
+                 for stats in summary.values()]
+        print(f"{field:<20} " + " ".join(f"{cell:>{width}}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', help="directory with CV files and labels.jsonl")
+    parser.add_argument('--engines', default=None, help="comma-separated engines (default: all available)")
+    parser.add_argument('--reference', default='rules', help="engine the others' agreement is measured against")
+    parser.add_argument('--json', default=None, help="write the summary and per-CV records to this file")
+    args = parser.parse_args()
+
+    api_key = os.getenv('GOOGLE_API_KEY') or ('stub' if os.getenv('CV_LLM_STUB') == '1' else None)
+    if args.engines:
+        names = [name.strip() for name in args.engines.split(',') if name.strip()]
+    else:
+        names = [name for name in ENGINES if api_key or name == 'rules']
+    unknown = [name for name in names if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)} (available: {', '.join(ENGINES)})")
+    if not api_key and any(name != 'rules' for name in names):
+        parser.error("LLM engines need GOOGLE_API_KEY (or CV_LLM_STUB=1)")
+
+    documents = load_corpus(args.corpus)
+    print(f"{len(documents)} CVs, {sum(1 for document in documents if document['labels'])} labeled; "
+          f"extraction {sum(document['extraction_seconds'] for document in documents):.1f}s (not in engine timings)\n")
+
+    # Load the taxonomy and build its classifiers before anything is timed
+    if documents:
+        UniversalParser(api_key=None)._truly_universal_parse(documents[0]['text'])
+
+    prices = price_table()
+    records = {}
+    for name in names:
+        records[name] = run_engine(name, *ENGINES[name](api_key), documents, prices)
+
+    summary = score(records, documents, args.reference)
+    print_report(summary, args.reference)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': summary, 'records': records}, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
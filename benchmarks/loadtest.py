@@ -0,0 +1,300 @@
+"""
+End-to-end HTTP load test for mainapi.py with a stubbed LLM.
+
+    python benchmarks/loadtest.py --workers 2 --rate 4 --duration 60 \\
+        --mix pdf=4,scanned=1,docx=3,txt=2 --llm-latency 0.8 --llm-error-rate 0.02
+
+Starts gunicorn (see gunicorn.conf.py) with CV_LLM_STUB=1 so every Gemini
+call is answered locally after the given latency, then sends uploads to
+/analyze_resume/ open-loop at --rate requests per second for --duration
+seconds. Pass --url to target an already running server instead; server
+RSS/CPU is then sampled from --server-pid if given.
+
+Reports achieved throughput, latency percentiles, errors by kind, and the
+server's total RSS and CPU (master plus workers, read from /proc). Stub LLM
+errors fall back to the rule-based parser, so they show up as latency and in
+the server's GET /metrics rather than as failed requests. Run it
+for increasing --rate at each --workers count to find saturation points.
+Needs httpx; scanned uploads also need the tesseract binary on the server.
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import subprocess
+import sys
+import time
+
+import fitz
+import httpx
+from docx import Document
+from PIL import Image, ImageDraw
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CV_LINES = [
+    "Jane Doe",
+    "Senior Software Engineer",
+    "EXPERIENCE",
+    "Acme Corp, Backend Engineer, 2018 - Present",
+    "Built CI/CD pipelines and Python services handling 2M requests a day",
+    "Globex, Software Developer, 2015 - 2018",
+    "EDUCATION",
+    "BSc Computer Science, State University, 2015",
+    "SKILLS",
+    "Python, SQL, Docker, Kubernetes, leadership, communication",
+]
+
+
+def make_txt():
+    return "\n".join(CV_LINES).encode()
+
+
+def make_pdf():
+    doc = fitz.open()
+    page = doc.new_page()
+    for row, line in enumerate(CV_LINES * 3):
+        page.insert_text((72, 72 + row * 16), line, fontsize=11)
+    return doc.tobytes()
+
+
+def make_scanned_pdf():
+    """Image-only page, so the server has to OCR it"""
+    image = Image.new('L', (1654, 2339), 255)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(CV_LINES * 3):
+        draw.text((120, 120 + row * 48), line, fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+    return doc.tobytes()
+
+
+def make_docx():
+    document = Document()
+    for line in CV_LINES * 3:
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+UPLOADS = {
+    'pdf': ('cv.pdf', make_pdf),
+    'scanned': ('scan.pdf', make_scanned_pdf),
+    'docx': ('cv.docx', make_docx),
+    'txt': ('cv.txt', make_txt),
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, weight = part.split('=')
+        if kind not in UPLOADS:
+            raise SystemExit(f"Unknown upload kind {kind!r}; choose from {', '.join(UPLOADS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def process_tree(root_pid):
+    """root_pid and all its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after the last ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def read_usage(pids):
+    """(total RSS in MB, total CPU seconds) for the given processes"""
+    rss_kb, ticks = 0, 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss_kb += int(line.split()[1])
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+                ticks += int(fields[11]) + int(fields[12])  # utime + stime
+        except OSError:
+            continue
+    return rss_kb / 1024, ticks / os.sysconf('SC_CLK_TCK')
+
+
+class ResourceSampler:
+    """Samples server RSS and CPU every interval while the load runs"""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.rss = []
+        self.cpu_percent = []
+
+    async def run(self, stop: asyncio.Event):
+        last_cpu, last_time = read_usage(process_tree(self.root_pid))[1], time.monotonic()
+        while not stop.is_set():
+            await asyncio.sleep(self.interval)
+            rss, cpu = read_usage(process_tree(self.root_pid))
+            now = time.monotonic()
+            self.rss.append(rss)
+            self.cpu_percent.append((cpu - last_cpu) / (now - last_time) * 100)
+            last_cpu, last_time = cpu, now
+
+
+def start_server(args):
+    env = dict(
+        os.environ,
+        CV_LLM_STUB='1',
+        CV_LLM_STUB_LATENCY=str(args.llm_latency),
+        CV_LLM_STUB_ERROR_RATE=str(args.llm_error_rate),
+        GOOGLE_API_KEY='stub',
+        WEB_CONCURRENCY=str(args.workers),
+        BIND=f'127.0.0.1:{args.port}',
+        # Every upload is identical per kind; measure the pipeline, not the result cache
+        CV_SHARED_CACHE='0',
+    )
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'mainapi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url + '/')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"Server at {url} did not become ready in {timeout}s")
+
+
+async def one_request(client, url, kind, payload, records):
+    filename, body = payload
+    start = time.perf_counter()
+    try:
+        response = await client.post(url + '/analyze_resume/', files={'file': (filename, body)},
+                                     data={'google_api_key': 'stub'})
+        if response.status_code != 200:
+            outcome = f'http_{response.status_code}'
+        else:
+            outcome = 'ok' if response.json().get('status') == 'success' else 'pipeline_error'
+    except httpx.TimeoutException:
+        outcome = 'timeout'
+    except httpx.TransportError as e:
+        outcome = type(e).__name__
+    records.append((kind, outcome, time.perf_counter() - start))
+
+
+async def drive(args, url, server_pid):
+    mix = parse_mix(args.mix)
+    payloads = {kind: (UPLOADS[kind][0], UPLOADS[kind][1]()) for kind in mix}
+    kinds, weights = list(mix), list(mix.values())
+    records = []
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=None)) as client:
+        await wait_ready(client, url)
+        stop = asyncio.Event()
+        sampler = ResourceSampler(server_pid) if server_pid else None
+        sampler_task = asyncio.create_task(sampler.run(stop)) if sampler else None
+
+        # Open loop: send on schedule whether or not earlier requests have returned
+        tasks = []
+        start = time.monotonic()
+        sent = 0
+        while time.monotonic() - start < args.duration:
+            kind = random.choices(kinds, weights)[0]
+            tasks.append(asyncio.create_task(one_request(client, url, kind, payloads[kind], records)))
+            sent += 1
+            next_at = start + sent / args.rate
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+
+        stop.set()
+        if sampler_task:
+            await sampler_task
+    return records, elapsed, sampler
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def report(args, records, elapsed, sampler):
+    ok = sorted(latency for _, outcome, latency in records if outcome == 'ok')
+    print(f"workers={args.workers} target={args.rate}/s duration={args.duration}s mix={args.mix} "
+          f"llm_latency={args.llm_latency}s llm_error_rate={args.llm_error_rate}")
+    print(f"requests {len(records)}, ok {len(ok)}, throughput {len(ok) / elapsed:.2f} ok/s")
+    print(f"latency ms  p50 {percentile(ok, 0.5) * 1000:.0f}  p90 {percentile(ok, 0.9) * 1000:.0f}  "
+          f"p99 {percentile(ok, 0.99) * 1000:.0f}  max {(ok[-1] if ok else 0) * 1000:.0f}")
+
+    outcomes = {}
+    for kind, outcome, latency in records:
+        outcomes.setdefault(kind, {}).setdefault(outcome, []).append(latency)
+    for kind, by_outcome in sorted(outcomes.items()):
+        total = sum(len(latencies) for latencies in by_outcome.values())
+        errors = total - len(by_outcome.get('ok', []))
+        kind_ok = sorted(by_outcome.get('ok', []))
+        detail = ', '.join(f"{outcome} {len(latencies)}" for outcome, latencies in by_outcome.items() if outcome != 'ok')
+        print(f"  {kind:<8} n={total:<5} error rate {errors / total:6.1%}  p50 {percentile(kind_ok, 0.5) * 1000:6.0f} ms"
+              f"  p99 {percentile(kind_ok, 0.99) * 1000:6.0f} ms  {detail}")
+
+    if sampler and sampler.rss:
+        print(f"server RSS MB  mean {sum(sampler.rss) / len(sampler.rss):.0f}  peak {max(sampler.rss):.0f}")
+        print(f"server CPU %   mean {sum(sampler.cpu_percent) / len(sampler.cpu_percent):.0f}  "
+              f"peak {max(sampler.cpu_percent):.0f}  (100% = one core)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='target a running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='server process to sample when using --url')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=float, default=4.0, help='requests per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load')
+    parser.add_argument('--mix', default='pdf=4,scanned=1,docx=3,txt=2')
+    parser.add_argument('--llm-latency', type=float, default=0.8)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request client timeout')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    server = None
+    if args.url:
+        url, server_pid = args.url.rstrip('/'), args.server_pid
+    else:
+        server = start_server(args)
+        url, server_pid = f'http://127.0.0.1:{args.port}', server.pid
+    try:
+        records, elapsed, sampler = asyncio.run(drive(args, url, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    report(args, records, elapsed, sampler)
+
+
+if __name__ == '__main__':
+    main()
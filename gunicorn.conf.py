@@ -0,0 +1,17 @@
+# Multi-worker deployment for mainapi.py
+#
+#   gunicorn -c gunicorn.conf.py mainapi:app
+#
+# preload_app imports mainapi (and so warms the pipeline) once in the master
+# before forking. Result and LLM caches live in SQLite files under
+# CV_CACHE_DIR, which every worker on the host reads and writes, so adding
+# workers does not split the cache hit rate.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+keepalive = 5
@@ -1,18 +1,97 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import hmac
 import tempfile
+import json
 import os
 import sys
+import traceback
+from typing import List
 
 # Add src folder to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from main import ResumeQueryBuilder
+from metrics import METRICS
+from llm_policy import LLMPolicy
+from cache import content_hash
+from singleflight import SingleFlight
+from taxonomy import TAXONOMY
+from usage import REJECT, tenant_id
+from broker import LocalFileStore, broker_from_url
+from worker import Dispatcher
+from api_response import FULL, PROFILES, FastJSONResponse, parse_fields, shape
 
 # Load environment variables
 load_dotenv()
 
+# The API isolates extraction in a killable, memory-capped subprocess by default
+os.environ.setdefault("CV_EXTRACT_ISOLATE", "1")
+
+# Share result/LLM caches across worker processes through a local SQLite store
+USE_SHARED_CACHE = os.getenv("CV_SHARED_CACHE", "1") == "1"
+DEFAULT_API_KEY = os.getenv("GOOGLE_API_KEY", "")
+
+# With CV_BROKER_URL set, /batches/ queues uploads for worker nodes (python src/worker.py)
+DISPATCHER = Dispatcher(broker_from_url(), LocalFileStore()) if os.getenv("CV_BROKER_URL") else None
+
+# Let callers request a CPU/memory profile of their request with an X-CV-Profile: 1 header
+PROFILE_REQUESTS = os.getenv("CV_PROFILE_REQUESTS", "0") == "1"
+
+# Operators send this in X-Admin-Token to see every tenant's usage; unset, /usage is per caller only
+ADMIN_TOKEN = os.getenv("CV_ADMIN_TOKEN", "")
+
+_default_processor = None
+
+def preload_pipeline():
+    """
+    Build the default pipeline up front. Under gunicorn with preload_app this
+    runs once in the master, so forked workers inherit PyMuPDF, tesseract
+    bindings and the Gemini client modules already loaded.
+    """
+    global _default_processor
+    if _default_processor is None:
+        _default_processor = ResumeQueryBuilder(DEFAULT_API_KEY or None, use_cache=USE_SHARED_CACHE)
+    return _default_processor
+
+def get_processor(google_api_key: str) -> ResumeQueryBuilder:
+    """Reuse the warm pipeline for the server key; build one per request for caller keys"""
+    if google_api_key == DEFAULT_API_KEY:
+        return preload_pipeline()
+    return ResumeQueryBuilder(google_api_key, use_cache=USE_SHARED_CACHE)
+
+preload_pipeline()
+
+def over_budget_response(google_api_key: str):
+    """429 for a tenant over its LLM token budget when the server rejects instead of downgrading"""
+    usage = preload_pipeline().usage
+    if usage is None or usage.budget.action != REJECT:
+        return None
+    tenant = tenant_id(google_api_key)
+    if usage.within_budget(tenant):
+        return None
+    METRICS.incr("llm_budget_rejections")
+    return FastJSONResponse(
+        {"status": "error", "message": "LLM token budget exceeded", "tenant": tenant, **usage.budget_status(tenant)},
+        status_code=429,
+    )
+
+# Heavy formats (PDFs that may need OCR, images) run in their own small pool so
+# they can't starve light DOCX/TXT/HTML requests. Threads start lazily, after fork.
+EXECUTORS = {
+    "light": ThreadPoolExecutor(max_workers=int(os.getenv("LIGHT_POOL_SIZE", "8")), thread_name_prefix="light"),
+    "heavy": ThreadPoolExecutor(max_workers=int(os.getenv("HEAVY_POOL_SIZE", "2")), thread_name_prefix="heavy"),
+}
+
+# Identical uploads arriving together share one pipeline run
+IN_FLIGHT = SingleFlight("analyze_inflight")
+
 app = FastAPI(
     title="Universal Resume Query Builder API",
     description="Upload a resume and generate optimized job search queries using Gemini AI",
@@ -28,46 +107,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/analyze_resume/")
+# Compress larger JSON bodies for clients that accept gzip; SSE responses are left alone
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")))
+
+@app.post("/analyze_resume/", response_class=FastJSONResponse)
 async def analyze_resume(
     file: UploadFile = File(...),
     google_api_key: str = Form(default=os.getenv("GOOGLE_API_KEY", "")),
+    fields: str = Form(default=""),
+    profile: str = Form(default=FULL),
+    x_cv_profile: str = Header(default=""),
 ):
     """
-    Upload a resume (PDF, DOCX, TXT) and get structured profile data + generated job search query.
+    Upload a resume (PDF, DOCX, DOC, ODT, RTF, HTML, TXT or an image) and get
+    structured profile data + generated job search query.
+
+    fields: comma-separated response paths to return, e.g. "job_query,parsed_data.skills".
+    profile: "full" (default) or "compact", which drops empty values and
+    includes extraction details only for partial extractions.
+
+    With CV_PROFILE_REQUESTS=1 on the server, an X-CV-Profile: 1 header runs
+    this upload uncached under cProfile and tracemalloc; the artifacts are
+    written on the server and named in the X-CV-Profile-Id response header.
     """
 
     if not google_api_key:
-        return {"error": "Missing Google Gemini API key."}
+        return FastJSONResponse({"error": "Missing Google Gemini API key."})
+    rejected = over_budget_response(google_api_key)
+    if rejected is not None:
+        return rejected
+    if profile not in PROFILES:
+        return FastJSONResponse({"status": "error", "message": f"Unknown profile: {profile}"}, status_code=400)
+    try:
+        paths = parse_fields(fields)
+    except ValueError as e:
+        return FastJSONResponse({"status": "error", "message": str(e)}, status_code=400)
 
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+    file_bytes = await file.read()
+    file_type = os.path.splitext(file.filename)[1].lower()[1:]
+    key = content_hash(file_type, google_api_key, file_bytes)
+    profiled = PROFILE_REQUESTS and x_cv_profile == "1"
 
     try:
-        file_type = os.path.splitext(file.filename)[1].lower()[1:]
-        processor = ResumeQueryBuilder(google_api_key)
-        result = processor.process_resume(tmp_path, file_type)
+        if profiled:
+            # Profiled runs are never shared with, or served from, other requests
+            result = await _process_upload(file_bytes, file.filename, file_type, google_api_key, profile=True)
+        else:
+            result = await IN_FLIGHT.run(
+                key, lambda: _process_upload(file_bytes, file.filename, file_type, google_api_key)
+            )
 
-        return {
+        # Returned as a Response, so FastAPI skips its jsonable_encoder pass
+        response = FastJSONResponse(shape({
             "status": "success",
             "parsed_data": result["parsed_data"].dict(),
             "job_query": result["job_query"],
-        }
+            "extraction": result["extraction"],
+        }, paths, profile))
+        if result.get("profile"):
+            response.headers["X-CV-Profile-Id"] = result["profile"]["id"]
+        return response
 
     except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "message": str(e),
-            "traceback": traceback.format_exc(),
-        }
+        # The traceback stays in the server log; clients only get the message
+        traceback.print_exc()
+        return FastJSONResponse({"status": "error", "message": str(e)})
+
+async def _process_upload(file_bytes: bytes, filename: str, file_type: str, google_api_key: str,
+                          profile: bool = False):
+    """Run the pipeline for one upload in the pool matching its cost class"""
+    # Save uploaded file temporarily
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+        tmp.write(file_bytes)
+        tmp_path = tmp.name
 
+    try:
+        processor = get_processor(google_api_key)
+        pool = EXECUTORS[processor.text_extractor.cost_class(tmp_path, file_type)]
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, partial(processor.process_resume, tmp_path, file_type, profile=profile)
+        )
     finally:
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
 
+@app.post("/analyze_resume/stream")
+async def analyze_resume_stream(
+    file: UploadFile = File(...),
+    google_api_key: str = Form(default=os.getenv("GOOGLE_API_KEY", "")),
+):
+    """
+    Same as /analyze_resume/ but streams Server-Sent Events as each stage completes:
+    text, sections, fast_parse, llm_chunk (repeated), parsed, job_query, then done.
+    """
+
+    if not google_api_key:
+        return {"error": "Missing Google Gemini API key."}
+    rejected = over_budget_response(google_api_key)
+    if rejected is not None:
+        return rejected
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
+        tmp.write(await file.read())
+        tmp_path = tmp.name
+
+    file_type = os.path.splitext(file.filename)[1].lower()[1:]
+
+    def event_stream():
+        # Runs in Starlette's threadpool, so the blocking pipeline doesn't stall the event loop
+        try:
+            processor = get_processor(google_api_key)
+            for event, payload in processor.process_resume_stream(tmp_path, file_type):
+                yield _sse(event, payload)
+            yield _sse("done", {"status": "success"})
+        except Exception as e:
+            yield _sse("error", {"status": "error", "message": str(e)})
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/batches/")
+async def submit_batch(
+    files: List[UploadFile] = File(...),
+    google_api_key: str = Form(default=os.getenv("GOOGLE_API_KEY", "")),
+):
+    """
+    Queue uploads for the worker pool. Files are stored once in the shared
+    file store and jobs carry a reference. Workers use their own API key;
+    the caller's key identifies the tenant whose budget is checked here.
+    """
+    if DISPATCHER is None:
+        return FastJSONResponse({"status": "error", "message": "No broker configured (CV_BROKER_URL)."}, status_code=404)
+    if not google_api_key:
+        return FastJSONResponse({"error": "Missing Google Gemini API key."}, status_code=401)
+    rejected = over_budget_response(google_api_key)
+    if rejected is not None:
+        return rejected
+    uploads = [(file.filename, await file.read()) for file in files]
+    batch_id = await asyncio.get_running_loop().run_in_executor(None, DISPATCHER.submit_uploads, uploads)
+    return FastJSONResponse({"status": "queued", "batch_id": batch_id, "jobs": len(uploads)}, status_code=202)
+
+@app.get("/batches/{batch_id}")
+def batch_status(batch_id: str):
+    """Progress of a batch, with each document's result or error in upload order"""
+    if DISPATCHER is None:
+        return FastJSONResponse({"status": "error", "message": "No broker configured (CV_BROKER_URL)."}, status_code=404)
+    batch = DISPATCHER.broker.batch(batch_id)
+    if not batch["total"]:
+        return FastJSONResponse({"status": "error", "message": f"Unknown batch: {batch_id}"}, status_code=404)
+    return FastJSONResponse(batch)
+
+@app.get("/workers")
+def workers():
+    """Workers that sent a heartbeat in the last minute"""
+    if DISPATCHER is None:
+        return {"workers": []}
+    return {"workers": DISPATCHER.broker.workers()}
+
+@app.get("/metrics")
+def metrics():
+    """Per-process pipeline metrics, including how many LLM calls the confidence policy avoided"""
+    return {
+        "llm_policy": LLMPolicy.stats(),
+        "in_flight": len(IN_FLIGHT),
+        "taxonomy_version": TAXONOMY.current().version,
+        "broker_jobs": DISPATCHER.broker.stats() if DISPATCHER is not None else None,
+        **METRICS.snapshot(),
+    }
+
+@app.get("/usage")
+def usage(
+    window_seconds: float = 0,
+    tenant: str = "",
+    x_google_api_key: str = Header(default=""),
+    x_admin_token: str = Header(default=""),
+):
+    """
+    LLM calls, outcomes, tokens, estimated cost and latency per model over
+    the window (default: the budget window).
+
+    Callers see only their own tenant, identified by the X-Google-Api-Key
+    header. With an X-Admin-Token header matching CV_ADMIN_TOKEN the report
+    covers every tenant ("key-" plus a hash of the API key), or the one
+    named by tenant=.
+    """
+    ledger = preload_pipeline().usage
+    if ledger is None:
+        return {"error": "Usage ledger is disabled (CV_SHARED_CACHE=0)."}
+    if ADMIN_TOKEN and hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        return ledger.aggregates(window_seconds or None, tenant or None)
+    if not x_google_api_key:
+        return FastJSONResponse(
+            {"status": "error", "message": "Send your API key in the X-Google-Api-Key header."}, status_code=401)
+    own_tenant = tenant_id(x_google_api_key)
+    if tenant and tenant != own_tenant:
+        return FastJSONResponse({"status": "error", "message": "Usage of other tenants needs the admin token."},
+                                status_code=403)
+    return ledger.aggregates(window_seconds or None, own_tenant)
+
 @app.get("/")
 def root():
     return {"message": "✅ Universal Resume Query Builder API is running!"}
@@ -0,0 +1,98 @@
+import json
+from typing import Any, Dict, List
+from starlette.responses import Response
+from extract_text import ExtractionResult
+from llm_parser import UniversalCVData
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, still without FastAPI's jsonable_encoder pass
+    orjson = None
+
+FULL = 'full'
+COMPACT = 'compact'
+PROFILES = (FULL, COMPACT)
+
+# Dotted paths a client may request with fields=; a parent path selects the whole object
+RESPONSE_FIELDS = {
+    'status': None,
+    'job_query': None,
+    'parsed_data': set(UniversalCVData.__fields__),
+    'extraction': set(ExtractionResult.__fields__) - {'text'},
+}
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered straight from plain dicts, with orjson when installed"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_fields(spec: str) -> List[List[str]]:
+    """
+    Split a fields= value like "job_query,parsed_data.skills" into paths.
+    Raises ValueError naming any field the response doesn't have.
+    """
+    paths, unknown = [], []
+    for item in (part.strip() for part in spec.split(',')):
+        if not item:
+            continue
+        path = item.split('.')
+        children = RESPONSE_FIELDS.get(path[0], ...)
+        if children is ... or len(path) > 2 or (len(path) == 2 and (children is None or path[1] not in children)):
+            unknown.append(item)
+        else:
+            paths.append(path)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return paths
+
+
+def project(payload: Dict[str, Any], paths: List[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested paths (and status)"""
+    projected = {'status': payload['status']}
+    for path in paths:
+        if path[0] not in payload:
+            continue
+        value = payload[path[0]]
+        if len(path) == 1:
+            projected[path[0]] = value
+        elif isinstance(value, dict) and path[1] in value:
+            target = projected.setdefault(path[0], {})
+            if isinstance(target, dict):
+                target[path[1]] = value[path[1]]
+    return projected
+
+
+def compact(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact profile: empty values are dropped throughout, and extraction
+    details only appear when the extraction was partial.
+    """
+    payload = dict(payload)
+    extraction = payload.pop('extraction', None)
+    if extraction and not extraction.get('complete', True):
+        payload['extraction'] = extraction
+    return _drop_empty(payload)
+
+
+def _drop_empty(value):
+    if isinstance(value, dict):
+        cleaned = {key: _drop_empty(item) for key, item in value.items()}
+        return {key: item for key, item in cleaned.items() if item not in (None, '', [], {})}
+    if isinstance(value, list):
+        return [_drop_empty(item) for item in value]
+    return value
+
+
+def shape(payload: Dict[str, Any], paths: List[List[str]] = None, profile: str = FULL) -> Dict[str, Any]:
+    """Apply the compact profile, then the fields= projection"""
+    if profile == COMPACT:
+        payload = compact(payload)
+    if paths:
+        payload = project(payload, paths)
+    return payload
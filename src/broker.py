@@ -0,0 +1,343 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from pydantic import BaseModel
+from cache import content_hash, default_cache_dir
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job(BaseModel):
+    """A claimed unit of work: one document of a batch"""
+    id: str
+    batch_id: str
+    position: int
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class Broker:
+    """
+    Work queue between dispatchers and stateless workers.
+
+    Jobs are leased, not popped: a claimed job goes back to the queue when
+    its lease runs out before the worker completes it (crash, lost node), so
+    workers extend the lease with heartbeat() while they work. Failed jobs
+    are retried with backoff up to max_attempts. Implementations only need
+    these methods; SQLiteBroker is the local one.
+    """
+    # Finished jobs, and files no queued job references, are kept this long
+    retention_days: float = 7
+
+    def submit(self, payloads: List[Dict[str, Any]], batch_id: str = None) -> str:
+        """Queue one job per payload and return the batch id"""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the oldest available job, or None when the queue is empty"""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id: str, job_id: str = None, lease_seconds: float = None, info: dict = None):
+        """Mark the worker alive and extend the lease of the job it holds"""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Acknowledge a job with its result; False when the worker no longer holds its lease"""
+        raise NotImplementedError
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> Optional[str]:
+        """
+        Release the worker's job after an error, to be retried or marked
+        failed; returns the job's new status, None when the lease was lost
+        """
+        raise NotImplementedError
+
+    def file_in_use(self, file_ref: str) -> bool:
+        """Whether a pending or leased job still needs the referenced file"""
+        raise NotImplementedError
+
+    def prune(self, older_than_seconds: float = None) -> int:
+        """Delete finished jobs older than the retention period; returns how many"""
+        raise NotImplementedError
+
+    def batch(self, batch_id: str) -> dict:
+        """Status counts plus per-job status, result and error in submission order"""
+        raise NotImplementedError
+
+    def workers(self, max_age_seconds: float = 60) -> List[dict]:
+        """Workers that sent a heartbeat within max_age_seconds"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status across all batches, e.g. to scale workers on the pending backlog"""
+        raise NotImplementedError
+
+
+class SQLiteBroker(Broker):
+    """
+    Broker in a local SQLite file. Every process on the host (or on hosts
+    sharing a filesystem with working locks) can dispatch and work against
+    it; claims take SQLite's write lock, so a job is leased to one worker
+    at a time.
+    """
+
+    def __init__(self, path: str = None, max_attempts: int = None, retry_backoff_seconds: float = 2.0,
+                 retention_days: float = None):
+        self.path = path or os.path.join(default_cache_dir(), 'broker.sqlite3')
+        self.max_attempts = max_attempts or int(os.getenv('CV_BROKER_MAX_ATTEMPTS', '3'))
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retention_days = retention_days or float(os.getenv('CV_BROKER_RETENTION_DAYS', '7'))
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Same per-process, per-thread connection rule as DiskCache
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, batch_id TEXT NOT NULL, position INTEGER NOT NULL, payload TEXT NOT NULL, '
+                'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, '
+                'lease_until REAL, worker_id TEXT, result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, available_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, position)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS workers ('
+                'worker_id TEXT PRIMARY KEY, info TEXT NOT NULL, started REAL NOT NULL, last_seen REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two claims can't pick the same row
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def submit(self, payloads: List[Dict[str, Any]], batch_id: str = None) -> str:
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO jobs (id, batch_id, position, payload, status, available_at, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(uuid.uuid4().hex, batch_id, position, json.dumps(payload), PENDING, now, now, now)
+                 for position, payload in enumerate(payloads)]
+            )
+        return batch_id
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as conn:
+            # Leases that ran out belong to workers that died or stalled: they count as failed attempts
+            for job_id, attempts in conn.execute(
+                    'SELECT id, attempts FROM jobs WHERE status = ? AND lease_until < ?', (LEASED, now)).fetchall():
+                self._release(conn, job_id, attempts, 'lease expired', now)
+
+            row = conn.execute(
+                'SELECT id, batch_id, position, payload, attempts FROM jobs '
+                'WHERE status = ? AND available_at <= ? ORDER BY available_at LIMIT 1', (PENDING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, worker_id = ?, updated = ? '
+                'WHERE id = ?', (LEASED, now + lease_seconds, worker_id, now, row[0])
+            )
+        return Job(id=row[0], batch_id=row[1], position=row[2], payload=json.loads(row[3]), attempts=row[4] + 1)
+
+    def _release(self, conn: sqlite3.Connection, job_id: str, attempts: int, error: str, now: float) -> str:
+        if attempts >= self.max_attempts:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated = ? WHERE id = ?',
+                         (FAILED, error, now, job_id))
+            return FAILED
+        retry_at = now + self.retry_backoff_seconds * 2 ** (attempts - 1)
+        conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL, updated = ? WHERE id = ?',
+            (PENDING, error, retry_at, now, job_id)
+        )
+        return PENDING
+
+    def heartbeat(self, worker_id: str, job_id: str = None, lease_seconds: float = None, info: dict = None):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'INSERT INTO workers (worker_id, info, started, last_seen) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (worker_id) DO UPDATE SET info = excluded.info, last_seen = excluded.last_seen',
+            (worker_id, json.dumps(info or {}), now, now)
+        )
+        if job_id is not None and lease_seconds:
+            conn.execute('UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND status = ? AND worker_id = ?',
+                         (now + lease_seconds, now, job_id, LEASED, worker_id))
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        # Only while this worker still holds the lease: once it expired and the job was
+        # claimed again, the new holder's result must not be overwritten
+        cursor = self._connection().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated = ? '
+            'WHERE id = ? AND status = ? AND worker_id = ?',
+            (DONE, json.dumps(result), time.time(), job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> Optional[str]:
+        with self._transaction() as conn:
+            # Only while this worker still holds the lease; an expired lease was already released
+            row = conn.execute('SELECT attempts FROM jobs WHERE id = ? AND status = ? AND worker_id = ?',
+                               (job_id, LEASED, worker_id)).fetchone()
+            if row is None:
+                return None
+            return self._release(conn, job_id, row[0], error, time.time())
+
+    def file_in_use(self, file_ref: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE status IN (?, ?) AND json_extract(payload, '$.file_ref') = ? LIMIT 1",
+            (PENDING, LEASED, file_ref)
+        ).fetchone()
+        return row is not None
+
+    def prune(self, older_than_seconds: float = None) -> int:
+        cutoff = time.time() - (older_than_seconds or self.retention_days * 86400)
+        conn = self._connection()
+        cursor = conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?', (DONE, FAILED, cutoff))
+        conn.execute('DELETE FROM workers WHERE last_seen < ?', (cutoff,))
+        return cursor.rowcount
+
+    def batch(self, batch_id: str) -> dict:
+        rows = self._connection().execute(
+            'SELECT status, result, error, attempts FROM jobs WHERE batch_id = ? ORDER BY position', (batch_id,)
+        ).fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        jobs = []
+        for status, result, error, attempts in rows:
+            counts[status] += 1
+            jobs.append({
+                'status': status,
+                'result': json.loads(result) if result is not None else None,
+                'error': error,
+                'attempts': attempts,
+            })
+        return {
+            'batch_id': batch_id,
+            'total': len(rows),
+            'finished': counts[DONE] + counts[FAILED] == len(rows),
+            'counts': counts,
+            'jobs': jobs,
+        }
+
+    def workers(self, max_age_seconds: float = 60) -> List[dict]:
+        rows = self._connection().execute(
+            'SELECT worker_id, info, started, last_seen FROM workers WHERE last_seen >= ? ORDER BY worker_id',
+            (time.time() - max_age_seconds,)
+        ).fetchall()
+        return [{'worker_id': worker_id, 'started': started, 'last_seen': last_seen, **json.loads(info)}
+                for worker_id, info, started, last_seen in rows]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return counts
+
+
+class LocalFileStore:
+    """
+    Content-addressed documents in a directory, so jobs carry a short
+    reference instead of file bytes. Point CV_FILE_STORE at a directory all
+    nodes mount; identical uploads are stored once.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv('CV_FILE_STORE', os.path.join(default_cache_dir(), 'files'))
+
+    def put(self, data: bytes, extension: str = '') -> str:
+        """Store bytes and return their reference"""
+        ref = content_hash(data) + (f".{extension}" if extension else '')
+        path = os.path.join(self.root, ref[:2], ref)
+        if os.path.exists(path):
+            # Refresh the age, so the stale-file sweep keeps a document that was just queued again
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so readers never see a partial file
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return ref
+
+    def put_file(self, file_path: str) -> str:
+        """Store a local file and return its reference"""
+        with open(file_path, 'rb') as f:
+            return self.put(f.read(), os.path.splitext(file_path)[1].lower()[1:])
+
+    @contextmanager
+    def local_path(self, ref: str):
+        """Path of the referenced document on this node, for the duration of the block"""
+        if os.path.basename(ref) != ref:
+            raise ValueError(f"Invalid file reference: {ref}")
+        path = os.path.join(self.root, ref[:2], ref)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File reference {ref} not found in {self.root}")
+        yield path
+
+    def delete(self, ref: str):
+        path = os.path.join(self.root, ref[:2], os.path.basename(ref))
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def stale(self, older_than_seconds: float) -> List[str]:
+        """References of documents stored more than older_than_seconds ago"""
+        cutoff = time.time() - older_than_seconds
+        refs = []
+        if not os.path.isdir(self.root):
+            return refs
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if not name.endswith('.tmp') and os.path.getmtime(path) < cutoff:
+                    refs.append(name)
+        return refs
+
+
+# URL scheme -> factory(path); register other brokers (Redis, SQS, ...) here
+BROKERS: Dict[str, Callable[[str], Broker]] = {
+    'sqlite': lambda path: SQLiteBroker(path or None),
+}
+
+
+def broker_from_url(url: str = None) -> Broker:
+    """Broker for a URL like sqlite:///var/lib/cv/broker.sqlite3 (default: CV_BROKER_URL, then local SQLite)"""
+    url = url or os.getenv('CV_BROKER_URL', 'sqlite://')
+    scheme, _, path = url.partition('://')
+    factory = BROKERS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unknown broker scheme: {scheme}")
+    return factory(path)
+
+
+def worker_identity() -> str:
+    """Unique worker id: host, process and a random suffix"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
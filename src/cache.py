@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+
+def content_hash(*parts) -> str:
+    """Stable SHA-256 hex digest over bytes/str parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Cache directory shared by all workers on this host"""
+    return os.getenv('CV_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cv_processor_cache'))
+
+
+class DiskCache:
+    """
+    Key/value cache stored in a local SQLite file.
+
+    Every worker process opens its own connection to the same file, so entries
+    written by one uvicorn/gunicorn worker are hits for all the others. Values
+    must be JSON-serializable.
+    """
+
+    def __init__(self, namespace: str, cache_dir: str = None, ttl_seconds: Optional[float] = None):
+        self.namespace = namespace
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.path = os.path.join(self.cache_dir, f"{namespace}.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per process and per thread: never reuse one across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for key, or default"""
+        try:
+            row = self._connection().execute(
+                'SELECT value, created FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error ({self.namespace}): {e}")
+            return default
+
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value under key"""
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO entries (key, value, created) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+
+    def clear(self):
+        """Remove every entry in this namespace"""
+        self._connection().execute('DELETE FROM entries')
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'namespace': self.namespace,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,69 @@
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+
+class KeywordClassifier:
+    """
+    Keyword-vote classifier over one grouped taxonomy vocabulary (e.g.
+    professions). Many texts are scored at once: a texts x terms presence
+    matrix times a terms x labels weight matrix.
+
+    Each weight is 1 plus a fraction below 1 proportional to the keyword's
+    length, so the integer part of a score is the keyword hit count and the
+    fraction breaks ties in favour of the longer, more specific matches.
+    Remaining exact ties go to the label listed first in the taxonomy.
+
+    present, when given, maps a text to the set of keywords it contains
+    (CompiledTaxonomy.present), so the substring scan is shared with the
+    other vocabularies instead of repeated per classifier.
+    """
+
+    def __init__(self, groups: Tuple[Tuple[str, Tuple[str, ...]], ...],
+                 present: Callable[[str], frozenset] = None):
+        self.present = present
+        self.labels = [name for name, _ in groups]
+        self.terms = sorted({keyword for _, words in groups for keyword in words})
+        column = {term: index for index, term in enumerate(self.terms)}
+
+        counts = np.zeros((len(self.terms), len(self.labels)))
+        for label_index, (_, words) in enumerate(groups):
+            for keyword in words:
+                counts[column[keyword], label_index] += 1
+
+        # Summed over any label, the fractions stay below 1
+        lengths = np.array([len(term) for term in self.terms], dtype=float)
+        fraction = lengths / (counts.sum(axis=1) @ lengths + 1)
+        self.weights = counts * (1 + fraction[:, None])
+
+    def term_matrix(self, texts_lower: List[str], shared_scan: bool = True) -> np.ndarray:
+        """
+        texts x terms, 1 where the term occurs in the text. shared_scan=False
+        checks the terms directly instead of through present(), for short
+        texts such as single lines that would only crowd its memo.
+        """
+        rows, columns = [], []
+        for row, text in enumerate(texts_lower):
+            found = self.present(text) if self.present and shared_scan else text
+            for index, term in enumerate(self.terms):
+                if term in found:
+                    rows.append(row)
+                    columns.append(index)
+        matrix = np.zeros((len(texts_lower), len(self.terms)))
+        matrix[rows, columns] = 1
+        return matrix
+
+    def scores(self, texts_lower: List[str], shared_scan: bool = True) -> np.ndarray:
+        """texts x labels scores"""
+        return self.term_matrix(texts_lower, shared_scan) @ self.weights
+
+    def classify(self, texts_lower: List[str], default: str) -> List[str]:
+        """Best label per text, or default when no keyword matched"""
+        return [self.label(row, default) for row in self.scores(texts_lower)]
+
+    def label(self, score_row: np.ndarray, default: str) -> str:
+        best = int(np.argmax(score_row)) if len(score_row) else 0
+        return self.labels[best] if len(score_row) and score_row[best] > 0 else default
+
+    def hit_counts(self, score_row: np.ndarray) -> Dict[str, int]:
+        """Label -> keyword hits, for labels with any"""
+        return {self.labels[index]: int(score_row[index]) for index in np.flatnonzero(score_row)}
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+from cache import default_cache_dir
+from metrics import METRICS
+
+_WORD_RE = re.compile(r'\w+')
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles. Two signatures agree in each
+    position with probability equal to the Jaccard similarity of the texts.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Universal hash family h(x) = (a*x + b) mod p, fixed by the seed so
+        # signatures stay comparable across processes and restarts
+        rng = hashlib.blake2b(str(seed).encode(), digest_size=64)
+        self.permutations = []
+        for index in range(num_perm):
+            rng.update(struct.pack('<I', index))
+            a, b = struct.unpack('<QQ', rng.digest()[:16])
+            self.permutations.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+
+    def shingles(self, text: str) -> set:
+        words = _WORD_RE.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        return {
+            int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode(), digest_size=4).digest(), 'little')
+            for i in range(max(len(words) - size + 1, 1))
+        }
+
+    def signature(self, text: str) -> List[int]:
+        hashes = self.shingles(text)
+        return [min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashes)
+                for a, b in self.permutations]
+
+    @staticmethod
+    def similarity(first: List[int], second: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of processed CVs in a local SQLite file shared by all
+    workers, like DiskCache.
+
+    Signatures are split into bands; documents sharing any band bucket are
+    candidates, and a candidate counts as a near-duplicate when its estimated
+    Jaccard similarity reaches the threshold. With 128 permutations in 16
+    bands of 8, pairs above ~0.7 similarity almost always collide.
+    """
+
+    def __init__(self, namespace: str = 'near_duplicates', cache_dir: str = None,
+                 threshold: float = None, num_perm: int = 128, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.namespace = namespace
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.path = os.path.join(self.cache_dir, f"{namespace}.sqlite3")
+        self.threshold = threshold if threshold is not None else float(os.getenv('CV_NEAR_DUP_THRESHOLD', '0.85'))
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Same per-process, per-thread connection rule as DiskCache
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                'doc_id TEXT PRIMARY KEY, signature TEXT NOT NULL, payload TEXT NOT NULL, created REAL NOT NULL)'
+            )
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket TEXT, doc_id TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def signature(self, text: str) -> List[int]:
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, str]]:
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            keys.append((band, hashlib.blake2b(struct.pack(f'<{self.rows}I', *rows), digest_size=8).hexdigest()))
+        return keys
+
+    def find(self, signature: List[int]) -> Optional[Tuple[str, float, dict]]:
+        """Most similar indexed document at or above the threshold: (doc_id, similarity, payload)"""
+        try:
+            conn = self._connection()
+            candidates = set()
+            for band, bucket in self._band_keys(signature):
+                candidates.update(row[0] for row in conn.execute(
+                    'SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?', (band, bucket)))
+
+            best = None
+            for doc_id in candidates:
+                row = conn.execute('SELECT signature, payload FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+                if row is None:
+                    continue
+                similarity = MinHasher.similarity(signature, json.loads(row[0]))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (doc_id, similarity, row[1])
+        except sqlite3.Error as e:
+            print(f"Near-duplicate index read error: {e}")
+            return None
+
+        METRICS.incr('near_duplicate_lookups')
+        METRICS.observe('near_duplicate_candidates', len(candidates))
+        if best is None:
+            return None
+        METRICS.incr('near_duplicate_hits')
+        return best[0], best[1], json.loads(best[2])
+
+    def add(self, doc_id: str, signature: List[int], payload: dict):
+        """Index a processed document with a JSON-serializable payload"""
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN')
+            try:
+                exists = conn.execute('SELECT 1 FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+                conn.execute(
+                    'INSERT OR REPLACE INTO documents (doc_id, signature, payload, created) VALUES (?, ?, ?, ?)',
+                    (doc_id, json.dumps(signature), json.dumps(payload), time.time())
+                )
+                if not exists:
+                    conn.executemany('INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)',
+                                     [(band, bucket, doc_id) for band, bucket in self._band_keys(signature)])
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            print(f"Near-duplicate index write error: {e}")
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM documents')
+        conn.execute('DELETE FROM buckets')
@@ -0,0 +1,110 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+W_P = W_NS + 'p'
+W_T = W_NS + 't'
+W_TAB = W_NS + 'tab'
+W_BR = W_NS + 'br'
+W_CR = W_NS + 'cr'
+W_TC = W_NS + 'tc'
+W_TR = W_NS + 'tr'
+
+_HEADER_RE = re.compile(r'^word/header(\d*)\.xml$')
+_FOOTER_RE = re.compile(r'^word/footer(\d*)\.xml$')
+
+
+def extract_docx_text(file_path: str) -> str:
+    """Extract text from a DOCX file by streaming its XML parts directly"""
+    with zipfile.ZipFile(file_path) as archive:
+        return "\n".join(iter_docx_lines(archive))
+
+
+def iter_docx_lines(archive: zipfile.ZipFile) -> Iterator[str]:
+    """Yield text lines from headers, the main document and footers, in that order"""
+    for part in _ordered_parts(archive.namelist()):
+        with archive.open(part) as xml_file:
+            for line in _iter_part_lines(xml_file):
+                if line.strip():
+                    yield line
+
+
+def _ordered_parts(names: List[str]) -> List[str]:
+    """Headers first, then the body, then footers"""
+    def numbered(pattern):
+        matches = [(pattern.match(name), name) for name in names]
+        return [name for match, name in sorted(
+            ((m, n) for m, n in matches if m), key=lambda x: int(x[0].group(1) or 0)
+        )]
+
+    if 'word/document.xml' not in names:
+        raise ValueError("Not a DOCX file: word/document.xml is missing")
+    return numbered(_HEADER_RE) + ['word/document.xml'] + numbered(_FOOTER_RE)
+
+
+def _iter_part_lines(xml_file: IO[bytes]) -> Iterator[str]:
+    """
+    Walk one WordprocessingML part with iterparse.
+
+    Paragraphs become lines, table rows become one line with cells joined by
+    " | ", and text boxes (w:txbxContent) are picked up as the nested
+    paragraphs they are. mc:Fallback branches duplicate text-box content for
+    old readers, so they are skipped.
+    """
+    paragraphs = []   # stack of run-text buffers; text boxes nest paragraphs
+    rows = []         # stack of cell lists; tables can nest
+    cells = []        # stack of paragraph lists, one per open cell
+    skip_depth = 0
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+
+        if event == 'start':
+            if tag == MC_FALLBACK:
+                skip_depth += 1
+            elif skip_depth:
+                pass
+            elif tag == W_P:
+                paragraphs.append([])
+            elif tag == W_TR:
+                rows.append([])
+            elif tag == W_TC:
+                cells.append([])
+            continue
+
+        if tag == MC_FALLBACK:
+            skip_depth -= 1
+        elif skip_depth:
+            pass
+        elif tag == W_T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == W_TAB:
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (W_BR, W_CR):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == W_P:
+            line = ''.join(paragraphs.pop())
+            if cells:
+                cells[-1].append(line)
+            else:
+                yield line
+        elif tag == W_TC:
+            cell_text = ' '.join(text for text in cells.pop() if text.strip())
+            if rows:
+                rows[-1].append(cell_text)
+        elif tag == W_TR:
+            row_text = ' | '.join(text for text in rows.pop() if text)
+            if cells:
+                # Nested table: the row belongs to the enclosing cell
+                cells[-1].append(row_text)
+            else:
+                yield row_text
+
+        elem.clear()
@@ -39,65 +39,419 @@
 
 import fitz  # PyMuPDF
 from docx import Document
-import pytesseract
+from PIL import Image
 from pdf2image import convert_from_path
-import re
+import multiprocessing
+import os
+import threading
+import time
+from pydantic import BaseModel
+from typing import Iterator, List, Optional
+from docx_reader import extract_docx_text
+from ocr_engine import get_ocr_engine
+from ocr_preprocess import PROBE_DPI, choose_dpi, preprocess
+from text_normalizer import normalize_text
+from section_splitter import UniversalSectionSplitter
+from extractors import HEAVY, detect_format, get_extractor, registered_extensions
+
+try:
+    import resource
+except ImportError:  # Windows: no RLIMIT_AS, the wall-clock kill still applies
+    resource = None
+
+class ExtractionLimits(BaseModel):
+    max_pages: int = 30
+    max_pixels: int = 25_000_000      # per rasterized page; A4 at 300 DPI is ~8.7M
+    ocr_dpi: int = 300                # highest DPI adaptive OCR picks on the first pass
+    ocr_min_dpi: int = 150
+    ocr_retry_dpi: int = 400          # ceiling for the low-confidence retry
+    ocr_retry_confidence: float = 60.0  # mean word confidence (0-100) below which a page is retried
+    stage_timeout: float = 30.0       # seconds for each stage (text layer, OCR)
+    total_timeout: float = 75.0       # hard wall-clock cap for an isolated extraction
+    memory_limit_mb: int = 1024       # address-space cap for the extraction subprocess
+    isolate: bool = False             # run extraction in a killable subprocess
+    # Stop reading pages once this much text is in and the core sections have been seen;
+    # twice the LLM's 3000-character prompt, so rule-based fields still see a 2-page CV whole
+    early_stop_chars: int = 6000      # 0 reads every page
+    early_stop_max_chars: int = 20000  # stop here even if a core section never appeared
+    early_stop_sections: List[str] = ['experience', 'education', 'skills']
+    
+    @classmethod
+    def from_env(cls) -> 'ExtractionLimits':
+        """Limits from CV_EXTRACT_* environment variables"""
+        defaults = cls()
+        return cls(
+            max_pages=int(os.getenv('CV_EXTRACT_MAX_PAGES', defaults.max_pages)),
+            max_pixels=int(os.getenv('CV_EXTRACT_MAX_PIXELS', defaults.max_pixels)),
+            ocr_dpi=int(os.getenv('CV_EXTRACT_OCR_DPI', defaults.ocr_dpi)),
+            ocr_min_dpi=int(os.getenv('CV_EXTRACT_OCR_MIN_DPI', defaults.ocr_min_dpi)),
+            ocr_retry_dpi=int(os.getenv('CV_EXTRACT_OCR_RETRY_DPI', defaults.ocr_retry_dpi)),
+            ocr_retry_confidence=float(os.getenv('CV_EXTRACT_OCR_RETRY_CONFIDENCE', defaults.ocr_retry_confidence)),
+            stage_timeout=float(os.getenv('CV_EXTRACT_STAGE_TIMEOUT', defaults.stage_timeout)),
+            total_timeout=float(os.getenv('CV_EXTRACT_TOTAL_TIMEOUT', defaults.total_timeout)),
+            memory_limit_mb=int(os.getenv('CV_EXTRACT_MEMORY_MB', defaults.memory_limit_mb)),
+            isolate=os.getenv('CV_EXTRACT_ISOLATE', '0') == '1',
+            early_stop_chars=int(os.getenv('CV_EXTRACT_EARLY_STOP_CHARS', defaults.early_stop_chars)),
+            early_stop_max_chars=int(os.getenv('CV_EXTRACT_EARLY_STOP_MAX_CHARS', defaults.early_stop_max_chars)),
+            early_stop_sections=[name.strip() for name in os.getenv(
+                'CV_EXTRACT_EARLY_STOP_SECTIONS', ','.join(defaults.early_stop_sections)).split(',') if name.strip()],
+        )
+
+class ExtractionResult(BaseModel):
+    text: str = ""
+    format: Optional[str] = None
+    complete: bool = True
+    pages_total: int = 0
+    pages_processed: int = 0
+    stopped_early: bool = False       # remaining pages skipped once the text was sufficient
+    ocr_used: bool = False
+    warnings: List[str] = []
+    error: Optional[str] = None
 
 class TextExtractor:
-    def __init__(self):
-        self.supported_formats = ['.pdf', '.docx', '.txt']
+    def __init__(self, limits: ExtractionLimits = None):
+        self.supported_formats = ['.' + ext for ext in registered_extensions()]
+        self.limits = limits or ExtractionLimits.from_env()
+        self.section_splitter = UniversalSectionSplitter()
+        # Per-call state; one TextExtractor is shared by the API's worker threads
+        self._local = threading.local()
     
     def extract_text(self, file_path: str, file_type: str) -> str:
         """Extract text from document with universal format handling"""
+        return self.extract(file_path, file_type).text
+    
+    def extract(self, file_path: str, file_type: str, isolate: bool = None) -> ExtractionResult:
+        """Extract text within the configured limits, reporting partial results"""
+        if self.limits.isolate if isolate is None else isolate:
+            return self._extract_isolated(file_path, file_type)
+        return self._extract_inline(file_path, file_type)
+    
+    def iter_chunks(self, file_path: str, file_type: str) -> Iterator[str]:
+        """
+        Cleaned text in reading order, one page per chunk for PDFs and
+        multi-frame images, produced lazily: pages after the last one consumed
+        are never read or OCRed. Runs in this process, without isolation.
+        """
+        return self._resolve_extractor(file_path, file_type).iter_chunks(file_path, self)
+    
+    def cost_class(self, file_path: str, file_type: str) -> str:
+        """Cost class ('light' or 'heavy') of the extractor that would handle this file"""
         try:
-            if file_type == 'pdf':
-                return self._parse_pdf(file_path)
-            elif file_type == 'docx':
-                return self._parse_docx(file_path)
-            elif file_type == 'txt':
-                return self._parse_txt(file_path)
-            else:
-                raise ValueError(f"Unsupported file format: {file_type}")
+            return self._resolve_extractor(file_path, file_type).cost
+        except Exception:
+            return HEAVY
+    
+    def _resolve_extractor(self, file_path: str, file_type: str):
+        """Choose an extractor plugin by magic bytes, then by declared type"""
+        name = detect_format(file_path, file_type)
+        if name is None:
+            raise ValueError(f"Unsupported file format: {file_type}")
+        return get_extractor(name)
+    
+    def _extract_inline(self, file_path: str, file_type: str, progress=None) -> ExtractionResult:
+        """Run the matching extractor in this process"""
+        result = ExtractionResult()
+        self._local.result = result
+        self._local.progress = progress
+        try:
+            extractor = self._resolve_extractor(file_path, file_type)
+            result.format = extractor.name
+            result.text = self._collect(extractor.iter_chunks(file_path, self))
         except Exception as e:
-            print(f"Error parsing document: {e}")
-            return ""
+            print(f"Error parsing document: {e!r}")
+            result.complete = False
+            result.error = str(e) or type(e).__name__
+        finally:
+            self._local.result = None
+            self._local.progress = None
+        return result
+    
+    def _extract_isolated(self, file_path: str, file_type: str) -> ExtractionResult:
+        """Run extraction in a subprocess that is killed past the wall-clock or memory cap"""
+        ctx = _isolation_context()
+        receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_isolated_extract, args=(self.limits, file_path, file_type, sender), daemon=True
+        )
+        process.start()
+        sender.close()
+        
+        pages = []
+        deadline = time.monotonic() + self.limits.total_timeout
+        failure = None
+        finished = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not receiver.poll(remaining):
+                    failure = f"extraction killed after {self.limits.total_timeout:.0f}s wall-clock limit"
+                    break
+                try:
+                    kind, payload = receiver.recv()
+                except EOFError:
+                    process.join(1)
+                    failure = f"extraction worker exited with code {process.exitcode} (memory limit?)"
+                    break
+                if kind == 'done':
+                    finished = True
+                    return ExtractionResult(**payload)
+                elif kind == 'page':
+                    pages.append(payload)
+                elif kind == 'reset':
+                    pages = []
+        finally:
+            receiver.close()
+            if finished:
+                process.join(5)
+            if process.is_alive():
+                process.kill()
+                process.join(1)
+        
+        print(f"Error parsing document: {failure}")
+        return ExtractionResult(
+            text=self._clean_text("\n".join(pages)),
+            complete=False,
+            pages_processed=len(pages),
+            error=failure,
+        )
+    
+    def _job(self) -> ExtractionResult:
+        """Result being built by the current call (a scratch one for direct method calls)"""
+        result = getattr(self._local, 'result', None)
+        return result if result is not None else ExtractionResult()
+    
+    def _report(self, kind: str, payload=None):
+        """Send progress to the parent when running isolated, so a kill still yields partial text"""
+        progress = getattr(self._local, 'progress', None)
+        if progress is not None:
+            progress((kind, payload))
+    
+    def _truncate(self, reason: str):
+        """Mark the current result as partial"""
+        result = self._job()
+        result.complete = False
+        result.warnings.append(reason)
+        print(f"Extraction truncated: {reason}")
     
-    def _parse_pdf(self, file_path: str) -> str:
-        """Extract text from PDF with OCR fallback"""
-        text = ""
+    def _warn_once(self, warning: str):
+        """Add a warning to the current result unless an earlier page already did"""
+        warnings = self._job().warnings
+        if warning not in warnings:
+            warnings.append(warning)
+    
+    def _collect(self, chunks: Iterator[str]) -> str:
+        """
+        Join chunks until the prompt budget is filled and the core sections
+        have been seen, then close the generator so later pages are skipped.
+        """
+        result = self._job()
+        texts, size, seen = [], 0, set()
+        stopped = False
         try:
-            doc = fitz.open(file_path)
-            for page in doc:
-                text += page.get_text()
-            
-            if len(self._clean_text(text)) < 200:
-                text = self._ocr_pdf(file_path)
-            
-            doc.close()
+            for chunk in chunks:
+                texts.append(chunk)
+                self._report('page', chunk)
+                size += len(chunk)
+                seen |= self.section_splitter.sections_in(chunk)
+                if self._covered(size, seen):
+                    stopped = True
+                    break
+        finally:
+            chunks.close()
+        if stopped and result.pages_processed < result.pages_total:
+            result.stopped_early = True
+        return self._clean_text("\n".join(texts))
+    
+    def _covered(self, size: int, seen: set) -> bool:
+        """Whether enough text has been read to stop early"""
+        limits = self.limits
+        if not limits.early_stop_chars:
+            return False
+        if size >= limits.early_stop_max_chars:
+            return True
+        return size >= limits.early_stop_chars and seen.issuperset(limits.early_stop_sections)
+    
+    def _iter_pdf(self, file_path: str) -> Iterator[str]:
+        """
+        Cleaned text per PDF page with OCR fallback. Pages are held back
+        until the text layer proves substantial (200 characters), so a scanned
+        PDF switches to OCR before anything is yielded.
+        """
+        result = self._job()
+        held, held_chars, streaming = [], 0, False
+        try:
+            with fitz.open(file_path) as doc:
+                result.pages_total = doc.page_count
+                deadline = time.monotonic() + self.limits.stage_timeout
+                for index, page in enumerate(doc):
+                    if index >= self.limits.max_pages:
+                        self._truncate(f"page limit: read {index} of {doc.page_count} pages")
+                        break
+                    if time.monotonic() > deadline:
+                        self._truncate(f"text layer timed out after {index} pages")
+                        break
+                    page_text = self._clean_text(page.get_text())
+                    result.pages_processed = index + 1
+                    if streaming:
+                        yield page_text
+                        continue
+                    held.append(page_text)
+                    held_chars += len(page_text)
+                    if held_chars >= 200:
+                        streaming = True
+                        yield from held
         except Exception as e:
             print(f"PDF parsing error: {e}")
-            text = self._ocr_pdf(file_path)
+            if streaming:
+                # Pages already went downstream; keep them rather than restart with OCR
+                result.complete = False
+                result.error = f"PDF parsing error: {e}"
+                return
         
-        return self._clean_text(text)
+        if not streaming:
+            yield from self._iter_ocr_pdf(file_path)
     
-    def _ocr_pdf(self, file_path: str) -> str:
-        """Use OCR for scanned PDFs"""
+    def _iter_ocr_pdf(self, file_path: str) -> Iterator[str]:
+        """OCR text per page, for scanned PDFs"""
+        result = self._job()
+        result.ocr_used = True
+        result.pages_processed = 0
+        self._report('reset')
         try:
-            images = convert_from_path(file_path, dpi=300)
-            text = ""
-            for image in images:
-                text += pytesseract.image_to_string(image)
-            return self._clean_text(text)
+            page_sizes = self._pdf_page_sizes(file_path)
+            result.pages_total = len(page_sizes)
+            if len(page_sizes) > self.limits.max_pages:
+                self._truncate(f"page limit: OCR of {self.limits.max_pages} of {len(page_sizes)} pages")
+            
+            engine = get_ocr_engine()
+            deadline = time.monotonic() + self.limits.stage_timeout
+            for index, size in enumerate(page_sizes[:self.limits.max_pages]):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._truncate(f"OCR timed out after {index} pages")
+                    break
+                try:
+                    page_text = self._ocr_pdf_page(file_path, index, size, engine, deadline)
+                except RuntimeError as e:
+                    # Both OCR engines raise RuntimeError when the timeout stops tesseract
+                    self._truncate(f"OCR timed out on page {index + 1}: {e}")
+                    break
+                result.pages_processed = index + 1
+                yield self._clean_text(page_text)
         except Exception as e:
             print(f"OCR error: {e}")
-            return ""
+            result.complete = False
+            result.error = f"OCR error: {e}"
+    
+    def _ocr_pdf_page(self, file_path: str, index: int, size, engine, deadline: float) -> str:
+        """
+        Adaptive OCR of one page: pick the DPI from a low-resolution probe,
+        binarize/deskew/crop, and retry once at a higher DPI on low confidence,
+        keeping the better of the two reads.
+        """
+        probe_dpi = min(PROBE_DPI, self._capped_dpi(size))
+        probe = self._render_pdf_page(file_path, index, probe_dpi)[0]
+        dpi = choose_dpi(probe, probe_dpi, self.limits.ocr_min_dpi, self._capped_dpi(size))
+        if dpi is None:
+            return ""  # blank page
+        
+        text, confidence = self._ocr_rendered_page(file_path, index, dpi, engine, deadline)
+        retry_dpi = self._capped_dpi(size, min(int(dpi * 1.5), self.limits.ocr_retry_dpi))
+        if (confidence is None or confidence >= self.limits.ocr_retry_confidence
+                or retry_dpi <= dpi or time.monotonic() >= deadline):
+            return text
+        
+        self._job().warnings.append(
+            f"page {index + 1}: OCR confidence {confidence:.0f} at {dpi} DPI, retrying at {retry_dpi} DPI")
+        retry_text, retry_confidence = self._ocr_rendered_page(file_path, index, retry_dpi, engine, deadline)
+        if retry_confidence is not None and retry_confidence > confidence:
+            return retry_text
+        return text
+    
+    def _ocr_rendered_page(self, file_path: str, index: int, dpi: int, engine, deadline: float):
+        """(text, mean confidence or None) of one page rendered at dpi"""
+        texts, confidences = [], []
+        for image in self._render_pdf_page(file_path, index, dpi):
+            page = preprocess(image)
+            if page is None:
+                continue
+            ocr = engine.recognize(page, timeout=max(deadline - time.monotonic(), 0.1))
+            texts.append(ocr.text)
+            if ocr.confidence is not None:
+                confidences.append(ocr.confidence)
+        return "".join(texts), (sum(confidences) / len(confidences) if confidences else None)
+    
+    def _render_pdf_page(self, file_path: str, index: int, dpi: int) -> list:
+        """Rasterize one page in-process with PyMuPDF; pdftoppm only when PyMuPDF can't open the file"""
+        try:
+            with fitz.open(file_path) as doc:
+                pixmap = doc[index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+                return [Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)]
+        except Exception:
+            return convert_from_path(file_path, dpi=dpi, first_page=index + 1, last_page=index + 1)
+    
+    def _pdf_page_sizes(self, file_path: str) -> list:
+        """Page sizes in points; (None, None) per page when PyMuPDF can't open the file"""
+        try:
+            with fitz.open(file_path) as doc:
+                return [(page.rect.width, page.rect.height) for page in doc]
+        except Exception:
+            from pdf2image import pdfinfo_from_path
+            return [(None, None)] * int(pdfinfo_from_path(file_path)['Pages'])
+    
+    def _capped_dpi(self, size, dpi: int = None) -> int:
+        """Highest DPI up to dpi (default ocr_dpi) whose rasterized page stays within max_pixels"""
+        width_pt, height_pt = size
+        dpi = dpi or self.limits.ocr_dpi
+        if width_pt and height_pt:
+            pixels_at_dpi = (width_pt / 72 * dpi) * (height_pt / 72 * dpi)
+            if pixels_at_dpi > self.limits.max_pixels:
+                dpi = int(dpi * (self.limits.max_pixels / pixels_at_dpi) ** 0.5)
+                self._warn_once("pages rasterized at reduced DPI to stay under the pixel limit")
+        return max(dpi, 50)
+    
+    def _iter_image_frames(self, file_path: str) -> Iterator[str]:
+        """OCR text per frame of an image file directly, with no PDF round-trip"""
+        result = self._job()
+        result.ocr_used = True
+        try:
+            with Image.open(file_path) as image:
+                frames = getattr(image, 'n_frames', 1)
+                result.pages_total = frames
+                if frames > self.limits.max_pages:
+                    self._truncate(f"page limit: OCR of {self.limits.max_pages} of {frames} frames")
+                engine = get_ocr_engine()
+                deadline = time.monotonic() + self.limits.stage_timeout
+                # Multi-frame TIFF/GIF: OCR every frame
+                for frame in range(min(frames, self.limits.max_pages)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._truncate(f"OCR timed out after {frame} frames")
+                        break
+                    image.seek(frame)
+                    page = image.convert('RGB')
+                    if page.width * page.height > self.limits.max_pixels:
+                        scale = (self.limits.max_pixels / (page.width * page.height)) ** 0.5
+                        page = page.resize((int(page.width * scale), int(page.height * scale)))
+                        self._warn_once("image downscaled to stay under the pixel limit")
+                    page = preprocess(page)
+                    page_text = engine.recognize(page, timeout=remaining).text if page is not None else ""
+                    result.pages_processed = frame + 1
+                    yield self._clean_text(page_text)
+        except Exception as e:
+            print(f"Image OCR error: {e}")
+            result.complete = False
+            result.error = f"Image OCR error: {e}"
     
     def _parse_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
+        """Extract text from DOCX file, including tables, headers, footers and text boxes"""
+        try:
+            return self._clean_text(extract_docx_text(file_path))
+        except Exception as e:
+            print(f"Fast DOCX parsing error, falling back to python-docx: {e}")
+        
         doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        text = "\n".join(paragraph.text for paragraph in doc.paragraphs)
         return self._clean_text(text)
     
     def _parse_txt(self, file_path: str) -> str:
@@ -106,7 +460,42 @@ class TextExtractor:
             return self._clean_text(file.read())
     
     def _clean_text(self, text: str) -> str:
-        """Clean and normalize extracted text"""
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^\w\s.,!?;:()\-@]', '', text)
-        return text.strip()
+        """Clean and normalize extracted text, keeping lines and technical tokens"""
+        return normalize_text(text)
+
+_ISOLATION_CONTEXT = None
+_ISOLATION_LOCK = threading.Lock()
+
+
+def _isolation_context():
+    """
+    Start method for isolated extractions. Forking this process directly is
+    unsafe: the API's thread pools, SQLite and gRPC threads may hold locks
+    the child would inherit. A forkserver is a single-threaded process that
+    has imported this module once, so children start clean and fast.
+    """
+    global _ISOLATION_CONTEXT
+    with _ISOLATION_LOCK:
+        if _ISOLATION_CONTEXT is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                _ISOLATION_CONTEXT = multiprocessing.get_context('forkserver')
+                _ISOLATION_CONTEXT.set_forkserver_preload([__name__])
+            else:
+                _ISOLATION_CONTEXT = multiprocessing.get_context('spawn')
+        return _ISOLATION_CONTEXT
+
+
+def _isolated_extract(limits: ExtractionLimits, file_path: str, file_type: str, conn):
+    """Subprocess entry point: cap memory, extract, and send the result back"""
+    if resource is not None and limits.memory_limit_mb:
+        cap = limits.memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+    
+    extractor = TextExtractor(limits.model_copy(update={'isolate': False}))
+    try:
+        result = extractor._extract_inline(file_path, file_type, progress=conn.send)
+        conn.send(('done', result.dict()))
+    except MemoryError:
+        conn.send(('done', ExtractionResult(complete=False, error="memory limit exceeded").dict()))
+    finally:
+        conn.close()
@@ -0,0 +1,367 @@
+import os
+import re
+import shutil
+import subprocess
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional
+
+# Cost classes let the API route heavy formats (OCR, rasterization) to their own pool
+LIGHT = 'light'
+HEAVY = 'heavy'
+
+SNIFF_BYTES = 8192
+
+_REGISTRY: Dict[str, 'BaseExtractor'] = {}
+
+
+class BaseExtractor:
+    """
+    A text extractor plugin for one document format.
+
+    Subclasses set name, extensions and cost, implement sniff() to recognise
+    their format from the leading bytes, and extract() to return cleaned text.
+    sniff() overrides the declared extension, so it must only match a full
+    structural header; short signatures that plain text can start with go in
+    sniff_weak(), which is consulted only when the extension is missing or
+    unknown.
+    Paged formats also override iter_chunks() to produce text page by page,
+    so the host can stop reading once it has enough.
+    `host` is the TextExtractor, which provides shared services such as
+    _clean_text and OCR.
+    """
+    name: str = ''
+    extensions: tuple = ()
+    cost: str = LIGHT
+
+    def sniff(self, head: bytes, file_path: str) -> bool:
+        return False
+
+    def sniff_weak(self, head: bytes, file_path: str) -> bool:
+        return False
+
+    def extract(self, file_path: str, host) -> str:
+        raise NotImplementedError
+
+    def iter_chunks(self, file_path: str, host) -> Iterator[str]:
+        """Cleaned text in reading order; consumers may stop before the end"""
+        yield self.extract(file_path, host)
+
+
+def register_extractor(cls):
+    """Class decorator adding an extractor plugin to the registry"""
+    _REGISTRY[cls.name] = cls()
+    return cls
+
+
+def get_extractor(name: str) -> Optional[BaseExtractor]:
+    return _REGISTRY.get(name)
+
+
+def registered_extensions() -> List[str]:
+    return sorted({ext for extractor in _REGISTRY.values() for ext in extractor.extensions})
+
+
+def detect_format(file_path: str, file_type: str = None) -> Optional[str]:
+    """
+    Pick an extractor by a structural header first, so a .pdf that is really
+    a JPEG still goes to the image extractor, then by the declared extension,
+    then by weaker content hints.
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+
+    for name, extractor in _REGISTRY.items():
+        if extractor.sniff(head, file_path):
+            return name
+
+    if file_type:
+        file_type = file_type.lower().lstrip('.')
+        for name, extractor in _REGISTRY.items():
+            if file_type in extractor.extensions:
+                return name
+
+    for name, extractor in _REGISTRY.items():
+        if extractor.sniff_weak(head, file_path):
+            return name
+    return None
+
+
+def _zip_names(file_path: str) -> List[str]:
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            return archive.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return []
+
+
+@register_extractor
+class PdfExtractor(BaseExtractor):
+    name = 'pdf'
+    extensions = ('pdf',)
+    cost = HEAVY  # may fall back to rasterizing and OCR
+
+    def sniff(self, head, file_path):
+        return head.lstrip()[:5] == b'%PDF-'
+
+    def extract(self, file_path, host):
+        return host._clean_text("\n".join(self.iter_chunks(file_path, host)))
+
+    def iter_chunks(self, file_path, host):
+        return host._iter_pdf(file_path)
+
+
+@register_extractor
+class DocxExtractor(BaseExtractor):
+    name = 'docx'
+    extensions = ('docx',)
+
+    def sniff(self, head, file_path):
+        return head[:4] == b'PK\x03\x04' and 'word/document.xml' in _zip_names(file_path)
+
+    def extract(self, file_path, host):
+        return host._parse_docx(file_path)
+
+
+@register_extractor
+class OdtExtractor(BaseExtractor):
+    name = 'odt'
+    extensions = ('odt',)
+
+    TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+    def sniff(self, head, file_path):
+        # ODF stores an uncompressed "mimetype" entry first
+        return head[:4] == b'PK\x03\x04' and b'application/vnd.oasis.opendocument.text' in head[:100]
+
+    def extract(self, file_path, host):
+        paragraph_tags = (self.TEXT_NS + 'p', self.TEXT_NS + 'h')
+        lines = []
+        with zipfile.ZipFile(file_path) as archive, archive.open('content.xml') as xml_file:
+            # Text is only complete at an element's end event, so paragraphs are
+            # rendered whole and then cleared to keep memory flat
+            for _, elem in ET.iterparse(xml_file, events=('end',)):
+                if elem.tag in paragraph_tags:
+                    lines.append(self._paragraph_text(elem))
+                    elem.clear()
+        return host._clean_text("\n".join(lines))
+
+    def _paragraph_text(self, elem) -> str:
+        ns = self.TEXT_NS
+        parts = [elem.text or '']
+        for child in elem:
+            if child.tag == ns + 'tab':
+                parts.append('\t')
+            elif child.tag == ns + 'line-break':
+                parts.append('\n')
+            elif child.tag == ns + 's':
+                parts.append(' ' * int(child.get(ns + 'c', '1')))
+            else:
+                parts.append(self._paragraph_text(child))
+            parts.append(child.tail or '')
+        return ''.join(parts)
+
+
+@register_extractor
+class RtfExtractor(BaseExtractor):
+    name = 'rtf'
+    extensions = ('rtf',)
+
+    # Destinations whose content is formatting metadata, not document text
+    SKIP_DESTINATIONS = {
+        'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'header', 'footer',
+        'listtable', 'listoverridetable', 'rsidtbl', 'generator', 'xmlnstbl',
+        'themedata', 'colorschememapping', 'datastore', 'latentstyles',
+    }
+    TOKEN_RE = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.I)
+
+    def sniff(self, head, file_path):
+        return head.lstrip()[:5] == b'{\\rtf'
+
+    def extract(self, file_path, host):
+        with open(file_path, 'rb') as f:
+            data = f.read().decode('latin-1')
+        return host._clean_text(self.rtf_to_text(data))
+
+    def rtf_to_text(self, data: str) -> str:
+        """Single left-to-right pass over RTF control words and groups"""
+        out = []
+        stack = []
+        skipping = False
+        pending_skip = False
+        uc_skip = 1
+        chars_to_skip = 0
+
+        for match in self.TOKEN_RE.finditer(data):
+            word, arg, hex_code, symbol, brace, text = match.groups()
+            if brace == '{':
+                stack.append((skipping, uc_skip))
+                pending_skip = False
+            elif brace == '}':
+                if stack:
+                    skipping, uc_skip = stack.pop()
+            elif word:
+                word = word.lower()
+                if pending_skip or word in self.SKIP_DESTINATIONS:
+                    skipping = True
+                    pending_skip = False
+                elif word == 'uc':
+                    uc_skip = int(arg or 1)
+                elif skipping:
+                    pass
+                elif word in ('par', 'line', 'row', 'sect', 'page'):
+                    out.append('\n')
+                elif word in ('tab', 'cell'):
+                    out.append('\t')
+                elif word == 'u' and arg:
+                    code = int(arg)
+                    out.append(chr(code + 65536 if code < 0 else code))
+                    chars_to_skip = uc_skip
+            elif symbol:
+                if symbol == '*':
+                    pending_skip = True
+                elif not skipping and symbol in '\\{}':
+                    out.append(symbol)
+                elif not skipping and symbol == '~':
+                    out.append(' ')
+                elif not skipping and symbol in '\r\n':
+                    out.append('\n')
+            elif hex_code:
+                if chars_to_skip:
+                    chars_to_skip -= 1
+                elif not skipping:
+                    out.append(bytes([int(hex_code, 16)]).decode('cp1252', errors='ignore'))
+            elif text and not skipping:
+                if chars_to_skip:
+                    skip = min(chars_to_skip, len(text))
+                    text = text[skip:]
+                    chars_to_skip -= skip
+                out.append(text)
+        return ''.join(out)
+
+
+class _HTMLTextParser(HTMLParser):
+    BLOCK_TAGS = {
+        'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        'section', 'article', 'header', 'footer', 'table', 'ul', 'ol',
+    }
+    SKIP_TAGS = {'script', 'style', 'head', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in ('td', 'th'):
+            self.parts.append('\t')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+@register_extractor
+class HtmlExtractor(BaseExtractor):
+    name = 'html'
+    extensions = ('html', 'htm')
+
+    def sniff(self, head, file_path):
+        # Only as the first token: a text CV may well mention <html> further down
+        start = head.lstrip(b'\xef\xbb\xbf \t\r\n')[:16].lower()
+        return start.startswith(b'<!doctype html') or start.startswith(b'<html')
+
+    def extract(self, file_path, host):
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            parser = _HTMLTextParser()
+            parser.feed(f.read())
+            parser.close()
+        return host._clean_text(''.join(parser.parts))
+
+
+@register_extractor
+class DocExtractor(BaseExtractor):
+    """
+    Legacy Word documents (OLE2). .doc files that are really DOCX packages are
+    sniffed as docx before this runs. antiword reads them when it is
+    installed, otherwise printable text runs are recovered from the binary.
+    """
+    name = 'doc'
+    extensions = ('doc',)
+
+    OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+    TEXT_RUN_RE = re.compile(rb'(?:[\x20-\x7e\r\n\t]\x00){4,}|[\x20-\x7e\r\n\t]{6,}')
+
+    def sniff(self, head, file_path):
+        # Excel, PowerPoint and Outlook files share the OLE2 container
+        other_ole = ('.xls', '.ppt', '.msg')
+        return head[:8] == self.OLE_MAGIC and os.path.splitext(file_path)[1].lower() not in other_ole
+
+    def extract(self, file_path, host):
+        antiword = shutil.which('antiword')
+        if antiword:
+            try:
+                result = subprocess.run([antiword, file_path], capture_output=True, timeout=60, check=True)
+                return host._clean_text(result.stdout.decode('utf-8', errors='ignore'))
+            except (subprocess.SubprocessError, OSError) as e:
+                print(f"antiword failed, using raw text recovery: {e}")
+
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        runs = []
+        for run in self.TEXT_RUN_RE.findall(data):
+            runs.append(run.decode('utf-16-le' if run[1:2] == b'\x00' else 'latin-1', errors='ignore'))
+        return host._clean_text("\n".join(runs))
+
+
+@register_extractor
+class ImageExtractor(BaseExtractor):
+    name = 'image'
+    extensions = ('png', 'jpg', 'jpeg', 'tif', 'tiff', 'bmp', 'gif', 'webp')
+    cost = HEAVY
+
+    MAGIC = (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff', b'II*\x00', b'MM\x00*')
+    # Plain text can start with these ("BMW Group...", "GIF89a ..."), so they
+    # only decide the format when the extension does not
+    WEAK_MAGIC = (b'GIF87a', b'GIF89a')
+    BMP_HEADER_SIZES = (12, 40, 52, 56, 64, 108, 124)
+
+    def sniff(self, head, file_path):
+        return (head.startswith(self.MAGIC) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+                or self._is_bmp(head, file_path))
+
+    def sniff_weak(self, head, file_path):
+        return head.startswith(self.WEAK_MAGIC)
+
+    def _is_bmp(self, head, file_path) -> bool:
+        """'BM' plus a file size field matching the file and a known DIB header size"""
+        if len(head) < 18 or head[:2] != b'BM':
+            return False
+        return (int.from_bytes(head[2:6], 'little') == os.path.getsize(file_path)
+                and int.from_bytes(head[14:18], 'little') in self.BMP_HEADER_SIZES)
+
+    def extract(self, file_path, host):
+        return host._clean_text("\n".join(self.iter_chunks(file_path, host)))
+
+    def iter_chunks(self, file_path, host):
+        return host._iter_image_frames(file_path)
+
+
+@register_extractor
+class TxtExtractor(BaseExtractor):
+    name = 'txt'
+    extensions = ('txt', 'text', 'md')
+
+    def extract(self, file_path, host):
+        return host._parse_txt(file_path)
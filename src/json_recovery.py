@@ -0,0 +1,197 @@
+from typing import Any, Tuple
+
+_WHITESPACE = ' \t\r\n'
+_LITERALS = {
+    'true': True, 'false': False, 'null': None,
+    # Python spellings LLMs sometimes emit
+    'True': True, 'False': False, 'None': None,
+}
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class _Stop(Exception):
+    """Raised when input ends or stops making sense; containers keep what they have"""
+
+
+class _TolerantParser:
+    """
+    Recursive-descent JSON parser that salvages as much as it can.
+
+    Objects keep every key whose value parsed completely, arrays keep every
+    complete element, and nested containers that were cut off are kept with
+    their complete members. Trailing commas and Python literals are accepted.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.truncated = False
+
+    def _skip_ws(self):
+        while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+            self.pos += 1
+
+    def _peek(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.text):
+            self.truncated = True
+            raise _Stop()
+        return self.text[self.pos]
+
+    def parse_value(self) -> Any:
+        char = self._peek()
+        if char == '{':
+            return self.parse_object()
+        if char == '[':
+            return self.parse_array()
+        if char == '"':
+            return self.parse_string()
+        if char == '-' or char.isdigit():
+            return self.parse_number()
+        return self.parse_literal()
+
+    def parse_object(self) -> dict:
+        result = {}
+        self.pos += 1  # '{'
+        try:
+            while True:
+                char = self._peek()
+                if char == '}':
+                    self.pos += 1
+                    return result
+                if char == ',':
+                    self.pos += 1
+                    continue
+                if char != '"':
+                    raise _Stop()
+                key = self.parse_string()
+                if self._peek() != ':':
+                    raise _Stop()
+                self.pos += 1
+                try:
+                    result[key] = self.parse_value()
+                except _PartialContainer as partial:
+                    result[key] = partial.value
+                    raise _Stop()
+        except _Stop:
+            raise _PartialContainer(result)
+
+    def parse_array(self) -> list:
+        result = []
+        self.pos += 1  # '['
+        try:
+            while True:
+                char = self._peek()
+                if char == ']':
+                    self.pos += 1
+                    return result
+                if char == ',':
+                    self.pos += 1
+                    continue
+                try:
+                    result.append(self.parse_value())
+                except _PartialContainer as partial:
+                    result.append(partial.value)
+                    raise _Stop()
+        except _Stop:
+            raise _PartialContainer(result)
+
+    def parse_string(self) -> str:
+        self.pos += 1  # opening quote
+        parts = []
+        text = self.text
+        while True:
+            end = self.pos
+            # Copy plain runs in one slice
+            while end < len(text) and text[end] not in '"\\':
+                end += 1
+            parts.append(text[self.pos:end])
+            self.pos = end
+            if end >= len(text):
+                self.truncated = True
+                raise _Stop()
+            if text[end] == '"':
+                self.pos += 1
+                return ''.join(parts)
+            # Backslash escape
+            if end + 1 >= len(text):
+                self.truncated = True
+                raise _Stop()
+            escape = text[end + 1]
+            if escape == 'u':
+                hex_digits = text[end + 2:end + 6]
+                if len(hex_digits) < 4:
+                    self.truncated = True
+                    raise _Stop()
+                try:
+                    parts.append(chr(int(hex_digits, 16)))
+                except ValueError:
+                    raise _Stop()
+                self.pos = end + 6
+            else:
+                parts.append(_ESCAPES.get(escape, escape))
+                self.pos = end + 2
+
+    def parse_number(self):
+        start = self.pos
+        text = self.text
+        while self.pos < len(text) and (text[self.pos].isdigit() or text[self.pos] in '+-.eE'):
+            self.pos += 1
+        if self.pos >= len(text):
+            # A number touching end of input may itself be cut short
+            self.truncated = True
+            raise _Stop()
+        token = text[start:self.pos]
+        try:
+            return int(token)
+        except ValueError:
+            try:
+                return float(token)
+            except ValueError:
+                raise _Stop()
+
+    def parse_literal(self):
+        for word, value in _LITERALS.items():
+            if self.text.startswith(word, self.pos):
+                self.pos += len(word)
+                return value
+        raise _Stop()
+
+
+class _PartialContainer(_Stop):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+def recover_json_object(text: str) -> Tuple[dict, bool]:
+    """
+    Parse the first JSON object in text, salvaging whatever is valid.
+
+    Returns (object, complete). Raises ValueError when there is no object to
+    salvage at all. Surrounding prose and ``` fences are ignored.
+    """
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("No JSON object found in LLM response")
+
+    parser = _TolerantParser(text)
+    parser.pos = start
+    try:
+        return parser.parse_object(), True
+    except _PartialContainer as partial:
+        return partial.value, False
+
+
+def recover_json_array(text: str) -> Tuple[list, bool]:
+    """Like recover_json_object, for a top-level JSON array"""
+    start = text.find('[')
+    if start < 0:
+        raise ValueError("No JSON array found in LLM response")
+
+    parser = _TolerantParser(text)
+    parser.pos = start
+    try:
+        return parser.parse_array(), True
+    except _PartialContainer as partial:
+        return partial.value, False
@@ -0,0 +1,123 @@
+import json
+import os
+import random
+import re
+import time
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from cache import DiskCache, content_hash
+
+
+class CachedResponse:
+    """Minimal stand-in for a Gemini response served from cache"""
+
+    def __init__(self, text: str, from_cache: bool = False):
+        self.text = text
+        self.from_cache = from_cache
+
+    def __iter__(self):
+        # Lets a cached response be consumed like a stream=True response
+        yield self
+
+
+class StubModel:
+    """
+    Local stand-in for a Gemini model, for load tests without quota or network.
+
+    Enabled with CV_LLM_STUB=1. CV_LLM_STUB_LATENCY (seconds, default 0.8) and
+    CV_LLM_STUB_ERROR_RATE (0-1, default 0) shape its behaviour. JSON requests
+    get a canned CV (one per "=== CV <id> ===" block for packed prompts),
+    anything else a job query.
+    """
+
+    CV = {
+        'profession_field': 'Software Engineering', 'experience_years': 5,
+        'education': [{'degree': "Bachelor's", 'field': 'Computer Science', 'institution': 'State University'}],
+        'skills': ['Python', 'SQL', 'Docker'], 'job_titles': ['Software Engineer'],
+        'industries': ['Technology'], 'technical_skills': ['Python', 'PostgreSQL'],
+        'soft_skills': ['Communication'], 'tools_technologies': ['Git', 'Kubernetes'],
+        'certifications': [], 'languages': ['English'], 'key_achievements': [],
+        'education_level': "Bachelor's", 'summary': 'Backend engineer.',
+    }
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.latency = float(os.getenv('CV_LLM_STUB_LATENCY', '0.8'))
+        self.error_rate = float(os.getenv('CV_LLM_STUB_ERROR_RATE', '0'))
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: dict = None, **kwargs):
+        # Jittered latency, like a real endpoint
+        time.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if random.random() < self.error_rate:
+            raise RuntimeError("Stub LLM: simulated 503 Service Unavailable")
+
+        if (generation_config or {}).get('response_mime_type') == 'application/json':
+            ids = re.findall(r'=== (?:CV|Profile) (\S+) ===', prompt)
+            if '=== Profile' in prompt:
+                text = json.dumps([{'id': cv_id, 'query': 'Software Engineer Python SQL'} for cv_id in ids])
+            elif ids:
+                text = json.dumps([{'id': cv_id, **self.CV} for cv_id in ids])
+            else:
+                text = json.dumps(self.CV)
+        else:
+            text = 'Software Engineer Python SQL Docker'
+
+        response = CachedResponse(text)
+        return iter([response]) if stream else response
+
+
+class LLMClient:
+    """
+    Thin wrapper around genai.GenerativeModel with the same generate_content API.
+
+    Responses are memoized in an optional shared DiskCache keyed by model name
+    and prompt, so identical prompts are answered once across all workers.
+    Each client sends its calls with its own API key: genai.configure would
+    set one key for the whole process, shared by every caller's pipeline.
+    """
+
+    def __init__(self, api_key: str, model_name: str, cache: DiskCache = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._client_pid = None
+        if os.getenv('CV_LLM_STUB') == '1':
+            self.model = StubModel(model_name)
+        else:
+            self.model = genai.GenerativeModel(model_name)
+        self.cache = cache
+
+    def _model(self):
+        # The transport is opened on first use in each process, so this is safe to build before forking
+        if isinstance(self.model, genai.GenerativeModel) and self._client_pid != os.getpid():
+            self.model._client = glm.GenerativeServiceClient(client_options={'api_key': self.api_key})
+            self._client_pid = os.getpid()
+        return self.model
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        """Generate content, serving repeated prompts from the cache"""
+        key = None
+        if self.cache is not None:
+            key = content_hash(self.model_name, prompt, repr(sorted(kwargs.items())))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return CachedResponse(cached, from_cache=True)
+
+        if stream:
+            return self._stream_and_store(key, prompt, **kwargs)
+
+        response = self._model().generate_content(prompt, **kwargs)
+        if key is not None:
+            self.cache.set(key, response.text)
+        return response
+
+    def _stream_and_store(self, key: str, prompt: str, **kwargs):
+        """Pass streamed chunks through, caching the full text once complete"""
+        parts = []
+        for chunk in self._model().generate_content(prompt, stream=True, **kwargs):
+            try:
+                parts.append(chunk.text)
+            except ValueError:
+                pass
+            yield chunk
+        if key is not None:
+            self.cache.set(key, ''.join(parts))
@@ -1,12 +1,18 @@
 
 
 
-import google.generativeai as genai
-import json
 import os
 import re
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from cache import DiskCache
+from model_router import ModelRouter, STANDARD
+from usage import UsageLedger
+from tenure import TenureEngine
+from llm_policy import LLMPolicy, FULL, FIELDS, SKIP
+from json_recovery import recover_json_array, recover_json_object
+from metrics import METRICS
+from taxonomy import TAXONOMY
 # from config.prompts import UNIVERSAL_EXTRACTION_PROMPT
 
 
@@ -99,6 +105,92 @@ Return ONLY the search query text, no explanations or additional text.
 
 
 
+FIELD_EXTRACTION_PROMPT = """
+Extract ONLY the following fields from the resume below, using the same
+meaning as a full CV extraction (lists of strings for list fields, a number
+for experience_years, a list of {{"degree", "field", "institution"}} objects
+for education).
+
+FIELDS:
+{fields}
+
+RESUME TEXT:
+{cv_text}
+
+Return ONLY a valid JSON object whose keys are exactly the fields listed above.
+"""
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+
+# Structured-output schema mirroring UniversalCVData (Gemini takes an OpenAPI subset)
+CV_RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'profession_field': {'type': 'string'},
+        'experience_years': {'type': 'number'},
+        'education': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'degree': {'type': 'string'},
+                    'field': {'type': 'string'},
+                    'institution': {'type': 'string'},
+                },
+            },
+        },
+        'skills': _STRING_LIST,
+        'job_titles': _STRING_LIST,
+        'industries': _STRING_LIST,
+        'technical_skills': _STRING_LIST,
+        'soft_skills': _STRING_LIST,
+        'tools_technologies': _STRING_LIST,
+        'certifications': _STRING_LIST,
+        'languages': _STRING_LIST,
+        'key_achievements': _STRING_LIST,
+        'education_level': {'type': 'string'},
+        'summary': {'type': 'string'},
+    },
+    'required': ['profession_field', 'experience_years', 'skills', 'job_titles'],
+}
+
+CV_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': CV_RESPONSE_SCHEMA,
+}
+
+BATCH_EXTRACTION_PROMPT = """
+You are an expert at extracting structured information from resumes/CVs of ALL professions.
+
+Below are {count} resumes. Each starts with a line "=== CV <id> ===".
+Extract every resume independently; never mix information between them.
+
+For each resume return an object with its "id" and these fields:
+profession_field, experience_years (number), education (list of {{"degree", "field", "institution"}}),
+skills, job_titles, industries, technical_skills, soft_skills, tools_technologies,
+certifications, languages, key_achievements (all lists of strings),
+education_level, summary (strings).
+
+Return ONLY a JSON array with exactly one object per resume.
+
+{cvs}
+"""
+
+# Prompt scaffolding cost counted against the batch token budget
+BATCH_PROMPT_TOKENS = 250
+
+BATCH_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'array',
+        'items': {
+            **CV_RESPONSE_SCHEMA,
+            'properties': {'id': {'type': 'string'}, **CV_RESPONSE_SCHEMA['properties']},
+            'required': ['id'] + CV_RESPONSE_SCHEMA['required'],
+        },
+    },
+}
+
 class UniversalCVData(BaseModel):
     profession_field: str = "Professional"
     experience_years: float = 0.0
@@ -116,54 +208,394 @@ class UniversalCVData(BaseModel):
     summary: str = ""
 
 class UniversalParser:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, llm_cache: DiskCache = None, policy: LLMPolicy = None,
+                 ledger: UsageLedger = None):
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
         if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
+            self.router = ModelRouter(self.api_key, llm_cache=llm_cache, ledger=ledger)
         else:
-            self.model = None
+            self.router = None
+        self.policy = policy or LLMPolicy.from_env()
     
-    def parse_cv(self, cv_text: str, sections: Dict[str, str] = None) -> UniversalCVData:
+    def parse_cv(self, cv_text: str, sections: Dict[str, str] = None, ocr_used: bool = False) -> UniversalCVData:
         """Parse CV text with robust fallback methods"""
+        rule_result, confidence = self._truly_universal_parse_with_confidence(cv_text, sections)
         
-        # First try LLM parsing if API key is available
-        if self.model:
+        # Only consult the LLM when the policy says the rule-based result isn't good enough,
+        # and the tenant still has budget
+        if self.router and self.router.within_budget():
+            decision, low_fields = self.policy.decide(confidence)
             try:
-                llm_result = self._parse_with_llm(cv_text)
-                if llm_result and (llm_result.experience_years > 0 or llm_result.skills or llm_result.job_titles):
-                    return llm_result
+                if decision == FULL:
+                    tier = self._route(cv_text, sections, ocr_used, confidence)
+                    llm_result = self._parse_with_llm(cv_text, tier)
+                    if self._is_useful_result(llm_result):
+                        return self._merge_with_rules(llm_result, rule_result)
+                elif decision == FIELDS:
+                    tier = self._route(cv_text, sections, ocr_used, confidence)
+                    return self._parse_fields_with_llm(cv_text, low_fields, rule_result, tier)
             except Exception as e:
                 print(f"LLM parsing failed: {e}")
         
         # Use enhanced rule-based parsing as fallback
-        return self._truly_universal_parse(cv_text)
+        return rule_result
+    
+    def parse_cv_stream(self, cv_text: str, sections: Dict[str, str] = None,
+                        fallback: UniversalCVData = None, ocr_used: bool = False):
+        """Parse CV text, yielding ('llm_chunk', text) events and a final ('parsed', data)"""
+        # Reuse the caller's fast rule-based parse when there is one
+        rule_result = fallback or self._truly_universal_parse(cv_text)
+        confidence = self._field_confidence(rule_result, cv_text.lower(), sections or {})
+        
+        if self.router and self.router.within_budget():
+            decision, low_fields = self.policy.decide(confidence)
+            try:
+                if decision == FULL:
+                    tier = self._route(cv_text, sections, ocr_used, confidence)
+                    chunks = []
+                    for chunk in self._stream_llm(cv_text, tier):
+                        chunks.append(chunk)
+                        yield 'llm_chunk', chunk
+                    try:
+                        llm_result = self._cv_data_from_response(''.join(chunks))
+                    except Exception as e:
+                        # Escalate with a regular call when the streamed JSON doesn't validate
+                        next_tier = self.router.escalate(tier)
+                        if next_tier is None:
+                            raise
+                        print(f"Streamed LLM response failed validation ({e}), escalating to {next_tier}")
+                        llm_result = self._parse_with_llm(cv_text, next_tier)
+                    if self._is_useful_result(llm_result):
+                        yield 'parsed', self._merge_with_rules(llm_result, rule_result)
+                        return
+                elif decision == FIELDS:
+                    tier = self._route(cv_text, sections, ocr_used, confidence)
+                    yield 'parsed', self._parse_fields_with_llm(cv_text, low_fields, rule_result, tier)
+                    return
+            except Exception as e:
+                print(f"LLM streaming parse failed: {e}")
+        
+        yield 'parsed', rule_result
     
-    def _parse_with_llm(self, cv_text: str) -> UniversalCVData:
-        """Parse using Gemini LLM"""
-        prompt = UNIVERSAL_EXTRACTION_PROMPT.format(
+    def parse_batch(self, cv_texts: List[str], sections_list: List[Dict[str, str]] = None,
+                    ocr_flags: List[bool] = None, token_budget: int = None,
+                    max_per_call: int = None) -> List[UniversalCVData]:
+        """
+        Parse many CVs, packing several into each LLM call to save requests-per-minute quota.
+        
+        CVs are routed to a tier individually, then packed per tier within the
+        input token budget. Anything missing or invalid in a packed response is
+        split in half and retried, down to single-CV calls.
+        """
+        count = len(cv_texts)
+        sections_list = sections_list or [None] * count
+        ocr_flags = ocr_flags or [False] * count
+        token_budget = token_budget or int(os.getenv('CV_BATCH_TOKEN_BUDGET', '24000'))
+        max_per_call = max_per_call or int(os.getenv('CV_BATCH_MAX_PER_CALL', '8'))
+        
+        # Classify every CV's profession with one matrix product
+        profession_scores = TAXONOMY.current().classifier('professions').scores([text.lower() for text in cv_texts])
+        
+        results = []
+        by_tier = {}
+        use_llm = self.router is not None and self.router.within_budget()
+        for index, cv_text in enumerate(cv_texts):
+            rule_result, confidence = self._truly_universal_parse_with_confidence(
+                cv_text, sections_list[index], profession_scores[index])
+            results.append(rule_result)
+            if use_llm and self.policy.decide(confidence)[0] != SKIP:
+                tier = self._route(cv_text, sections_list[index], ocr_flags[index], confidence)
+                by_tier.setdefault(tier, []).append(index)
+        
+        for tier, indices in by_tier.items():
+            for pack in self._pack_cvs(indices, cv_texts, token_budget, max_per_call):
+                self._parse_pack(pack, cv_texts, results, tier)
+        return results
+    
+    def _pack_cvs(self, indices: List[int], cv_texts: List[str], token_budget: int, max_per_call: int) -> List[List[int]]:
+        """Greedily group CVs so each call stays within the token budget"""
+        packs, current, used = [], [], BATCH_PROMPT_TOKENS
+        for index in indices:
+            # ~4 characters per token for the truncated CV text, plus its delimiter line
+            cost = len(cv_texts[index][:3000]) // 4 + 10
+            if current and (used + cost > token_budget or len(current) >= max_per_call):
+                packs.append(current)
+                current, used = [], BATCH_PROMPT_TOKENS
+            current.append(index)
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+    
+    def _parse_pack(self, pack: List[int], cv_texts: List[str], results: List[UniversalCVData], tier: str):
+        """One packed call; missing or invalid entries are split and retried"""
+        if len(pack) == 1:
+            index = pack[0]
+            try:
+                llm_result = self._parse_with_llm(cv_texts[index], tier)
+                if self._is_useful_result(llm_result):
+                    results[index] = self._merge_with_rules(llm_result, results[index])
+            except Exception as e:
+                print(f"LLM parsing failed: {e}")
+            return
+        
+        METRICS.incr('llm_batch_calls', tier=tier)
+        METRICS.observe('llm_batch_size', len(pack))
+        cvs = "\n\n".join(f"=== CV cv_{index} ===\n{cv_texts[index][:3000]}" for index in pack)
+        prompt = BATCH_EXTRACTION_PROMPT.format(count=len(pack), cvs=cvs)
+        
+        parsed = {}
+        try:
+            response = self.router.generate_content(prompt, tier=tier, generation_config=BATCH_GENERATION_CONFIG)
+            parsed = self._parse_packed_response(response.text)
+        except Exception as e:
+            print(f"Packed LLM call for {len(pack)} CVs failed: {e}")
+        
+        # Only entries that are absent or failed validation are retried; a valid but sparse
+        # answer is what a single call would return too, so it keeps the rule-based parse
+        missing = []
+        for index in pack:
+            llm_result = parsed.get(f"cv_{index}")
+            if llm_result is None:
+                missing.append(index)
+            elif self._is_useful_result(llm_result):
+                results[index] = self._merge_with_rules(llm_result, results[index])
+        
+        # Splitting only helps while the tenant has budget left
+        if missing and self.router.within_budget():
+            METRICS.incr('llm_batch_retried_cvs', len(missing))
+            half = (len(missing) + 1) // 2
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    self._parse_pack(part, cv_texts, results, tier)
+    
+    def _parse_packed_response(self, response_text: str) -> Dict[str, UniversalCVData]:
+        """Map each id in a packed response to its validated CV data"""
+        items, complete = recover_json_array(response_text)
+        parsed = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get('id'), str):
+                continue
+            cv_id = item.pop('id')
+            # Only the final item of a truncated array can be partial
+            item_complete = complete or position < len(items) - 1
+            try:
+                parsed[cv_id] = self._cv_data_from_dict(item, item_complete)
+            except ValueError:
+                continue
+        return parsed
+    
+    def patch_with_rules(self, cv_data: UniversalCVData, cv_text: str) -> UniversalCVData:
+        """
+        Adapt a near-duplicate's parse to this text without the LLM. Only the
+        profession and the vocabulary items that also occur in this text carry
+        over; every other field (names, titles, summary, education, tenure) is
+        re-derived from this text, so nothing is copied from the other document.
+        """
+        rules = self._truly_universal_parse(cv_text)
+        text_lower = cv_text.lower()
+        patched = rules.dict()
+        for field in ('skills', 'technical_skills', 'tools_technologies', 'soft_skills', 'languages', 'industries'):
+            kept = [item for item in getattr(cv_data, field) if item.lower() in text_lower]
+            known = {item.lower() for item in kept}
+            patched[field] = kept + [item for item in getattr(rules, field) if item.lower() not in known]
+        patched['profession_field'] = cv_data.profession_field
+        return UniversalCVData(**patched)
+    
+    def _route(self, cv_text: str, sections: Dict[str, str], ocr_used: bool, confidence: Dict[str, float]) -> str:
+        """Pick the model tier for this CV"""
+        return self.router.classify(
+            text_length=len(cv_text),
+            section_count=len(sections or {}),
+            ocr_used=ocr_used,
+            confidence=self.policy.overall_confidence(confidence),
+        )
+    
+    def _merge_with_rules(self, llm_result: UniversalCVData, rule_result: UniversalCVData) -> UniversalCVData:
+        """Fill fields the LLM didn't return (or returned invalid) from the rule-based parse"""
+        return UniversalCVData(**{**rule_result.dict(), **llm_result.dict(exclude_unset=True)})
+    
+    def _is_useful_result(self, result: UniversalCVData) -> bool:
+        """Check whether an LLM result carries enough information to keep"""
+        return bool(result and (result.experience_years > 0 or result.skills or result.job_titles))
+    
+    def _build_extraction_prompt(self, cv_text: str) -> str:
+        """Build the extraction prompt for a CV"""
+        return UNIVERSAL_EXTRACTION_PROMPT.format(
             cv_text=cv_text[:3000]  # Limit text length for LLM
         )
+    
+    def _parse_with_llm(self, cv_text: str, tier: str = STANDARD) -> UniversalCVData:
+        """Parse using Gemini LLM, escalating tiers if the JSON doesn't validate"""
+        prompt = self._build_extraction_prompt(cv_text)
+        return self.router.generate_validated(
+            prompt, tier, self._cv_data_from_response, generation_config=CV_GENERATION_CONFIG
+        )
+    
+    def _stream_llm(self, cv_text: str, tier: str = STANDARD):
+        """Stream the Gemini response text chunk by chunk"""
+        prompt = self._build_extraction_prompt(cv_text)
+        
+        for chunk in self.router.generate_content(
+                prompt, tier=tier, stream=True, generation_config=CV_GENERATION_CONFIG):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata) raise on .text
+                continue
+            if text:
+                yield text
+    
+    def _cv_data_from_response(self, response_text: str, fields=None) -> UniversalCVData:
+        """
+        Turn raw LLM response text into structured CV data.
+        
+        Truncated or malformed JSON is parsed tolerantly and every field that
+        validates on its own is kept; only the fields actually recovered are
+        marked as set, so callers can fill the rest from the rule-based parse.
+        """
+        data, complete = recover_json_object(response_text)
+        return self._cv_data_from_dict(data, complete, fields)
+    
+    def _cv_data_from_dict(self, data: Dict[str, Any], complete: bool, fields=None) -> UniversalCVData:
+        """Validate a (possibly partial) decoded object field by field"""
+        if not complete and data:
+            # The last key is the one that was cut off; an empty container there carries no information
+            last_key = next(reversed(data))
+            if data[last_key] in ([], {}):
+                del data[last_key]
+        valid = self._salvage_cv_fields(data, fields)
+        
+        if not valid:
+            METRICS.incr('llm_json_wasted')
+            raise ValueError("No valid CV fields in LLM response")
+        dropped = len(data) - len(valid)
+        if complete and not dropped:
+            METRICS.incr('llm_json_complete')
+        else:
+            METRICS.incr('llm_json_salvaged')
+            METRICS.incr('llm_json_fields_dropped', dropped)
+        return UniversalCVData(**valid)
+    
+    def _salvage_cv_fields(self, data: Dict[str, Any], fields=None) -> Dict[str, Any]:
+        """Keep the fields that validate against UniversalCVData individually"""
+        valid = {}
+        for field, value in data.items():
+            if field not in UniversalCVData.__fields__ or (fields and field not in fields):
+                continue
+            value = self._coerce_field(field, value)
+            try:
+                UniversalCVData(**{field: value})
+            except Exception:
+                continue
+            valid[field] = value
+        return valid
+    
+    def _coerce_field(self, field: str, value: Any) -> Any:
+        """Repair common near-misses: '5+ years' for a number, mixed-type lists"""
+        if field == 'experience_years' and isinstance(value, str):
+            match = re.search(r'\d+(?:\.\d+)?', value)
+            return float(match.group()) if match else value
+        if field == 'education' and isinstance(value, list):
+            return [
+                {k: str(v) for k, v in entry.items() if v is not None}
+                for entry in value if isinstance(entry, dict)
+            ]
+        if isinstance(value, list):
+            return [str(item) for item in value if isinstance(item, (str, int, float))]
+        return value
+    
+    def _parse_fields_with_llm(self, cv_text: str, fields: List[str], base: UniversalCVData,
+                               tier: str = STANDARD) -> UniversalCVData:
+        """Ask the LLM only for low-confidence fields and merge them into the rule-based result"""
+        field_list = "\n".join(f"- {field}" for field in fields)
+        prompt = FIELD_EXTRACTION_PROMPT.format(cv_text=cv_text[:3000], fields=field_list)
+        generation_config = {
+            'response_mime_type': 'application/json',
+            'response_schema': {
+                'type': 'object',
+                'properties': {field: CV_RESPONSE_SCHEMA['properties'][field] for field in fields},
+            },
+        }
+        
+        llm_result = self.router.generate_validated(
+            prompt, tier, lambda text: self._cv_data_from_response(text, fields),
+            generation_config=generation_config,
+        )
+        return self._merge_with_rules(llm_result, base)
+    
+    def _truly_universal_parse_with_confidence(self, cv_text: str, sections: Dict[str, str] = None,
+                                               profession_scores=None):
+        """Rule-based parse plus a 0-1 confidence score per field"""
+        text_lower = cv_text.lower()
+        if profession_scores is None:
+            profession_scores = TAXONOMY.current().classifier('professions').scores([text_lower])[0]
+        result = self._truly_universal_parse(cv_text, profession_scores)
+        return result, self._field_confidence(result, text_lower, sections or {}, profession_scores)
+    
+    def _field_confidence(self, data: UniversalCVData, text_lower: str, sections: Dict[str, str],
+                          profession_scores=None) -> Dict[str, float]:
+        """Heuristic confidence that each rule-based field is right"""
+        # Profession: clear winner among keyword categories
+        scores = sorted(self._profession_scores(text_lower, profession_scores).values(), reverse=True)
+        if not scores:
+            profession = 0.1
+        else:
+            margin = scores[0] - (scores[1] if len(scores) > 1 else 0)
+            profession = min(0.9, 0.4 + 0.1 * scores[0] + 0.1 * margin)
+        
+        if data.experience_years > 0:
+            experience = 0.75
+        else:
+            # Zero is plausible for graduates, suspicious if there is an experience section
+            experience = 0.2 if 'experience' in sections else 0.5
         
-        response = self.model.generate_content(prompt)
-        result_text = response.text.strip()
+        skills = 0.8 if len(data.skills) >= 5 and 'skills' in sections else 0.6 if len(data.skills) >= 3 else 0.2
         
-        # Extract JSON from response
-        json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group()
-            result_data = json.loads(json_str)
-            return UniversalCVData(**result_data)
+        # Title detection is loose (any title-cased line), so cap it unless sections back it up
+        if not data.job_titles:
+            job_titles = 0.1
+        elif 'experience' in sections:
+            job_titles = 0.7
         else:
-            raise ValueError("No JSON found in LLM response")
+            job_titles = 0.4
+        
+        explicit_degree = re.search(r'\b(?:phd|doctorate|master|bachelor|mba|associate degree|diploma)\b', text_lower)
+        education_level = 0.8 if explicit_degree and data.education_level != "Unknown" else 0.3
+        education = 0.7 if any(e.get('degree') != "Unknown" for e in data.education) else 0.3
+        
+        # Keyword-list fields are precise when they match; an empty list is usually simply
+        # correct, unless the CV has a section for that field that the rules did not read
+        def listed(values, section=None):
+            if values:
+                return 0.7
+            return 0.3 if section in sections else 0.6
+        
+        return {
+            'profession_field': profession,
+            'experience_years': experience,
+            'education': education,
+            'skills': skills,
+            'job_titles': job_titles,
+            'industries': listed(data.industries),
+            'technical_skills': listed(data.technical_skills),
+            'soft_skills': listed(data.soft_skills),
+            'tools_technologies': listed(data.tools_technologies),
+            'certifications': listed(data.certifications, 'certifications'),
+            'languages': listed(data.languages, 'languages'),
+            'key_achievements': listed(data.key_achievements, 'awards'),
+            'education_level': education_level,
+            # Without a summary section the opening lines are as good a summary as any
+            'summary': 0.7 if 'summary' in sections else 0.6,
+        }
     
-    def _truly_universal_parse(self, cv_text: str) -> UniversalCVData:
+    def _truly_universal_parse(self, cv_text: str, profession_scores=None) -> UniversalCVData:
         """Truly universal parsing for ALL professions"""
         text_lower = cv_text.lower()
         lines = [line.strip() for line in cv_text.split('\n') if line.strip()]
         
         return UniversalCVData(
-            profession_field=self._detect_profession_universal(text_lower, lines),
+            profession_field=self._detect_profession_universal(text_lower, lines, profession_scores),
             experience_years=self._extract_experience_universal(text_lower, lines),
             education=self._extract_education_universal(lines),
             skills=self._extract_skills_universal(text_lower, lines),
@@ -179,119 +611,34 @@ class UniversalParser:
             summary=self._generate_summary_universal(cv_text)
         )
     
-    def _detect_profession_universal(self, text_lower: str, lines: List[str]) -> str:
+    def _profession_scores(self, text_lower: str, scores=None) -> Dict[str, int]:
+        """Keyword hit count per profession category"""
+        # Keyword vocabularies live in config/taxonomy.yaml
+        classifier = TAXONOMY.current().classifier('professions')
+        if scores is None:
+            scores = classifier.scores([text_lower])[0]
+        return classifier.hit_counts(scores)
+    
+    def _detect_profession_universal(self, text_lower: str, lines: List[str], scores=None) -> str:
         """Detect profession from ANY field"""
-        profession_categories = {
-            # Engineering & Technical
-            'Civil Engineering': ['civil engineer', 'structural engineer', 'construction', 'infrastructure', 'cad technician', 'site engineer'],
-            'Electrical Engineering': ['electrical engineer', 'electronics engineer', 'power systems', 'circuit design', 'embedded systems'],
-            'Mechanical Engineering': ['mechanical engineer', 'manufacturing engineer', 'cad designer', 'solidworks', 'thermodynamics'],
-            'Software Engineering': ['software engineer', 'developer', 'programmer', 'full stack', 'frontend', 'backend'],
-            
-            # Healthcare & Medical
-            'Healthcare': ['registered nurse', 'nurse practitioner', 'medical doctor', 'physician', 'healthcare', 'patient care'],
-            'Dentistry': ['dentist', 'dental hygienist', 'orthodontist', 'dental assistant'],
-            'Pharmacy': ['pharmacist', 'pharmacy technician', 'pharmaceutical'],
-            'Therapy': ['physical therapist', 'occupational therapist', 'speech therapist'],
-            
-            # Business & Finance
-            'Finance': ['financial analyst', 'accountant', 'cpa', 'investment banker', 'wealth management'],
-            'Accounting': ['accountant', 'auditor', 'bookkeeper', 'tax specialist'],
-            'Banking': ['banker', 'loan officer', 'branch manager', 'financial advisor'],
-            
-            # Management & Administration
-            'Management': ['project manager', 'operations manager', 'general manager', 'team lead'],
-            'HR': ['hr manager', 'recruiter', 'talent acquisition', 'human resources'],
-            'Administration': ['administrative assistant', 'office manager', 'executive assistant'],
-            
-            # Education
-            'Education': ['teacher', 'professor', 'educator', 'faculty', 'instructor', 'curriculum'],
-            'Academic Research': ['researcher', 'research assistant', 'scientist', 'postdoc'],
-            
-            # Creative & Design
-            'Design': ['graphic designer', 'ux designer', 'ui designer', 'creative director'],
-            'Marketing': ['marketing manager', 'digital marketing', 'brand manager', 'seo specialist'],
-            'Writing': ['writer', 'content writer', 'copywriter', 'technical writer'],
-            
-            # Sales & Customer Service
-            'Sales': ['sales representative', 'account executive', 'business development', 'sales manager'],
-            'Customer Service': ['customer service', 'client support', 'help desk', 'service representative'],
-            
-            # Legal
-            'Legal': ['lawyer', 'attorney', 'paralegal', 'legal assistant', 'counsel'],
-            
-            # Skilled Trades
-            'Construction Trades': ['carpenter', 'electrician', 'plumber', 'welder', 'contractor'],
-            'Automotive': ['auto mechanic', 'technician', 'automotive engineer'],
-            
-            # Science & Research
-            'Science': ['biologist', 'chemist', 'physicist', 'research scientist', 'lab technician'],
-        }
-        
-        # Score professions based on keyword matches
-        profession_scores = {}
-        for profession, keywords in profession_categories.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            if score > 0:
-                profession_scores[profession] = score
-        
-        if profession_scores:
-            return max(profession_scores.items(), key=lambda x: x[1])[0]
-        
-        return "Professional"
+        classifier = TAXONOMY.current().classifier('professions')
+        if scores is None:
+            scores = classifier.scores([text_lower])[0]
+        return classifier.label(scores, "Professional")
     
     def _extract_experience_universal(self, text_lower: str, lines: List[str]) -> float:
         """Extract years of experience for any profession"""
-        # Direct year patterns
-        patterns = [
-            r'(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*yrs?',
-            r'experience.*?(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*years?.*experience',
-        ]
-        
-        max_years = 0
-        for pattern in patterns:
-            matches = re.findall(pattern, text_lower)
-            for match in matches:
-                try:
-                    years = float(match)
-                    max_years = max(max_years, years)
-                except:
-                    continue
-        
-        # Date range analysis
-        date_pattern = r'(\d{4})\s*[-–]\s*(\d{4}|present|current|now)'
-        date_matches = re.findall(date_pattern, text_lower)
-        if date_matches:
-            total_years = 0
-            for start, end in date_matches:
-                try:
-                    if end in ['present', 'current', 'now']:
-                        end_year = 2024
-                    else:
-                        end_year = int(end)
-                    start_year = int(start)
-                    total_years += (end_year - start_year)
-                except:
-                    continue
-            if total_years > 0:
-                max_years = max(max_years, total_years)
-        
-        return max_years
+        # Linear-time tokenizer: explicit "N years" mentions plus merged date ranges
+        return TenureEngine().extract_years(text_lower)
     
     def _extract_education_universal(self, lines: List[str]) -> List[Dict[str, str]]:
         """Extract education information for any field"""
         education = []
-        education_keywords = [
-            'university', 'college', 'institute', 'school', 'academy',
-            'bachelor', 'master', 'phd', 'doctorate', 'mba', 
-            'degree', 'diploma', 'certificate', 'graduated'
-        ]
+        taxonomy = TAXONOMY.current()
         
         for i, line in enumerate(lines):
             line_lower = line.lower()
-            if any(keyword in line_lower for keyword in education_keywords):
+            if taxonomy.contains_any('education_keywords', line_lower):
                 # Extract degree type
                 degree = "Unknown"
                 degree_patterns = {
@@ -320,36 +667,17 @@ class UniversalParser:
         """Extract skills for ANY profession"""
         skills = set()
         
-        # Universal professional skills
-        universal_skills = [
-            'project management', 'team leadership', 'communication', 'problem solving',
-            'analytical skills', 'strategic planning', 'budget management', 'client relations',
-            'research', 'training', 'mentoring', 'quality assurance', 'process improvement',
-            'teamwork', 'collaboration', 'critical thinking', 'time management', 'organization',
-            'public speaking', 'presentation skills', 'negotiation', 'decision making'
-        ]
+        taxonomy = TAXONOMY.current()
         
         # Add matching universal skills
-        for skill in universal_skills:
-            if skill in text_lower:
-                skills.add(skill.title())
-        
-        # Field-specific skills patterns
-        field_skills = {
-            'engineering': ['cad design', 'structural analysis', 'circuit design', 'system integration'],
-            'healthcare': ['patient care', 'medical terminology', 'clinical skills', 'health assessment'],
-            'finance': ['financial analysis', 'accounting', 'budgeting', 'financial reporting'],
-            'education': ['curriculum development', 'classroom management', 'lesson planning', 'student assessment'],
-            'sales': ['sales techniques', 'client acquisition', 'account management', 'sales forecasting'],
-            'design': ['design principles', 'color theory', 'typography', 'layout design']
-        }
+        for skill in taxonomy.hits('universal_skills', text_lower):
+            skills.add(skill.title())
         
         # Add field-specific skills
-        for field, field_skill_list in field_skills.items():
+        for field, field_skill_list in taxonomy.group_hits('field_skills', text_lower).items():
             if field in text_lower:
                 for skill in field_skill_list:
-                    if skill in text_lower:
-                        skills.add(skill.title())
+                    skills.add(skill.title())
         
         # Extract from skills section
         for i, line in enumerate(lines):
@@ -368,15 +696,7 @@ class UniversalParser:
         """Extract job titles from any profession"""
         titles = set()
         
-        # Common job title patterns across all fields
-        title_indicators = [
-            'manager', 'director', 'coordinator', 'specialist', 'analyst', 
-            'engineer', 'consultant', 'assistant', 'associate', 'officer',
-            'supervisor', 'lead', 'head', 'chief', 'president', 'vice president',
-            'teacher', 'instructor', 'professor', 'researcher', 'scientist',
-            'technician', 'therapist', 'nurse', 'doctor', 'dentist',
-            'designer', 'writer', 'editor', 'producer', 'artist'
-        ]
+        taxonomy = TAXONOMY.current()
         
         for line in lines:
             line_stripped = line.strip()
@@ -384,7 +704,7 @@ class UniversalParser:
                 line_lower = line_stripped.lower()
                 
                 # Check if line contains title indicators
-                if any(indicator in line_lower for indicator in title_indicators):
+                if taxonomy.contains_any('title_indicators', line_lower):
                     titles.add(line_stripped)
                 
                 # Check for title-like patterns (capitalized, not sentences)
@@ -396,117 +716,45 @@ class UniversalParser:
     
     def _extract_industries_universal(self, text_lower: str) -> List[str]:
         """Extract industries from any field"""
-        industries = set()
-        
-        industry_keywords = {
-            'Technology': ['technology', 'software', 'it', 'tech', 'saas', 'hardware'],
-            'Finance': ['finance', 'banking', 'investment', 'financial services', 'insurance'],
-            'Healthcare': ['healthcare', 'medical', 'hospital', 'pharmaceutical', 'biotech'],
-            'Education': ['education', 'academic', 'school', 'university', 'learning'],
-            'Manufacturing': ['manufacturing', 'production', 'industrial', 'factory'],
-            'Construction': ['construction', 'building', 'real estate', 'property'],
-            'Retail': ['retail', 'e-commerce', 'consumer goods', 'merchandise'],
-            'Consulting': ['consulting', 'professional services', 'advisory'],
-            'Government': ['government', 'public sector', 'federal', 'state', 'municipal'],
-            'Non-profit': ['non-profit', 'nonprofit', 'charity', 'ngo'],
-            'Hospitality': ['hospitality', 'hotel', 'restaurant', 'tourism'],
-            'Transportation': ['transportation', 'logistics', 'shipping', 'supply chain'],
-            'Energy': ['energy', 'utilities', 'oil', 'gas', 'renewable'],
-            'Media': ['media', 'entertainment', 'publishing', 'broadcast'],
-            'Legal': ['legal', 'law firm', 'attorney', 'courthouse']
-        }
-        
-        for industry, keywords in industry_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                industries.add(industry)
+        industries = set(TAXONOMY.current().group_hits('industries', text_lower))
         
         return list(industries)
     
     def _extract_technical_skills_universal(self, text_lower: str) -> List[str]:
         """Extract technical skills for any profession (not just IT)"""
-        technical_skills = set()
-        
-        # Software & IT (for all professions)
-        software_skills = [
-            'microsoft office', 'excel', 'word', 'powerpoint', 'outlook',
-            'google workspace', 'sheets', 'docs', 'slides',
-            'quickbooks', 'salesforce', 'sap', 'oracle'
-        ]
-        
-        # Engineering tools
-        engineering_tools = ['autocad', 'revit', 'solidworks', 'matlab', 'ansys', 'catia']
-        
-        # Design tools
-        design_tools = ['photoshop', 'illustrator', 'indesign', 'figma', 'sketch', 'canva']
-        
-        # Healthcare systems
-        healthcare_systems = ['epic', 'cerner', 'meditech', 'ehr', 'electronic health records']
-        
-        # Add relevant technical skills based on content
-        all_technical = software_skills + engineering_tools + design_tools + healthcare_systems
-        for skill in all_technical:
-            if skill in text_lower:
-                technical_skills.add(skill.title())
+        technical_skills = {skill.title() for skill in TAXONOMY.current().hits('technical_skills', text_lower)}
         
         return list(technical_skills)[:10]
     
     def _extract_soft_skills_universal(self, text_lower: str) -> List[str]:
         """Extract soft skills applicable to all professions"""
-        soft_skills = [
-            'communication', 'leadership', 'teamwork', 'problem solving', 'critical thinking',
-            'adaptability', 'time management', 'creativity', 'collaboration', 'negotiation',
-            'presentation', 'public speaking', 'interpersonal', 'emotional intelligence',
-            'conflict resolution', 'decision making', 'strategic thinking', 'coaching',
-            'mentoring', 'customer service', 'client management', 'stakeholder management'
-        ]
-        
-        return [skill.title() for skill in soft_skills if skill in text_lower]
+        return [skill.title() for skill in TAXONOMY.current().hits('soft_skills', text_lower)]
     
     def _extract_tools_universal(self, text_lower: str) -> List[str]:
         """Extract tools and technologies for any profession"""
         tools = set()
-        
-        # Universal office tools
-        office_tools = [
-            'microsoft office', 'google workspace', 'slack', 'teams', 'zoom',
-            'sharepoint', 'onedrive', 'dropbox', 'asana', 'trello', 'jira'
-        ]
-        
-        # Industry-specific tools
-        industry_tools = {
-            'engineering': ['autocad', 'revit', 'solidworks', 'matlab', 'ansys', 'arcgis'],
-            'design': ['photoshop', 'illustrator', 'indesign', 'figma', 'sketch', 'canva'],
-            'healthcare': ['epic', 'cerner', 'meditech', 'ehr', 'pharmacy software'],
-            'finance': ['quickbooks', 'sage', 'xero', 'bloomberg', 'reuters'],
-            'education': ['blackboard', 'canvas', 'moodle', 'learning management system']
-        }
+        taxonomy = TAXONOMY.current()
         
         # Add office tools
-        for tool in office_tools:
-            if tool in text_lower:
-                tools.add(tool.title())
+        for tool in taxonomy.hits('office_tools', text_lower):
+            tools.add(tool.title())
         
         # Add industry-specific tools
-        for industry, tool_list in industry_tools.items():
+        for industry, tool_list in taxonomy.group_hits('industry_tools', text_lower).items():
             if industry in text_lower:
                 for tool in tool_list:
-                    if tool in text_lower:
-                        tools.add(tool.title())
+                    tools.add(tool.title())
         
         return list(tools)
     
     def _extract_certifications_universal(self, lines: List[str]) -> List[str]:
         """Extract certifications for any profession"""
         certs = set()
-        cert_keywords = [
-            'certified', 'certification', 'license', 'licensed', 'accredited',
-            'pmp', 'cpa', 'pe', 'cpr', 'aed', 'first aid', 'six sigma',
-            'lean', 'scrum', 'agile', 'aws certified', 'google certified'
-        ]
+        taxonomy = TAXONOMY.current()
         
         for line in lines:
             line_lower = line.lower()
-            if any(keyword in line_lower for keyword in cert_keywords):
+            if taxonomy.contains_any('certification_keywords', line_lower):
                 cert_text = line.strip()
                 if len(cert_text) < 100:
                     certs.add(cert_text)
@@ -515,30 +763,18 @@ class UniversalParser:
     
     def _extract_languages_universal(self, text_lower: str) -> List[str]:
         """Extract languages"""
-        languages = set()
-        common_langs = [
-            'english', 'spanish', 'french', 'german', 'chinese', 'hindi',
-            'arabic', 'portuguese', 'russian', 'japanese', 'korean', 'italian'
-        ]
-        
-        for lang in common_langs:
-            if lang in text_lower:
-                languages.add(lang.title())
+        languages = {lang.title() for lang in TAXONOMY.current().hits('languages', text_lower)}
         
         return list(languages)
     
     def _extract_achievements_universal(self, lines: List[str]) -> List[str]:
         """Extract key achievements for any profession"""
         achievements = []
-        achievement_indicators = [
-            'achieved', 'implemented', 'led', 'managed', 'increased', 'reduced',
-            'improved', 'developed', 'created', 'established', 'launched',
-            'won', 'awarded', 'recognized', 'completed', 'delivered'
-        ]
+        taxonomy = TAXONOMY.current()
         
         for line in lines:
             line_lower = line.lower()
-            if any(indicator in line_lower for indicator in achievement_indicators):
+            if taxonomy.contains_any('achievement_indicators', line_lower):
                 if 15 < len(line.strip()) < 250:  # Reasonable achievement length
                     achievements.append(line.strip())
         
@@ -563,26 +799,10 @@ class UniversalParser:
     
     def _extract_field_universal(self, line: str) -> str:
         """Extract field of study for any profession"""
-        fields = {
-            'Computer Science': ['computer science', 'cs', 'software engineering', 'information technology'],
-            'Engineering': ['engineering', 'mechanical', 'electrical', 'civil', 'chemical', 'aerospace'],
-            'Business': ['business', 'business administration', 'mba', 'management', 'marketing'],
-            'Finance': ['finance', 'accounting', 'economics', 'banking', 'investment'],
-            'Mathematics': ['mathematics', 'math', 'statistics', 'applied math'],
-            'Science': ['physics', 'chemistry', 'biology', 'environmental science', 'geology'],
-            'Healthcare': ['medicine', 'nursing', 'pharmacy', 'public health', 'health sciences'],
-            'Education': ['education', 'teaching', 'curriculum', 'educational leadership'],
-            'Arts': ['arts', 'fine arts', 'design', 'music', 'theater', 'drama'],
-            'Social Sciences': ['psychology', 'sociology', 'political science', 'anthropology'],
-            'Humanities': ['history', 'english', 'literature', 'philosophy', 'languages']
-        }
-        
-        line_lower = line.lower()
-        for field, keywords in fields.items():
-            if any(keyword in line_lower for keyword in keywords):
-                return field
-        
-        return "General Studies"
+        classifier = TAXONOMY.current().classifier('fields_of_study')
+        # A single line: scanning its few terms directly keeps it out of the per-thread memo,
+        # which holds the batch's full texts
+        return classifier.label(classifier.scores([line.lower()], shared_scan=False)[0], "General Studies")
     
     def _generate_summary_universal(self, cv_text: str) -> str:
         """Generate a professional summary for any field"""
@@ -0,0 +1,69 @@
+import os
+from typing import Dict, List, Tuple
+from metrics import METRICS
+
+# Fields that decide whether the rule-based parse is good enough on its own
+CORE_FIELDS = ('profession_field', 'experience_years', 'skills', 'job_titles', 'education_level')
+
+ALWAYS = 'always'   # every CV goes to the LLM (previous behaviour)
+FULL = 'full'       # whole CV goes to the LLM only when overall confidence is low
+FIELDS = 'fields'   # only the low-confidence fields are requested from the LLM
+SKIP = 'skip'
+
+
+class LLMPolicy:
+    """
+    Decides, from the rule-based parser's per-field confidence, whether a CV
+    needs the LLM at all, and records how many calls that avoided.
+    """
+
+    def __init__(self, mode: str = ALWAYS, threshold: float = 0.6, core_fields: Tuple[str, ...] = CORE_FIELDS):
+        if mode not in (ALWAYS, FULL, FIELDS):
+            raise ValueError(f"Unknown LLM policy mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.core_fields = core_fields
+
+    @classmethod
+    def from_env(cls) -> 'LLMPolicy':
+        """Policy from CV_LLM_POLICY and CV_LLM_CONFIDENCE_THRESHOLD"""
+        return cls(
+            mode=os.getenv('CV_LLM_POLICY', ALWAYS),
+            threshold=float(os.getenv('CV_LLM_CONFIDENCE_THRESHOLD', '0.6')),
+        )
+
+    def overall_confidence(self, confidence: Dict[str, float]) -> float:
+        values = [confidence.get(field, 0.0) for field in self.core_fields]
+        return sum(values) / len(values)
+
+    def decide(self, confidence: Dict[str, float]) -> Tuple[str, List[str]]:
+        """Return (SKIP | FULL | FIELDS, fields to request) and record the decision"""
+        low_fields = [field for field, score in confidence.items() if score < self.threshold]
+
+        if self.mode == ALWAYS:
+            decision = FULL
+        elif self.mode == FULL:
+            decision = FULL if self.overall_confidence(confidence) < self.threshold else SKIP
+        else:
+            decision = FIELDS if low_fields else SKIP
+
+        METRICS.incr('llm_policy_documents')
+        METRICS.incr('llm_policy_decisions', decision=decision)
+        if decision == SKIP:
+            METRICS.incr('llm_policy_calls_avoided')
+        elif decision == FIELDS:
+            METRICS.incr('llm_policy_fields_requested', len(low_fields))
+        return decision, (low_fields if decision == FIELDS else [])
+
+    @staticmethod
+    def stats() -> dict:
+        """Share of LLM calls avoided so far in this process"""
+        documents = METRICS.counter('llm_policy_documents')
+        avoided = METRICS.counter('llm_policy_calls_avoided')
+        return {
+            'documents': documents,
+            'llm_calls': documents - avoided,
+            'llm_calls_avoided': avoided,
+            'avoided_ratio': avoided / documents if documents else 0.0,
+            'partial_calls': METRICS.counter('llm_policy_decisions', decision=FIELDS),
+        }
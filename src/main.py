@@ -1,34 +1,254 @@
 
 
+import os
 from extract_text import TextExtractor
 from section_splitter import UniversalSectionSplitter
-from llm_parser import UniversalParser
+from llm_parser import UniversalParser, UniversalCVData
 from query_builder import UniversalQueryBuilder
+from cache import DiskCache, content_hash
+from dedup import MinHasher, NearDuplicateIndex
+from profiling import RequestProfiler
+from usage import UsageLedger
+
+# Bump when pipeline output changes so stale cached results are not served
+PIPELINE_VERSION = '4'
+
+# Classes whose methods a request profile attributes time to
+PROFILED_CLASSES = (TextExtractor, UniversalSectionSplitter, UniversalParser, UniversalQueryBuilder)
 
 class ResumeQueryBuilder:
-    def __init__(self, google_api_key: str = None):
+    def __init__(self, google_api_key: str = None, use_cache: bool = False, cache_dir: str = None):
         self.text_extractor = TextExtractor()
         self.section_splitter = UniversalSectionSplitter()
-        self.parser = UniversalParser(google_api_key)
-        self.query_builder = UniversalQueryBuilder(google_api_key)
+        
+        # Shared on-disk caches: every worker process on the host sees the same entries
+        self.result_cache = DiskCache('results', cache_dir) if use_cache else None
+        llm_cache = DiskCache('llm', cache_dir) if use_cache else None
+        # Every LLM call is recorded per tenant (API key); tenants over budget fall back to rules
+        self.usage = UsageLedger(cache_dir) if use_cache else None
+        
+        self.parser = UniversalParser(google_api_key, llm_cache=llm_cache, ledger=self.usage)
+        self.query_builder = UniversalQueryBuilder(google_api_key, llm_cache=llm_cache, ledger=self.usage)
+        
+        # Near-duplicate CVs (re-exports, small edits, other formats) reuse an earlier parse.
+        # One index per tenant, so a parse is never served to another API key
+        self.near_duplicates = None
+        if use_cache:
+            variant = f'llm_{self.parser.router.tenant}' if self.parser.router else 'rules'
+            self.near_duplicates = NearDuplicateIndex(f'near_duplicates_v{PIPELINE_VERSION}_{variant}', cache_dir)
     
-    def process_resume(self, file_path: str, file_type: str):
-        """Main processing pipeline"""
-        # Extract text
-        text = self.text_extractor.extract_text(file_path, file_type)
+    def process_resume(self, file_path: str, file_type: str, profile: bool = False):
+        """
+        Main processing pipeline. With profile=True the run bypasses the result
+        cache and records a CPU profile and memory trace; the result's
+        'profile' entry lists the artifact files. Extraction then runs in this
+        process, so the profile sees it, without the subprocess memory cap.
+        """
+        if profile:
+            with RequestProfiler(os.path.basename(file_path), PROFILED_CLASSES) as profiler:
+                result = self._run_pipeline(file_path, file_type, isolate=False)
+            return {**result, 'profile': profiler.artifacts}
+        
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self._result_cache_key(file_path, file_type)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                cached['parsed_data'] = UniversalCVData(**cached['parsed_data'])
+                return cached
+        
+        result = self._run_pipeline(file_path, file_type)
+        
+        # Partial extractions (timeouts, limits) may succeed later, so don't pin them
+        if cache_key is not None and result['extraction']['complete']:
+            self.result_cache.set(cache_key, {**result, 'parsed_data': result['parsed_data'].dict()})
+        return result
+    
+    def process_batch(self, files, profile: bool = False):
+        """
+        Batch pipeline for (file_path, file_type) pairs: CVs and queries are
+        packed several per LLM call. Returns results in input order. With
+        profile=True the whole batch bypasses the result cache and is profiled
+        as one request; every result carries the same 'profile' artifacts.
+        """
+        if profile:
+            with RequestProfiler(f"batch-{len(files)}", PROFILED_CLASSES) as profiler:
+                results = self._process_batch(files, use_cache=False, isolate=False)
+            return [{**result, 'profile': profiler.artifacts} for result in results]
+        return self._process_batch(files)
+    
+    def _process_batch(self, files, use_cache: bool = True, isolate: bool = None):
+        results = [None] * len(files)
+        pending = []
+        followers = []
+        for index, (file_path, file_type) in enumerate(files):
+            use_result_cache = use_cache and self.result_cache is not None
+            cache_key = self._result_cache_key(file_path, file_type) if use_result_cache else None
+            cached = self.result_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                cached['parsed_data'] = UniversalCVData(**cached['parsed_data'])
+                results[index] = cached
+                continue
+            
+            extraction = self.text_extractor.extract(file_path, file_type, isolate)
+            sections = self.section_splitter.split_into_sections(extraction.text)
+            signature = self.near_duplicates.signature(extraction.text) if self.near_duplicates is not None else None
+            reused = self._reuse_near_duplicate(extraction.text, signature)
+            if reused is not None:
+                cv_data, job_query, near_duplicate = reused
+                results[index] = {
+                    'raw_text': extraction.text,
+                    'sections': sections,
+                    'parsed_data': cv_data,
+                    'job_query': job_query,
+                    'extraction': extraction.dict(exclude={'text'}),
+                    'near_duplicate': near_duplicate
+                }
+                continue
+            
+            # Near-duplicates within this batch wait for the first copy's parse
+            leader = self._batch_leader(signature, pending)
+            if leader is not None:
+                followers.append((index, leader, extraction, sections))
+                continue
+            pending.append((index, cache_key, extraction, sections, signature))
+        
+        if not pending:
+            return results
+        
+        parsed = self.parser.parse_batch(
+            [extraction.text for _, _, extraction, _, _ in pending],
+            [sections for _, _, _, sections, _ in pending],
+            [extraction.ocr_used for _, _, extraction, _, _ in pending],
+        )
+        queries = self.query_builder.build_job_queries([cv_data.dict() for cv_data in parsed])
+        
+        for (index, cache_key, extraction, sections, signature), cv_data, job_query in zip(pending, parsed, queries):
+            result = {
+                'raw_text': extraction.text,
+                'sections': sections,
+                'parsed_data': cv_data,
+                'job_query': job_query,
+                'extraction': extraction.dict(exclude={'text'}),
+                'near_duplicate': None
+            }
+            if cache_key is not None and extraction.complete:
+                self.result_cache.set(cache_key, {**result, 'parsed_data': cv_data.dict()})
+            self._index_near_duplicate(extraction.text, signature, extraction, cv_data, job_query)
+            results[index] = result
+        
+        for index, (leader_index, similarity), extraction, sections in followers:
+            leader = results[leader_index]
+            cv_data, job_query = self._patch_near_duplicate(
+                leader['parsed_data'], leader['job_query'], extraction.text, leader['raw_text'] == extraction.text)
+            results[index] = {
+                'raw_text': extraction.text,
+                'sections': sections,
+                'parsed_data': cv_data,
+                'job_query': job_query,
+                'extraction': extraction.dict(exclude={'text'}),
+                'near_duplicate': {'of': content_hash(leader['raw_text']), 'similarity': round(similarity, 3)}
+            }
+        return results
+    
+    def _batch_leader(self, signature, pending):
+        """(result index, similarity) of an earlier CV in this batch that signature near-duplicates"""
+        if signature is None:
+            return None
+        best = None
+        for index, _, _, _, other in pending:
+            similarity = MinHasher.similarity(signature, other)
+            if similarity >= self.near_duplicates.threshold and (best is None or similarity > best[1]):
+                best = (index, similarity)
+        return best
+    
+    def _result_cache_key(self, file_path: str, file_type: str) -> str:
+        """Key results by file content, type and whether the LLM path is enabled"""
+        with open(file_path, 'rb') as f:
+            file_bytes = f.read()
+        return content_hash(PIPELINE_VERSION, file_type, str(bool(self.parser.router)), file_bytes)
+    
+    def _run_pipeline(self, file_path: str, file_type: str, isolate: bool = None):
+        """Run every stage of the pipeline without caching"""
+        # Extract text (bounded by the extractor's page, time and memory limits)
+        extraction = self.text_extractor.extract(file_path, file_type, isolate)
+        text = extraction.text
         
         # Split into sections
         sections = self.section_splitter.split_into_sections(text)
         
-        # Parse with LLM
-        cv_data = self.parser.parse_cv(text, sections)
-        
-        # Build query
-        job_query = self.query_builder.build_job_query(cv_data.dict())
+        signature = self.near_duplicates.signature(text) if self.near_duplicates is not None else None
+        reused = self._reuse_near_duplicate(text, signature)
+        if reused is not None:
+            cv_data, job_query, near_duplicate = reused
+        else:
+            # Parse with LLM
+            cv_data = self.parser.parse_cv(text, sections, ocr_used=extraction.ocr_used)
+            
+            # Build query
+            job_query = self.query_builder.build_job_query(cv_data.dict())
+            near_duplicate = None
+            self._index_near_duplicate(text, signature, extraction, cv_data, job_query)
         
         return {
             'raw_text': text,
             'sections': sections,
             'parsed_data': cv_data,
-            'job_query': job_query
-        }
\ No newline at end of file
+            'job_query': job_query,
+            'extraction': extraction.dict(exclude={'text'}),
+            'near_duplicate': near_duplicate
+        }
+    
+    def _reuse_near_duplicate(self, text: str, signature):
+        """(cv_data, job_query, match info) patched from an indexed near-duplicate, or None"""
+        if signature is None:
+            return None
+        match = self.near_duplicates.find(signature)
+        if match is None:
+            return None
+        doc_id, similarity, payload = match
+        cv_data, job_query = self._patch_near_duplicate(
+            UniversalCVData(**payload['parsed_data']), payload['job_query'], text, doc_id == content_hash(text))
+        return cv_data, job_query, {'of': doc_id, 'similarity': round(similarity, 3)}
+    
+    def _patch_near_duplicate(self, cv_data: UniversalCVData, job_query: str, text: str, identical: bool):
+        """(cv_data, job_query) of a near-duplicate adapted to this text; identical texts are reused as-is"""
+        if identical:
+            return cv_data, job_query
+        cv_data = self.parser.patch_with_rules(cv_data, text)
+        return cv_data, self.query_builder.build_rule_query(cv_data.dict())
+    
+    def _index_near_duplicate(self, text: str, signature, extraction, cv_data: UniversalCVData, job_query: str):
+        """Make a fresh, complete parse available to later near-duplicates"""
+        if signature is not None and extraction.complete and text:
+            self.near_duplicates.add(content_hash(text), signature,
+                                     {'parsed_data': cv_data.dict(), 'job_query': job_query})
+    
+    def process_resume_stream(self, file_path: str, file_type: str):
+        """Streaming pipeline: yields (stage, payload) as each stage completes"""
+        # Extract text
+        extraction = self.text_extractor.extract(file_path, file_type)
+        text = extraction.text
+        yield 'text', {'raw_text': text, 'extraction': extraction.dict(exclude={'text'})}
+        
+        # Split into sections
+        sections = self.section_splitter.split_into_sections(text)
+        yield 'sections', sections
+        
+        # Rule-based fast parse, available long before the LLM returns
+        fast_data = self.parser._truly_universal_parse(text)
+        yield 'fast_parse', fast_data.dict()
+        
+        # Parse with LLM, forwarding tokens as they arrive
+        cv_data = fast_data
+        for event, payload in self.parser.parse_cv_stream(
+                text, sections, fallback=fast_data, ocr_used=extraction.ocr_used):
+            if event == 'parsed':
+                cv_data = payload
+                yield 'parsed', payload.dict()
+            else:
+                yield event, {'text': payload}
+        
+        # Build query
+        job_query = self.query_builder.build_job_query(cv_data.dict())
+        yield 'job_query', {'job_query': job_query}
@@ -0,0 +1,73 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Tuple
+
+
+class Metrics:
+    """
+    Process-wide counters and latency summaries.
+
+    Labels are folded into the metric key ("llm_calls{tier=fast}") so the
+    snapshot stays a flat, JSON-friendly dict. Observations keep a bounded
+    window of recent values for percentiles.
+    """
+
+    WINDOW = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, deque] = {}
+        self._totals: Dict[str, Tuple[int, float]] = defaultdict(lambda: (0, 0.0))
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> str:
+        if not labels:
+            return name
+        label_text = ','.join(f"{k}={v}" for k, v in sorted(labels.items()))
+        return f"{name}{{{label_text}}}"
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            window = self._observations.get(key)
+            if window is None:
+                window = self._observations[key] = deque(maxlen=self.WINDOW)
+            window.append(value)
+            count, total = self._totals[key]
+            self._totals[key] = (count + 1, total + value)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0.0)
+
+    def snapshot(self) -> dict:
+        """Counters plus count/mean/p50/p95/max for every observed series"""
+        with self._lock:
+            summaries = {}
+            for key, window in self._observations.items():
+                values = sorted(window)
+                count, total = self._totals[key]
+                summaries[key] = {
+                    'count': count,
+                    'mean': total / count if count else 0.0,
+                    'p50': values[len(values) // 2],
+                    'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                    'max': values[-1],
+                }
+            return {'counters': dict(self._counters), 'summaries': summaries}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+            self._totals.clear()
+
+
+# Shared by every pipeline instance in this process
+METRICS = Metrics()
@@ -0,0 +1,168 @@
+import os
+import time
+from typing import Callable, Dict, Optional
+from cache import DiskCache
+from llm_client import LLMClient
+from metrics import METRICS
+from usage import (CACHED, CANCELLED, ERROR, INVALID, OK, THROTTLED, BudgetExceeded, UsageLedger,
+                   tenant_id, token_counts)
+
+FAST = 'fast'
+STANDARD = 'standard'
+LARGE = 'large'
+TIERS = (FAST, STANDARD, LARGE)
+
+DEFAULT_TIER_MODELS = {
+    FAST: 'gemini-2.5-flash-lite',
+    STANDARD: 'gemini-2.5-flash',
+    LARGE: 'gemini-2.5-pro',
+}
+
+
+class ModelRouter:
+    """
+    Routes each LLM request to a model tier by document complexity, and
+    escalates to the next tier when the response fails validation.
+
+    Routing decisions, per-tier latency and escalations are recorded in METRICS.
+    With a usage ledger every call is also recorded for the API key's tenant,
+    and calls raise BudgetExceeded once the tenant is over its token budget.
+    """
+
+    def __init__(self, api_key: str, llm_cache: DiskCache = None, tier_models: Dict[str, str] = None,
+                 ledger: UsageLedger = None):
+        self.api_key = api_key
+        self.llm_cache = llm_cache
+        self.ledger = ledger
+        self.tenant = tenant_id(api_key)
+        self.tier_models = tier_models or {
+            tier: os.getenv(f'CV_MODEL_{tier.upper()}', model) for tier, model in DEFAULT_TIER_MODELS.items()
+        }
+        self._clients: Dict[str, LLMClient] = {}
+
+    def classify(self, text_length: int, section_count: int, ocr_used: bool = False,
+                 confidence: float = 1.0) -> str:
+        """Pick a tier from extracted length, structure, OCR origin and rule-based confidence"""
+        score = 0
+        if text_length > 12000:
+            score += 2
+        elif text_length > 6000:
+            score += 1
+        if section_count < 3:
+            score += 1  # poorly structured text is harder to read
+        if ocr_used:
+            score += 1  # OCR noise
+        if confidence < 0.4:
+            score += 1
+
+        tier = FAST if score <= 1 else STANDARD if score <= 3 else LARGE
+        METRICS.incr('llm_route', tier=tier)
+        return tier
+
+    def client(self, tier: str) -> LLMClient:
+        """LLM client for a tier, created on first use"""
+        if tier not in self._clients:
+            self._clients[tier] = LLMClient(self.api_key, self.tier_models[tier], cache=self.llm_cache)
+        return self._clients[tier]
+
+    @staticmethod
+    def escalate(tier: str) -> Optional[str]:
+        """Next larger tier, or None at the top"""
+        index = TIERS.index(tier)
+        return TIERS[index + 1] if index + 1 < len(TIERS) else None
+
+    def within_budget(self) -> bool:
+        """False when the tenant is over budget; callers then take the rule-based path"""
+        if self.ledger is None or self.ledger.within_budget(self.tenant):
+            return True
+        METRICS.incr('llm_budget_downgrades')
+        return False
+
+    def _check_budget(self, tier: str):
+        if self.ledger is not None and not self.ledger.within_budget(self.tenant):
+            self._record(tier, '', None, 0.0, THROTTLED)
+            raise BudgetExceeded(f"Tenant {self.tenant} is over its LLM token budget")
+
+    def _record(self, tier: str, prompt: str, response, latency: float, outcome: str = None, text: str = None):
+        """Count the call's tokens in METRICS and append it to the ledger"""
+        if outcome is None:
+            outcome = CACHED if getattr(response, 'from_cache', False) else OK
+        if outcome in (OK, INVALID):
+            prompt_tokens, response_tokens, estimated = token_counts(prompt, response, text)
+        else:
+            prompt_tokens, response_tokens, estimated = 0, 0, False
+        METRICS.incr('llm_calls', tier=tier, outcome=outcome)
+        if prompt_tokens or response_tokens:
+            METRICS.incr('llm_tokens', prompt_tokens, tier=tier, kind='prompt')
+            METRICS.incr('llm_tokens', response_tokens, tier=tier, kind='response')
+        if self.ledger is not None:
+            self.ledger.record(self.tenant, self.tier_models[tier], tier, prompt_tokens, response_tokens,
+                               latency, outcome, estimated)
+
+    def _call(self, prompt: str, tier: str, **kwargs):
+        """One timed call; returns (response, latency). Failures are recorded before they propagate."""
+        self._check_budget(tier)
+        start = time.perf_counter()
+        try:
+            response = self.client(tier).generate_content(prompt, **kwargs)
+        except Exception:
+            latency = time.perf_counter() - start
+            METRICS.observe('llm_latency_seconds', latency, tier=tier)
+            self._record(tier, prompt, None, latency, ERROR)
+            raise
+        latency = time.perf_counter() - start
+        METRICS.observe('llm_latency_seconds', latency, tier=tier)
+        return response, latency
+
+    def generate_content(self, prompt: str, tier: str = STANDARD, **kwargs):
+        """One timed call on the given tier"""
+        if kwargs.get('stream'):
+            return self._generate_stream(prompt, tier, **kwargs)
+        response, latency = self._call(prompt, tier, **kwargs)
+        self._record(tier, prompt, response, latency)
+        return response
+
+    def _generate_stream(self, prompt: str, tier: str, **kwargs):
+        """Pass streamed chunks through; the call is timed and recorded when the stream ends"""
+        self._check_budget(tier)
+        start = time.perf_counter()
+        last, parts, outcome = None, [], ERROR
+        try:
+            for chunk in self.client(tier).generate_content(prompt, **kwargs):
+                last = chunk
+                try:
+                    parts.append(chunk.text)
+                except ValueError:
+                    pass
+                yield chunk
+            outcome = None
+        except GeneratorExit:
+            outcome = CANCELLED
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            METRICS.observe('llm_latency_seconds', latency, tier=tier)
+            # Gemini reports usage for the whole stream on the last chunk
+            self._record(tier, prompt, last, latency, outcome, text=''.join(parts))
+
+    def generate_validated(self, prompt: str, tier: str, validate: Callable[[str], object], **kwargs):
+        """
+        Call the tier and run validate() on the response text; on a validation
+        error escalate to the next tier. Returns validate()'s result.
+        """
+        while True:
+            response, latency = self._call(prompt, tier, **kwargs)
+            try:
+                result = validate(response.text)
+            except Exception as e:
+                self._record(tier, prompt, response, latency, INVALID)
+                METRICS.incr('llm_validation_failures', tier=tier)
+                next_tier = self.escalate(tier)
+                if next_tier is None:
+                    raise
+                print(f"LLM response from {tier} tier failed validation ({e}), escalating to {next_tier}")
+                METRICS.incr('llm_escalations', source=tier, target=next_tier)
+                tier = next_tier
+                continue
+            self._record(tier, prompt, response, latency)
+            return result
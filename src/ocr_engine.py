@@ -0,0 +1,111 @@
+import os
+import threading
+from typing import Optional
+from pydantic import BaseModel
+from PIL import Image
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # needs libtesseract headers to build; pytesseract is the fallback
+    tesserocr = None
+
+TESSEROCR = 'tesserocr'
+PYTESSERACT = 'pytesseract'
+
+
+class OCRResult(BaseModel):
+    text: str
+    confidence: Optional[float] = None  # mean word confidence, 0-100
+
+
+class TesserocrEngine:
+    """
+    In-process tesseract through tesserocr. Each thread keeps one initialized
+    PyTessBaseAPI, so the language model loads once per worker thread instead
+    of once per page, and images are passed in memory rather than via temp files.
+    Isolated extractions run in a fresh subprocess, so there it loads once per
+    document.
+    """
+
+    name = TESSEROCR
+
+    def __init__(self, lang: str = 'eng'):
+        self.lang = lang
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._local.api = tesserocr.PyTessBaseAPI(lang=self.lang)
+        return api
+
+    def recognize(self, image: Image.Image, timeout: float = 0) -> OCRResult:
+        api = self._api()
+        api.SetImage(image)
+        try:
+            if not api.Recognize(timeout=int(timeout * 1000)):
+                raise RuntimeError("Tesseract process timeout")
+            return OCRResult(text=api.GetUTF8Text(), confidence=float(api.MeanTextConf()))
+        finally:
+            api.Clear()
+
+
+class PytesseractEngine:
+    """
+    Fallback: one tesseract subprocess per image. Reads text and word
+    confidences from a single TSV run instead of two separate calls.
+    """
+
+    name = PYTESSERACT
+
+    def __init__(self, lang: str = 'eng'):
+        self.lang = lang
+
+    def recognize(self, image: Image.Image, timeout: float = 0) -> OCRResult:
+        data = pytesseract.image_to_data(image, lang=self.lang, timeout=timeout,
+                                         output_type=pytesseract.Output.DICT)
+        lines, confidences = {}, []
+        for index, word in enumerate(data['text']):
+            if not word.strip():
+                continue
+            key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+            lines.setdefault(key, []).append(word)
+            confidence = float(data['conf'][index])
+            if confidence >= 0:
+                confidences.append(confidence)
+
+        # Rebuild the layout image_to_string would give: lines, blank line between paragraphs
+        parts, previous = [], None
+        for key, words in lines.items():
+            if previous is not None:
+                parts.append('\n\n' if key[:2] != previous[:2] else '\n')
+            parts.append(' '.join(words))
+            previous = key
+        text = ''.join(parts) + '\n' if parts else ''
+        return OCRResult(text=text, confidence=sum(confidences) / len(confidences) if confidences else None)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine():
+    """
+    Process-wide OCR engine: tesserocr when installed, pytesseract otherwise.
+    CV_OCR_ENGINE forces one; CV_OCR_LANG sets the tesseract language (default eng).
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            lang = os.getenv('CV_OCR_LANG', 'eng')
+            choice = os.getenv('CV_OCR_ENGINE', TESSEROCR if tesserocr is not None else PYTESSERACT)
+            if choice == TESSEROCR:
+                if tesserocr is None:
+                    raise ValueError("CV_OCR_ENGINE=tesserocr but tesserocr is not installed")
+                _engine = TesserocrEngine(lang)
+            elif choice == PYTESSERACT:
+                _engine = PytesseractEngine(lang)
+            else:
+                raise ValueError(f"Unknown OCR engine: {choice}")
+        return _engine
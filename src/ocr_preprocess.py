@@ -0,0 +1,127 @@
+from typing import List, Optional, Tuple
+from PIL import Image, ImageOps
+
+# Text line height (ascender to baseline) to aim for, in pixels;
+# 12pt text is about 24 px at 200 DPI
+TARGET_TEXT_HEIGHT = 24
+PROBE_DPI = 100
+# Below this share of dark pixels a page is treated as blank
+BLANK_INK_RATIO = 0.0005
+MAX_SKEW_DEGREES = 5
+
+
+def otsu_threshold(image: Image.Image) -> int:
+    """Global threshold maximising between-class variance of a grayscale histogram"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best_level, best_variance = 127, -1.0
+    background, weighted_background = 0, 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def binarize(image: Image.Image) -> Image.Image:
+    """Grayscale, then black text on white at the Otsu threshold"""
+    gray = image if image.mode == 'L' else image.convert('L')
+    threshold = otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0, mode='L')
+
+
+def ink_ratio(binary: Image.Image) -> float:
+    """Share of dark pixels in a binarized image"""
+    return binary.histogram()[0] / (binary.width * binary.height)
+
+
+def crop_margins(binary: Image.Image, pad: int = 10) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box of the ink plus padding, or None for a blank page"""
+    box = ImageOps.invert(binary).getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    return (max(left - pad, 0), max(top - pad, 0),
+            min(right + pad, binary.width), min(bottom + pad, binary.height))
+
+
+def _row_profile(binary: Image.Image) -> List[float]:
+    """Mean darkness of every row (box-filter resize to one column)"""
+    column = ImageOps.invert(binary).resize((1, binary.height), Image.BOX)
+    return list(column.getdata())
+
+
+def _profile_score(binary: Image.Image, angle: float) -> float:
+    rotated = binary.rotate(angle, fillcolor=255) if angle else binary
+    profile = _row_profile(rotated)
+    mean = sum(profile) / len(profile)
+    return sum((value - mean) ** 2 for value in profile)
+
+
+def skew_angle(binary: Image.Image, max_width: int = 500) -> float:
+    """
+    Rotation that straightens text lines: the angle whose row profile has the
+    highest variance (sharp line/gap alternation). Searched in whole degrees,
+    then refined to half a degree, on a downscaled copy.
+    """
+    if binary.width > max_width:
+        scale = max_width / binary.width
+        binary = binary.resize((max_width, max(int(binary.height * scale), 1)))
+    coarse = max(range(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + 1),
+                 key=lambda angle: _profile_score(binary, angle))
+    return max((coarse - 0.5, coarse, coarse + 0.5), key=lambda angle: _profile_score(binary, angle))
+
+
+def text_line_height(binary: Image.Image) -> Optional[float]:
+    """Median height in pixels of the runs of inked rows, i.e. text lines"""
+    runs, current = [], 0
+    for value in _row_profile(binary):
+        if value > 2:  # a few dark pixels across the row
+            current += 1
+        elif current:
+            runs.append(current)
+            current = 0
+    if current:
+        runs.append(current)
+    if not runs:
+        return None
+    runs.sort()
+    return runs[len(runs) // 2]
+
+
+def choose_dpi(probe: Image.Image, probe_dpi: int, min_dpi: int, max_dpi: int) -> Optional[int]:
+    """
+    DPI that puts text lines near TARGET_TEXT_HEIGHT pixels, from a low-DPI
+    render of the page. None means the page is blank and needs no OCR.
+    """
+    binary = binarize(probe)
+    if ink_ratio(binary) < BLANK_INK_RATIO:
+        return None
+    height = text_line_height(binary)
+    if not height:
+        return max_dpi
+    dpi = int(probe_dpi * TARGET_TEXT_HEIGHT / height)
+    return min(max(dpi, min_dpi), max_dpi)
+
+
+def preprocess(image: Image.Image) -> Optional[Image.Image]:
+    """Binarize, deskew and crop blank margins; None for a blank page"""
+    binary = binarize(image)
+    angle = skew_angle(binary)
+    if angle:
+        binary = binary.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        binary = binary.point(lambda value: 255 if value > 127 else 0)
+    box = crop_margins(binary)
+    if box is None:
+        return None
+    return binary.crop(box)
@@ -0,0 +1,140 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterable, Optional, Tuple
+from cache import default_cache_dir
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+
+# tracemalloc is process-wide; overlapping profiled requests share one trace
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def default_profile_dir() -> str:
+    return os.getenv('CV_PROFILE_DIR', os.path.join(default_cache_dir(), 'profiles'))
+
+
+def _method_names(classes: Iterable[type]) -> Dict[Tuple[str, int, str], str]:
+    """pstats function key -> "Class.method" for every method defined on the classes"""
+    names = {}
+    for cls in classes:
+        for attribute, value in vars(cls).items():
+            function = getattr(value, '__func__', value)
+            code = getattr(function, '__code__', None)
+            if code is not None:
+                names[(code.co_filename, code.co_firstlineno, code.co_name)] = f"{cls.__name__}.{attribute}"
+    return names
+
+
+class RequestProfiler:
+    """
+    CPU profile (cProfile) and memory trace (tracemalloc) of one request,
+    written to output_dir as <id>.prof, <id>.tracemalloc and <id>.txt.
+
+    cProfile only sees the thread that entered the profiler, so concurrent
+    requests stay out of the CPU profile. tracemalloc traces the whole
+    process, so allocations of overlapping requests show up in the snapshot.
+    The .txt summary attributes time to the methods of the given classes.
+    """
+
+    def __init__(self, label: str, classes: Iterable[type] = (), output_dir: str = None):
+        self.label = re.sub(r'[^\w.-]+', '_', label)[:60] or 'request'
+        self.classes = tuple(classes)
+        self.output_dir = output_dir or default_profile_dir()
+        self.artifacts: Optional[Dict[str, str]] = None
+        self._profile = None
+        self._started = 0.0
+
+    def __enter__(self):
+        global _tracing_users
+        with _tracing_lock:
+            if _tracing_users == 0:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            _tracing_users += 1
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Another profiler is active in this thread; keep the memory trace only
+            print(f"CPU profiling unavailable: {e}")
+            self._profile = None
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _tracing_users
+        wall = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0:
+                tracemalloc.stop()
+
+        try:
+            self.artifacts = self._write(wall, peak, snapshot)
+            print(f"Request profile written to {self.artifacts['summary']}")
+        except OSError as e:
+            print(f"Could not write request profile: {e}")
+        return False
+
+    def _write(self, wall: float, peak: int, snapshot: tracemalloc.Snapshot) -> Dict[str, str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident() % 10000}-{self.label}"
+        base = os.path.join(self.output_dir, profile_id)
+        artifacts = {'id': profile_id, 'memory': base + '.tracemalloc', 'summary': base + '.txt'}
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        snapshot.dump(artifacts['memory'])
+
+        lines = [f"request {self.label}  wall {wall:.3f}s  peak traced memory {peak / 1e6:.1f} MB", ""]
+        if self._profile is not None:
+            artifacts['cpu'] = base + '.prof'
+            self._profile.dump_stats(artifacts['cpu'])
+            lines += self._method_table(pstats.Stats(self._profile))
+            output = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=output)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            lines += [f"== Top {TOP_FUNCTIONS} functions by cumulative time ==", output.getvalue()]
+
+        lines.append(f"== Top {TOP_ALLOCATIONS} allocation sites (live at the end of the request) ==")
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {stat.traceback}")
+
+        with open(artifacts['summary'], 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        return artifacts
+
+    def _method_table(self, stats: pstats.Stats) -> list:
+        """Calls, own and cumulative seconds per method of the profiled classes"""
+        names = _method_names(self.classes)
+        rows = []
+        for key, (_, calls, own, cumulative, _) in stats.stats.items():
+            name = names.get(key)
+            if name is not None:
+                rows.append((cumulative, own, calls, name))
+        rows.sort(reverse=True)
+
+        lines = ["== Time by pipeline method ==", f"{'cumulative s':>12} {'own s':>9} {'calls':>7}  method"]
+        lines += [f"{cumulative:12.4f} {own:9.4f} {calls:7d}  {name}" for cumulative, own, calls, name in rows]
+        by_class = {}
+        for _, own, _, name in rows:
+            owner = name.split('.', 1)[0]
+            by_class[owner] = by_class.get(owner, 0.0) + own
+        lines += ["", "own time by class: " + ", ".join(f"{owner} {seconds:.4f}s" for owner, seconds in
+                                                         sorted(by_class.items(), key=lambda item: -item[1])), ""]
+        return lines
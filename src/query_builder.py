@@ -1,34 +1,66 @@
 
 
 
-import google.generativeai as genai
 import os
 from typing import Dict, Any, List
+from cache import DiskCache
+from model_router import ModelRouter, FAST
+from json_recovery import recover_json_array
+from usage import UsageLedger
+
+# Profiles per packed query call in batch mode
+QUERY_BATCH_SIZE = 20
 
 class UniversalQueryBuilder:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, llm_cache: DiskCache = None, ledger: UsageLedger = None):
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
         if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.router = ModelRouter(self.api_key, llm_cache=llm_cache, ledger=ledger)
         else:
-            self.model = None
+            self.router = None
     
-    def build_job_query(self, cv_data: Dict[str, Any]) -> str:
-        """Build optimized job query for ANY profession"""
+    def build_job_query(self, cv_data: Dict[str, Any], tier: str = FAST) -> str:
+        """
+        Build optimized job query for ANY profession. Queries are not routed by
+        the CV's complexity: the prompt is the short structured profile, the
+        same size for any CV, so every query starts on the fast tier and only
+        escalates when the output is unusable.
+        """
         
         # Prepare the data for the prompt
         prompt_data = self._prepare_prompt_data(cv_data)
         
-        if self.model:
+        if self.router and self.router.within_budget():
             try:
-                return self._build_query_with_llm(prompt_data)
+                return self._build_query_with_llm(prompt_data, tier)
             except Exception as e:
                 print(f"LLM query generation failed: {e}")
         
         # Fallback to universal rule-based query building
         return self._build_universal_query(prompt_data)
     
+    def build_rule_query(self, cv_data: Dict[str, Any]) -> str:
+        """Rule-based query only, never calling the LLM"""
+        return self._build_universal_query(self._prepare_prompt_data(cv_data))
+    
+    def build_job_queries(self, cv_data_list: List[Dict[str, Any]], tier: str = FAST) -> List[str]:
+        """Build queries for many CVs, packing up to QUERY_BATCH_SIZE profiles per LLM call"""
+        prompt_data = [self._prepare_prompt_data(cv_data) for cv_data in cv_data_list]
+        queries = [None] * len(prompt_data)
+        
+        if self.router and self.router.within_budget():
+            for start in range(0, len(prompt_data), QUERY_BATCH_SIZE):
+                indices = list(range(start, min(start + QUERY_BATCH_SIZE, len(prompt_data))))
+                try:
+                    for index, query in self._build_queries_with_llm(prompt_data, indices, tier).items():
+                        queries[index] = query
+                except Exception as e:
+                    print(f"Packed LLM query generation failed: {e}")
+        
+        # Anything the packed call missed goes through the single-CV path
+        return [query if query is not None else self.build_job_query(cv_data, tier)
+                for query, cv_data in zip(queries, cv_data_list)]
+    
     def _prepare_prompt_data(self, cv_data: Dict[str, Any]) -> Dict[str, str]:
         """Prepare and format data for query generation"""
         # Calculate actual experience
@@ -91,7 +123,7 @@ class UniversalQueryBuilder:
         
         return base_experience
     
-    def _build_query_with_llm(self, prompt_data: Dict[str, str]) -> str:
+    def _build_query_with_llm(self, prompt_data: Dict[str, str], tier: str = FAST) -> str:
         """Build query using Gemini LLM for any profession"""
         prompt = f"""
         Create a clean, effective job search query for this professional:
@@ -116,11 +148,50 @@ class UniversalQueryBuilder:
         Return ONLY the query text, nothing else.
         """
         
-        response = self.model.generate_content(prompt)
-        query = response.text.strip()
+        # A short prompt-to-query rewrite: start on the fast tier, escalate on junk output
+        return self.router.generate_validated(prompt, tier, self._validated_query)
+    
+    def _build_queries_with_llm(self, prompt_data: List[Dict[str, str]], indices: List[int], tier: str) -> Dict[int, str]:
+        """One packed call returning {index: query} for every usable entry"""
+        profiles = "\n\n".join(
+            f"=== Profile p{index} ===\n" + "\n".join(f"{key}: {value}" for key, value in prompt_data[index].items())
+            for index in indices
+        )
+        prompt = f"""
+        Create a clean, effective job search query for each professional profile below.
+
+        Each query must:
+        - Use plain language (NO parentheses, OR operators, or excessive quotes)
+        - Include the appropriate experience level
+        - Mention key skills and qualifications relevant to the profession
+        - Be optimized for job platforms like LinkedIn, Indeed, etc.
+
+        Return ONLY a JSON array of objects {{"id": "<profile id>", "query": "<query text>"}}, one per profile.
+
+        {profiles}
+        """
+        
+        response = self.router.generate_content(prompt, tier=tier, generation_config={'response_mime_type': 'application/json'})
+        items, _ = recover_json_array(response.text)
         
-        # Clean up the query
-        query = self._clean_query(query)
+        queries = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get('id'), str) or not isinstance(item.get('query'), str):
+                continue
+            try:
+                index = int(item['id'].lstrip('p'))
+                query = self._validated_query(item['query'])
+            except ValueError:
+                continue
+            if index in indices:
+                queries[index] = query
+        return queries
+    
+    def _validated_query(self, response_text: str) -> str:
+        """Clean the LLM query and reject empty or runaway output"""
+        query = self._clean_query(response_text.strip())
+        if not query or len(query) > 400:
+            raise ValueError(f"Unusable query of length {len(query)}")
         return query
     
     def _build_universal_query(self, data: Dict[str, Any]) -> str:
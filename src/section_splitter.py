@@ -58,6 +58,17 @@ class UniversalSectionSplitter:
         
         return sections
     
+    def sections_in(self, text: str) -> set:
+        """Names of the sections whose headers appear in a chunk of text"""
+        found = set()
+        for line in text.split('\n'):
+            line_clean = line.strip()
+            if line_clean:
+                section = self._identify_section(line_clean)
+                if section:
+                    found.add(section)
+        return found
+    
     def _identify_section(self, line: str) -> str:
         """Identify which section a line belongs to"""
         line_lower = line.lower()
@@ -65,7 +76,8 @@ class UniversalSectionSplitter:
         # Check for section headers (often in ALL CAPS, bold, or followed by colons)
         if len(line) < 100:  # Likely a header if short
             for section, pattern in self.section_patterns.items():
-                if re.search(pattern, line_lower) or self._is_section_header(line):
+                # A header names the section and looks like one (caps, colon or a few words)
+                if re.search(pattern, line_lower) and (self._is_section_header(line) or len(line.split()) <= 3):
                     return section
         
         return None
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+from metrics import METRICS
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one in-flight computation.
+
+    The first caller starts the work; callers arriving before it finishes
+    await the same future and get the same result (or exception). The key is
+    dropped as soon as the work completes, so later calls start fresh and
+    rely on the result cache instead.
+    """
+
+    def __init__(self, name: str = 'singleflight'):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, work: Callable[[], Awaitable]):
+        future = self._inflight.get(key)
+        if future is None:
+            METRICS.incr(f'{self.name}_leaders')
+            future = asyncio.ensure_future(work())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            METRICS.incr(f'{self.name}_coalesced')
+
+        # Shielded so one disconnecting client doesn't cancel the work for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved even when every waiter went away
+            future.exception()
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+import yaml
+from cache import default_cache_dir
+from classifier import KeywordClassifier
+from metrics import METRICS
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config', 'taxonomy.yaml')
+
+# Vocabularies that map a name to keywords; everything else is a flat keyword list
+GROUPED = ('professions', 'industries', 'fields_of_study', 'field_skills', 'industry_tools')
+FLAT = ('universal_skills', 'technical_skills', 'soft_skills', 'office_tools', 'certification_keywords',
+        'languages', 'title_indicators', 'achievement_indicators', 'education_keywords')
+
+# Bump when the artifact layout changes so old artifacts are rebuilt
+ARTIFACT_FORMAT = 2
+
+# Texts whose keyword scan each thread remembers, enough for one parse_batch call
+PRESENT_CACHE_SIZE = 256
+
+
+class CompiledTaxonomy:
+    """
+    Validated, lowercased vocabularies plus one de-duplicated keyword table.
+
+    present() scans the table once per text; every vocabulary lookup and
+    classifier for the same text is then a set membership test, however many
+    vocabularies share a keyword.
+    """
+
+    def __init__(self, version, source_hash: str, flat: Dict[str, Tuple[str, ...]],
+                 grouped: Dict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]):
+        self.version = version
+        self.source_hash = source_hash
+        self.flat = flat
+        self.grouped = grouped
+        keywords = {keyword for words in flat.values() for keyword in words}
+        keywords.update(keyword for groups in grouped.values() for _, words in groups for keyword in words)
+        self.keywords = tuple(sorted(keywords))
+        self._local = threading.local()
+        self._classifiers = {}
+
+    def classifier(self, vocabulary: str) -> KeywordClassifier:
+        """Matrix classifier for a grouped vocabulary, built once per taxonomy version"""
+        classifier = self._classifiers.get(vocabulary)
+        if classifier is None:
+            classifier = KeywordClassifier(self.grouped[vocabulary], present=self.present)
+            self._classifiers[vocabulary] = classifier
+        return classifier
+
+    def present(self, text_lower: str) -> frozenset:
+        """Keywords occurring in text_lower; recent texts are memoized per thread"""
+        cache = getattr(self._local, 'found', None)
+        if cache is None:
+            cache = self._local.found = {}
+        found = cache.get(text_lower)
+        if found is None:
+            if len(cache) >= PRESENT_CACHE_SIZE:
+                cache.clear()
+            found = cache[text_lower] = frozenset(keyword for keyword in self.keywords if keyword in text_lower)
+        return found
+
+    def hits(self, vocabulary: str, text_lower: str) -> List[str]:
+        """Keywords of a flat vocabulary found in the text, in vocabulary order"""
+        found = self.present(text_lower)
+        return [keyword for keyword in self.flat[vocabulary] if keyword in found]
+
+    def group_hits(self, vocabulary: str, text_lower: str) -> Dict[str, List[str]]:
+        """Name -> keywords found, for every name of a grouped vocabulary with a hit"""
+        found = self.present(text_lower)
+        result = {}
+        for name, words in self.grouped[vocabulary]:
+            matched = [keyword for keyword in words if keyword in found]
+            if matched:
+                result[name] = matched
+        return result
+
+    def contains_any(self, vocabulary: str, text_lower: str) -> bool:
+        """Whether a short text (one line) contains any keyword of a flat vocabulary"""
+        return any(keyword in text_lower for keyword in self.flat[vocabulary])
+
+
+def _keywords(vocabulary: str, words) -> Tuple[str, ...]:
+    if not isinstance(words, list) or not all(isinstance(word, str) and word.strip() for word in words):
+        raise ValueError(f"Taxonomy {vocabulary!r} must be a list of non-empty strings")
+    return tuple(word.strip().lower() for word in words)
+
+
+def build_taxonomy(source: dict, source_hash: str) -> CompiledTaxonomy:
+    """Validate a parsed YAML document and compile it"""
+    if not isinstance(source, dict) or 'version' not in source:
+        raise ValueError("Taxonomy must be a mapping with a version")
+    missing = [name for name in GROUPED + FLAT if name not in source]
+    if missing:
+        raise ValueError(f"Taxonomy is missing vocabularies: {', '.join(missing)}")
+
+    flat = {name: _keywords(name, source[name]) for name in FLAT}
+    grouped = {}
+    for name in GROUPED:
+        if not isinstance(source[name], dict):
+            raise ValueError(f"Taxonomy {name!r} must map names to keyword lists")
+        grouped[name] = tuple((str(group), _keywords(f"{name}.{group}", words))
+                              for group, words in source[name].items())
+    return CompiledTaxonomy(source['version'], source_hash, flat, grouped)
+
+
+def _artifact(taxonomy: CompiledTaxonomy) -> dict:
+    return {
+        'format': ARTIFACT_FORMAT,
+        'version': taxonomy.version,
+        'source_hash': taxonomy.source_hash,
+        'flat': {name: list(words) for name, words in taxonomy.flat.items()},
+        'grouped': {name: [[group, list(words)] for group, words in groups]
+                    for name, groups in taxonomy.grouped.items()},
+    }
+
+
+def _from_artifact(artifact: dict) -> CompiledTaxonomy:
+    """Rebuild a compiled taxonomy from its JSON artifact; only plain strings are read back"""
+    flat = {name: _keywords(name, artifact['flat'][name]) for name in FLAT}
+    grouped = {name: tuple((str(group), _keywords(f"{name}.{group}", words))
+                           for group, words in artifact['grouped'][name]) for name in GROUPED}
+    return CompiledTaxonomy(artifact['version'], artifact['source_hash'], flat, grouped)
+
+
+def load_taxonomy(path: str = None, cache_dir: str = None) -> CompiledTaxonomy:
+    """
+    Compiled taxonomy for a YAML file. The compiled form is stored as JSON
+    next to the other caches, keyed by the YAML's content hash, so later
+    loads skip YAML parsing. JSON rather than pickle: the cache directory
+    may be writable by other users, and loading it must not run code.
+    """
+    path = path or os.getenv('CV_TAXONOMY_PATH', DEFAULT_TAXONOMY_PATH)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    source_hash = hashlib.sha256(raw + str(ARTIFACT_FORMAT).encode()).hexdigest()
+
+    cache_dir = cache_dir or default_cache_dir()
+    artifact = os.path.join(cache_dir, f"taxonomy-{source_hash[:16]}.json")
+    try:
+        with open(artifact, 'rb') as f:
+            stored = json.loads(f.read())
+        if stored.get('format') == ARTIFACT_FORMAT and stored.get('source_hash') == source_hash:
+            return _from_artifact(stored)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    compiled = build_taxonomy(yaml.safe_load(raw), source_hash)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename, so concurrent workers never read a half-written artifact
+        temp_path = f"{artifact}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(_artifact(compiled), f)
+        os.replace(temp_path, artifact)
+    except OSError as e:
+        print(f"Could not write taxonomy artifact: {e}")
+    return compiled
+
+
+class TaxonomyStore:
+    """
+    The taxonomy in use by this process. current() re-checks the YAML's
+    modification time at most every check_seconds and swaps in the new
+    version, so edits apply without restarting workers. A file that fails
+    validation is reported and the previous taxonomy stays active.
+    """
+
+    def __init__(self, path: str = None, check_seconds: float = None):
+        self.path = path or os.getenv('CV_TAXONOMY_PATH', DEFAULT_TAXONOMY_PATH)
+        self.check_seconds = check_seconds if check_seconds is not None else \
+            float(os.getenv('CV_TAXONOMY_CHECK_SECONDS', '5'))
+        self._lock = threading.Lock()
+        self._taxonomy = None
+        self._mtime = None
+        self._checked = 0.0
+
+    def current(self) -> CompiledTaxonomy:
+        now = time.monotonic()
+        if self._taxonomy is None or now - self._checked >= self.check_seconds:
+            with self._lock:
+                if self._taxonomy is None or now - self._checked >= self.check_seconds:
+                    self._checked = now
+                    self._reload_if_changed()
+        return self._taxonomy
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._taxonomy is None:
+                raise
+            print(f"Taxonomy file unavailable, keeping version {self._taxonomy.version}: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            taxonomy = load_taxonomy(self.path)
+        except (ValueError, yaml.YAMLError) as e:
+            if self._taxonomy is None:
+                raise
+            print(f"Invalid taxonomy, keeping version {self._taxonomy.version}: {e}")
+            METRICS.incr('taxonomy_reload_failures')
+            # Report a broken file once, not on every check until it is fixed
+            self._mtime = mtime
+            return
+        if self._taxonomy is not None:
+            METRICS.incr('taxonomy_reloads')
+        self._taxonomy, self._mtime = taxonomy, mtime
+
+
+# Shared by every parser in this process
+TAXONOMY = TaxonomyStore()
+
+
+if __name__ == '__main__':
+    # Precompile the artifact, e.g. as a deploy step
+    start = time.perf_counter()
+    taxonomy = load_taxonomy()
+    print(f"taxonomy version {taxonomy.version}: {len(taxonomy.keywords)} keywords "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,168 @@
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+# One alternation, no nested quantifiers: finditer over it is a single linear scan
+_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[+\-–—/']")
+
+_MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10,
+    'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+_YEAR_WORDS = {'year', 'years', 'yr', 'yrs'}
+_OPEN_ENDED = {'present', 'current', 'now', 'today', 'date', 'ongoing'}
+_RANGE_SEPARATORS = {'-', '–', '—', 'to', 'till', 'until'}
+_EXPERIENCE_WORDS = {'experience', 'experienced'}
+
+# How many tokens apart "experience" and "N years" may be and still count as linked
+EXPERIENCE_WINDOW = 8
+# Mentions above this are almost always something else ("100 years of history")
+MAX_PLAUSIBLE_YEARS = 60
+
+Interval = Tuple[int, int]  # months since year 0, [start, end)
+
+
+class TenureEngine:
+    """
+    Single-pass tenure extraction.
+
+    The text is tokenized once; a small state machine then recognises
+    "N years" mentions (with or without a nearby "experience") and date
+    ranges such as "2019 - 2021", "Jan 2019 – Present" or "03/2018 to 06/2020".
+    Ranges are merged before summing so overlapping jobs are not double counted.
+    """
+
+    def __init__(self, today: Optional[date] = None):
+        self.today = today or date.today()
+
+    def extract_years(self, text: str) -> float:
+        """Best estimate of total years of experience"""
+        tokens = [m.group() for m in _TOKEN_RE.finditer(text.lower())]
+        mentions, linked = self._year_mentions(tokens)
+        intervals = self._date_ranges(tokens)
+
+        explicit = max(linked or mentions or [0.0])
+        from_ranges = self.merged_months(intervals) / 12
+        return round(max(explicit, from_ranges), 1)
+
+    def _year_mentions(self, tokens: List[str]) -> Tuple[List[float], List[float]]:
+        """All 'N years' values, and the subset within EXPERIENCE_WINDOW of 'experience'"""
+        mentions, linked = [], []
+        last_experience = -EXPERIENCE_WINDOW - 1
+        pending = []  # (index, value) mentions waiting for a following "experience"
+
+        for i, token in enumerate(tokens):
+            if token in _EXPERIENCE_WORDS:
+                last_experience = i
+                linked.extend(value for index, value in pending if i - index <= EXPERIENCE_WINDOW)
+                pending = []
+                continue
+            if token not in _YEAR_WORDS or i == 0:
+                continue
+
+            j = i - 1
+            if tokens[j] == '+' and j > 0:
+                j -= 1
+            if not tokens[j][0].isdigit():
+                continue
+            value = float(tokens[j])
+            if value > MAX_PLAUSIBLE_YEARS:
+                continue
+
+            mentions.append(value)
+            if i - last_experience <= EXPERIENCE_WINDOW:
+                linked.append(value)
+            else:
+                pending.append((i, value))
+
+            # Drop pending mentions that can no longer be linked
+            if pending and i - pending[0][0] > EXPERIENCE_WINDOW:
+                pending = [(index, v) for index, v in pending if i - index <= EXPERIENCE_WINDOW]
+        return mentions, linked
+
+    def _date_ranges(self, tokens: List[str]) -> List[Interval]:
+        """Find 'date SEP date' ranges; each token is examined a bounded number of times"""
+        intervals = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            start = self._parse_date(tokens, i)
+            if start is None:
+                i += 1
+                continue
+            start_month, after_start = start
+            if after_start < n and tokens[after_start] in _RANGE_SEPARATORS:
+                end = self._parse_date(tokens, after_start + 1, is_end=True)
+                if end is not None:
+                    end_month, after_end = end
+                    if end_month >= start_month:
+                        intervals.append((start_month, end_month))
+                    i = after_end
+                    continue
+            i = after_start
+        return intervals
+
+    def _parse_date(self, tokens: List[str], i: int, is_end: bool = False):
+        """Parse a date at tokens[i]; returns (month index, next token index) or None"""
+        if i >= len(tokens):
+            return None
+        token = tokens[i]
+
+        # Month-precision end dates are inclusive ("Jan - Mar" is three months)
+        inclusive = 1 if is_end else 0
+
+        if is_end and token in _OPEN_ENDED:
+            return self._month_index(self.today.year, self.today.month) + 1, i + 1
+
+        # "Jan 2019", "January '19"
+        if token in _MONTHS and i + 1 < len(tokens):
+            j = i + 1
+            if tokens[j] == "'" and j + 1 < len(tokens):
+                j += 1
+            year = self._year(tokens[j])
+            if year:
+                return self._month_index(year, _MONTHS[token]) + inclusive, j + 1
+
+        # "03/2018"
+        if token.isdigit() and len(token) <= 2 and i + 2 < len(tokens) and tokens[i + 1] == '/':
+            year = self._year(tokens[i + 2])
+            if year and 1 <= int(token) <= 12:
+                return self._month_index(year, int(token)) + inclusive, i + 3
+
+        # "2019": bare years count whole years between them, so "2019 - 2021" is two years
+        year = self._year(token) if len(token) == 4 else None
+        if year:
+            return self._month_index(year, 1), i + 1
+        return None
+
+    def _year(self, token: str) -> Optional[int]:
+        if not token.isdigit():
+            return None
+        value = int(token)
+        if len(token) == 2:
+            value += 2000 if value <= self.today.year % 100 else 1900
+        if 1950 <= value <= self.today.year:
+            return value
+        return None
+
+    @staticmethod
+    def _month_index(year: int, month: int) -> int:
+        return year * 12 + (month - 1)
+
+    @staticmethod
+    def merged_months(intervals: List[Interval]) -> int:
+        """Total months covered by the union of intervals"""
+        total = 0
+        current_start = current_end = None
+        for start, end in sorted(intervals):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
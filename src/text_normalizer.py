@@ -0,0 +1,74 @@
+import unicodedata
+
+# Punctuation the downstream matchers rely on. '+', '#', '/' and '&' keep
+# technical tokens such as C++, C#, F#, CI/CD, TCP/IP, R&D and A/B intact.
+KEPT_PUNCTUATION = set(".,!?;:()-@'%" + "+#/&")
+
+_MAPPINGS = {
+    '\t': ' ', '\n': '\n', '\r': '\n', '\v': '\n', '\f': '\n',
+    '\x85': '\n', '\u2028': '\n', '\u2029': '\n',
+    # Dashes and minus signs
+    '‐': '-', '‑': '-', '‒': '-', '–': '-', '—': '-',
+    '―': '-', '−': '-', '﹣': '-', '－': '-',
+    # Apostrophes and primes
+    '‘': "'", '’': "'", '‛': "'", '′': "'", '＇': "'",
+    # Look-alikes of kept symbols
+    '♯': '#', '＃': '#', '＋': '+', '⁄': '/', '∕': '/', '＆': '&',
+}
+
+
+def _classify(char: str) -> str:
+    """Replacement for one character; computed once per code point"""
+    if char in _MAPPINGS:
+        return _MAPPINGS[char]
+    if char in KEPT_PUNCTUATION or char == '_':
+        return char
+    if char.isalnum():
+        # Ligatures (ﬁ), full-width and compatibility forms
+        normalized = unicodedata.normalize('NFKC', char)
+        if normalized == char:
+            return char
+        return ''.join(_classify(part) for part in normalized)
+    category = unicodedata.category(char)
+    if category[0] == 'M':
+        return char  # combining accents belong to the word
+    if category == 'Cf':
+        return ''  # zero-width spaces and joiners, soft hyphens, BOM
+    # Other symbols, bullets, quotes, separators: a space, so neighbours don't merge
+    return ' '
+
+
+class _TranslationTable(dict):
+    """str.translate table filled lazily, so any code point costs one lookup after first sight"""
+
+    def __missing__(self, codepoint: int) -> str:
+        replacement = self[codepoint] = _classify(chr(codepoint))
+        return replacement
+
+
+_TABLE = _TranslationTable()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize extracted text in one translate pass: map Unicode punctuation
+    and ligatures, drop symbol noise, then collapse spaces within each line.
+    Lines are kept; runs of blank lines become a single blank line.
+    """
+    if '\r\n' in text:
+        text = text.replace('\r\n', '\n')
+    text = text.translate(_TABLE)
+
+    lines = []
+    blank = False
+    for line in text.split('\n'):
+        words = line.split()
+        if words:
+            lines.append(' '.join(words))
+            blank = False
+        elif lines and not blank:
+            lines.append('')
+            blank = True
+    if blank:
+        lines.pop()
+    return '\n'.join(lines)
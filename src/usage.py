@@ -0,0 +1,253 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+from cache import content_hash, default_cache_dir
+
+# Call outcomes recorded in the ledger
+OK = 'ok'
+CACHED = 'cached'          # served from the LLM cache, no quota spent
+INVALID = 'invalid'        # answered, but the response failed validation
+ERROR = 'error'
+CANCELLED = 'cancelled'    # stream abandoned by the consumer
+THROTTLED = 'throttled'    # not sent: tenant over budget
+
+# What happens to requests of a tenant over budget
+DOWNGRADE = 'rules'        # parse and build queries with the rule-based path
+REJECT = 'reject'          # the API answers 429
+
+# USD per million (prompt, response) tokens; override with CV_MODEL_PRICES
+DEFAULT_PRICES = {
+    'gemini-2.5-flash-lite': (0.10, 0.40),
+    'gemini-2.5-flash': (0.30, 2.50),
+    'gemini-2.5-pro': (1.25, 10.00),
+}
+
+# Old rows are pruned once every this many records per process
+PRUNE_EVERY = 1000
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised instead of an LLM call when the tenant is over its token budget"""
+
+
+def tenant_id(api_key: str) -> str:
+    """Stable tenant name for an API key; the key itself is never stored"""
+    return f"key-{content_hash(api_key)[:12]}"
+
+
+def token_counts(prompt: str, response, text: str = None) -> Tuple[int, int, bool]:
+    """
+    (prompt tokens, response tokens, estimated) for a response. Gemini reports
+    usage_metadata; otherwise (stub model, older SDKs) ~4 characters per token.
+    Response tokens include thinking tokens, which are billed as output:
+    total minus prompt, or candidates plus thoughts when there is no total.
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None and getattr(usage, 'prompt_token_count', None):
+        prompt_tokens = usage.prompt_token_count
+        total = getattr(usage, 'total_token_count', 0) or 0
+        if total > prompt_tokens:
+            return prompt_tokens, total - prompt_tokens, False
+        candidates = getattr(usage, 'candidates_token_count', 0) or 0
+        return prompt_tokens, candidates + (getattr(usage, 'thoughts_token_count', 0) or 0), False
+    if text is None:
+        try:
+            text = response.text
+        except (AttributeError, ValueError):
+            text = ''
+    return len(prompt) // 4, len(text or '') // 4, True
+
+
+def _parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"model=prompt/response,..." in USD per million tokens"""
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        model, _, rates = item.partition('=')
+        prompt_rate, _, response_rate = rates.partition('/')
+        prices[model.strip()] = (float(prompt_rate), float(response_rate or prompt_rate))
+    return prices
+
+
+def price_table() -> Dict[str, Tuple[float, float]]:
+    """DEFAULT_PRICES with the CV_MODEL_PRICES overrides applied"""
+    return {**DEFAULT_PRICES, **_parse_prices(os.getenv('CV_MODEL_PRICES', ''))}
+
+
+def cost_usd(prices: Dict[str, Tuple[float, float]], model: str, prompt_tokens: int, response_tokens: int) -> float:
+    """Estimated USD cost from a price table; 0 for unknown models"""
+    prompt_rate, response_rate = prices.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_rate + response_tokens * response_rate) / 1e6
+
+
+class TenantBudget:
+    """
+    Token budget per tenant over a sliding window. A limit of 0 means unlimited.
+
+    From the environment: CV_TENANT_TOKEN_BUDGET (default limit),
+    CV_TENANT_BUDGETS ("key-abc=500000,key-def=0" per-tenant overrides),
+    CV_TENANT_BUDGET_WINDOW_SECONDS (default 86400) and CV_TENANT_OVER_BUDGET
+    ("rules" to downgrade to the rule-based path, "reject" to answer 429).
+    """
+
+    def __init__(self, default_tokens: int = 0, window_seconds: float = 86400,
+                 overrides: Dict[str, int] = None, action: str = DOWNGRADE):
+        if action not in (DOWNGRADE, REJECT):
+            raise ValueError(f"Unknown over-budget action: {action}")
+        self.default_tokens = default_tokens
+        self.window_seconds = window_seconds
+        self.overrides = overrides or {}
+        self.action = action
+
+    @classmethod
+    def from_env(cls) -> 'TenantBudget':
+        overrides = {}
+        for item in filter(None, (part.strip() for part in os.getenv('CV_TENANT_BUDGETS', '').split(','))):
+            tenant, _, tokens = item.partition('=')
+            overrides[tenant.strip()] = int(tokens)
+        return cls(
+            default_tokens=int(os.getenv('CV_TENANT_TOKEN_BUDGET', '0')),
+            window_seconds=float(os.getenv('CV_TENANT_BUDGET_WINDOW_SECONDS', '86400')),
+            overrides=overrides,
+            action=os.getenv('CV_TENANT_OVER_BUDGET', DOWNGRADE),
+        )
+
+    def limit(self, tenant: str) -> int:
+        return self.overrides.get(tenant, self.default_tokens)
+
+
+class UsageLedger:
+    """
+    Ledger of every LLM call (tenant, model, tier, tokens, latency, outcome)
+    in a local SQLite file, shared by all worker processes on the host like
+    DiskCache. Budgets are checked against the tokens a tenant spent in the
+    budget window; rows older than CV_USAGE_RETENTION_DAYS (default 30) are
+    pruned as new ones arrive.
+    """
+
+    def __init__(self, cache_dir: str = None, budget: TenantBudget = None,
+                 prices: Dict[str, Tuple[float, float]] = None, retention_days: float = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.path = os.path.join(self.cache_dir, 'llm_usage.sqlite3')
+        self.budget = budget or TenantBudget.from_env()
+        self.prices = prices or price_table()
+        self.retention_days = retention_days or float(os.getenv('CV_USAGE_RETENTION_DAYS', '30'))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._records = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per process and per thread: never reuse one across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS calls ('
+                'ts REAL NOT NULL, tenant TEXT NOT NULL, model TEXT NOT NULL, tier TEXT NOT NULL, '
+                'prompt_tokens INTEGER NOT NULL, response_tokens INTEGER NOT NULL, '
+                'latency REAL NOT NULL, outcome TEXT NOT NULL, estimated INTEGER NOT NULL)'
+            )
+            # Covers the budget query, so checking a busy tenant stays at a few milliseconds
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS calls_tenant_ts ON calls (tenant, ts, prompt_tokens, response_tokens)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, tenant: str, model: str, tier: str, prompt_tokens: int, response_tokens: int,
+               latency: float, outcome: str, estimated: bool = False):
+        """Append one call"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (now, tenant, model, tier, prompt_tokens, response_tokens, latency, outcome, int(estimated))
+            )
+            with self._lock:
+                self._records += 1
+                prune = self._records % PRUNE_EVERY == 0
+            if prune:
+                conn.execute('DELETE FROM calls WHERE ts < ?', (now - self.retention_days * 86400,))
+        except sqlite3.Error as e:
+            print(f"Usage ledger write error: {e}")
+
+    def tokens_used(self, tenant: str, window_seconds: float = None) -> int:
+        """Prompt plus response tokens the tenant spent in the window (default: the budget window)"""
+        since = time.time() - (window_seconds or self.budget.window_seconds)
+        try:
+            row = self._connection().execute(
+                'SELECT COALESCE(SUM(prompt_tokens + response_tokens), 0) FROM calls WHERE tenant = ? AND ts >= ?',
+                (tenant, since)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Usage ledger read error: {e}")
+            return 0
+        return row[0]
+
+    def within_budget(self, tenant: str) -> bool:
+        """False once the tenant has spent its budget in the current window, across all workers"""
+        limit = self.budget.limit(tenant)
+        return not limit or self.tokens_used(tenant) < limit
+
+    def budget_status(self, tenant: str) -> dict:
+        used = self.tokens_used(tenant)
+        limit = self.budget.limit(tenant)
+        return {
+            'tokens_used': used,
+            'token_limit': limit or None,
+            'remaining': max(0, limit - used) if limit else None,
+            'window_seconds': self.budget.window_seconds,
+        }
+
+    def cost(self, model: str, prompt_tokens: int, response_tokens: int) -> float:
+        return cost_usd(self.prices, model, prompt_tokens, response_tokens)
+
+    def aggregates(self, window_seconds: float = None, tenant: str = None) -> dict:
+        """Calls, outcomes, tokens, cost and latency per tenant and model over the window"""
+        window_seconds = window_seconds or self.budget.window_seconds
+        query = ('SELECT tenant, model, outcome, COUNT(*), SUM(prompt_tokens), SUM(response_tokens), '
+                 'SUM(latency), SUM(estimated) FROM calls WHERE ts >= ?')
+        params = [time.time() - window_seconds]
+        if tenant is not None:
+            query += ' AND tenant = ?'
+            params.append(tenant)
+        try:
+            rows = self._connection().execute(query + ' GROUP BY tenant, model, outcome', params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Usage ledger read error: {e}")
+            rows = []
+
+        tenants = {}
+        for tenant_name, model, outcome, calls, prompt_tokens, response_tokens, latency, estimated in rows:
+            entry = tenants.setdefault(tenant_name, {
+                'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0, 'cost_usd': 0.0, 'models': {},
+            })
+            stats = entry['models'].setdefault(model, {
+                'calls': 0, 'outcomes': {}, 'prompt_tokens': 0, 'response_tokens': 0,
+                'estimated_calls': 0, 'cost_usd': 0.0, 'latency_seconds': 0.0,
+            })
+            cost = self.cost(model, prompt_tokens, response_tokens)
+            stats['outcomes'][outcome] = calls
+            for target in (entry, stats):
+                target['calls'] += calls
+                target['prompt_tokens'] += prompt_tokens
+                target['response_tokens'] += response_tokens
+                target['cost_usd'] += cost
+            stats['estimated_calls'] += estimated
+            stats['latency_seconds'] += latency
+
+        for tenant_name, entry in tenants.items():
+            for stats in entry['models'].values():
+                answered = stats['calls'] - stats['outcomes'].get(THROTTLED, 0)
+                stats['mean_latency_seconds'] = stats.pop('latency_seconds') / answered if answered else 0.0
+            limit = self.budget.limit(tenant_name)
+            if window_seconds == self.budget.window_seconds:
+                used = entry['prompt_tokens'] + entry['response_tokens']
+                entry['budget'] = {'token_limit': limit or None, 'remaining': max(0, limit - used) if limit else None}
+        return {'window_seconds': window_seconds, 'tenants': tenants}
@@ -0,0 +1,206 @@
+import argparse
+import os
+import signal
+import threading
+import time
+import traceback
+from typing import Dict, List, Tuple
+from broker import FAILED, Broker, LocalFileStore, broker_from_url, worker_identity
+from main import ResumeQueryBuilder
+from metrics import METRICS
+
+# Idle workers prune finished jobs past the broker's retention this often
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class Worker:
+    """
+    Stateless pipeline worker: claims jobs from the broker, reads the
+    document through the file store, runs ResumeQueryBuilder and posts the
+    result. While a job runs, a background thread heartbeats every
+    lease/3 seconds so the lease only runs out if the worker dies, or the
+    job runs past max_job_seconds (CV_WORKER_MAX_JOB_SECONDS, default 600)
+    and is taken to be hung; the job is then delivered to another worker.
+    Start one per core on as many machines as needed.
+
+    A job's file is deleted from the store once the job is done or has
+    failed for good and no other queued job references it; while idle,
+    workers prune finished jobs older than the broker's retention.
+    """
+
+    def __init__(self, broker: Broker, store: LocalFileStore, processor: ResumeQueryBuilder = None,
+                 worker_id: str = None, lease_seconds: float = None, poll_seconds: float = 1.0,
+                 max_job_seconds: float = None):
+        self.broker = broker
+        self.store = store
+        self.processor = processor or ResumeQueryBuilder(use_cache=os.getenv('CV_SHARED_CACHE', '1') == '1')
+        self.worker_id = worker_id or worker_identity()
+        self.lease_seconds = lease_seconds or float(os.getenv('CV_WORKER_LEASE_SECONDS', '120'))
+        self.poll_seconds = poll_seconds
+        self.max_job_seconds = max_job_seconds or float(os.getenv('CV_WORKER_MAX_JOB_SECONDS', '600'))
+        self.processed = 0
+        self.failed = 0
+        self._last_prune = 0.0
+        self._current = None
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Finish the current job, then exit run()"""
+        self._stopping.set()
+
+    def _beat(self):
+        self.broker.heartbeat(
+            self.worker_id, self._current, self.lease_seconds,
+            {'pid': os.getpid(), 'processed': self.processed, 'failed': self.failed, 'job': self._current},
+        )
+
+    def _heartbeat_loop(self, done: threading.Event):
+        deadline = time.monotonic() + self.max_job_seconds
+        while not done.wait(self.lease_seconds / 3):
+            if time.monotonic() >= deadline:
+                # Let the lease run out, so a hung job is delivered to another worker
+                print(f"Worker {self.worker_id}: job {self._current} exceeded {self.max_job_seconds:.0f}s, "
+                      f"no longer extending its lease")
+                METRICS.incr('worker_jobs_overrun')
+                return
+            try:
+                self._beat()
+            except Exception as e:
+                print(f"Worker {self.worker_id} heartbeat failed: {e}")
+
+    def run(self, max_jobs: int = None, exit_when_idle: bool = False) -> int:
+        """
+        Process jobs until stopped, or max_jobs, or with exit_when_idle until
+        no job is pending or leased. Returns the number of jobs handled.
+        """
+        handled = 0
+        while not self._stopping.is_set() and (max_jobs is None or handled < max_jobs):
+            self._beat()
+            job = self.broker.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                self._prune()
+                if exit_when_idle:
+                    stats = self.broker.stats()
+                    if not stats['pending'] and not stats['leased']:
+                        break
+                self._stopping.wait(self.poll_seconds)
+                continue
+            self.run_job(job)
+            handled += 1
+        return handled
+
+    def run_job(self, job):
+        """Run one claimed job, heartbeating its lease, and acknowledge or fail it"""
+        self._current = job.id
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(done,), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        finished = False
+        try:
+            with self.store.local_path(job.payload['file_ref']) as path:
+                result = self.processor.process_resume(path, job.payload['file_type'])
+            finished = self.broker.complete(job.id, self.worker_id, {
+                'filename': job.payload.get('filename'),
+                'parsed_data': result['parsed_data'].dict(),
+                'job_query': result['job_query'],
+                'extraction': result['extraction'],
+                'near_duplicate': result.get('near_duplicate'),
+                'worker_id': self.worker_id,
+            })
+            if not finished:
+                print(f"Worker {self.worker_id} lost the lease of job {job.id}; result discarded")
+            self.processed += 1
+            METRICS.incr('worker_jobs', outcome='done' if finished else 'lease_lost')
+        except Exception as e:
+            traceback.print_exc()
+            finished = self.broker.fail(job.id, self.worker_id, f"{type(e).__name__}: {e}") == FAILED
+            self.failed += 1
+            METRICS.incr('worker_jobs', outcome='failed')
+        finally:
+            done.set()
+            heartbeat.join()
+            self._current = None
+            METRICS.observe('worker_job_seconds', time.perf_counter() - start)
+        if finished:
+            self._delete_file(job.payload['file_ref'])
+
+    def _delete_file(self, file_ref: str):
+        # Identical uploads share one stored file, so keep it while another job needs it
+        try:
+            if not self.broker.file_in_use(file_ref):
+                self.store.delete(file_ref)
+        except Exception as e:
+            print(f"Worker {self.worker_id} could not delete {file_ref}: {e}")
+
+    def _prune(self):
+        """
+        Drop expired finished jobs, and files left behind by jobs whose worker
+        died, at most once per PRUNE_INTERVAL_SECONDS
+        """
+        if time.monotonic() - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = time.monotonic()
+        try:
+            self.broker.prune()
+            for file_ref in self.store.stale(self.broker.retention_days * 86400):
+                self._delete_file(file_ref)
+        except Exception as e:
+            print(f"Worker {self.worker_id} could not prune finished jobs: {e}")
+
+
+class Dispatcher:
+    """Submits documents to the broker by file reference and aggregates a batch's results"""
+
+    def __init__(self, broker: Broker, store: LocalFileStore):
+        self.broker = broker
+        self.store = store
+
+    def submit(self, files: List[Tuple[str, str]]) -> str:
+        """Queue (file_path, file_type) pairs as one batch; returns the batch id"""
+        return self.broker.submit([
+            {'file_ref': self.store.put_file(file_path), 'file_type': file_type,
+             'filename': os.path.basename(file_path)}
+            for file_path, file_type in files
+        ])
+
+    def submit_uploads(self, uploads: List[Tuple[str, bytes]]) -> str:
+        """Queue (filename, bytes) pairs as one batch; returns the batch id"""
+        payloads = []
+        for filename, data in uploads:
+            file_type = os.path.splitext(filename)[1].lower()[1:]
+            payloads.append({'file_ref': self.store.put(data, file_type), 'file_type': file_type,
+                             'filename': filename})
+        return self.broker.submit(payloads)
+
+    def wait(self, batch_id: str, timeout: float = None, poll_seconds: float = 0.5) -> Dict:
+        """Block until every job of the batch is done or failed (or timeout), then return the batch"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            batch = self.broker.batch(batch_id)
+            if batch['finished'] or (deadline is not None and time.monotonic() >= deadline):
+                return batch
+            time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull CV jobs from the broker and process them")
+    parser.add_argument('--broker', default=None, help="broker URL (default: CV_BROKER_URL or local SQLite)")
+    parser.add_argument('--store', default=None, help="file store directory (default: CV_FILE_STORE)")
+    parser.add_argument('--max-jobs', type=int, default=None)
+    parser.add_argument('--exit-when-idle', action='store_true')
+    args = parser.parse_args()
+
+    worker = Worker(broker_from_url(args.broker), LocalFileStore(args.store))
+    # SIGTERM (orchestrator scale-down) lets the current job finish and be acknowledged
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    print(f"Worker {worker.worker_id} started")
+    try:
+        handled = worker.run(args.max_jobs, args.exit_when_idle)
+    except KeyboardInterrupt:
+        handled = worker.processed + worker.failed
+    print(f"Worker {worker.worker_id} stopped after {handled} jobs")
+
+
+if __name__ == '__main__':
+    main()
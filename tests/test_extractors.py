@@ -0,0 +1,43 @@
+from extract_text import TextExtractor
+from extractors import detect_format
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_text_starting_like_bmp_stays_text(tmp_path):
+    path = _write(tmp_path, 'cv.txt', b'BMW Group Munich\nSenior Engineer\nSkills: Python, SQL\n')
+    assert detect_format(path, 'txt') == 'txt'
+
+    result = TextExtractor().extract(path, 'txt')
+    assert result.text.startswith('BMW Group Munich')
+    assert result.complete
+
+
+def test_text_starting_like_gif_stays_text(tmp_path):
+    path = _write(tmp_path, 'cv.txt', b'GIF89a animations and web banners\nDesigner\n')
+    assert detect_format(path, 'txt') == 'txt'
+
+
+def test_text_mentioning_html_stays_text(tmp_path):
+    path = _write(tmp_path, 'cv.txt', b'Jane Doe\nWeb developer: <html>, CSS and JavaScript\n')
+    assert detect_format(path, 'txt') == 'txt'
+
+
+def test_html_document_is_sniffed(tmp_path):
+    path = _write(tmp_path, 'cv.txt', b'\n  <!DOCTYPE html><html><body><p>Jane Doe</p></body></html>')
+    assert detect_format(path, 'txt') == 'html'
+
+
+def test_real_bmp_overrides_extension(tmp_path):
+    header = b'BM' + (70).to_bytes(4, 'little') + b'\x00' * 8 + (40).to_bytes(4, 'little')
+    path = _write(tmp_path, 'cv.pdf', header + b'\x00' * (70 - len(header)))
+    assert detect_format(path, 'pdf') == 'image'
+
+
+def test_gif_without_extension_is_an_image(tmp_path):
+    path = _write(tmp_path, 'upload', b'GIF89a\x01\x00\x01\x00\x00\x00\x00;')
+    assert detect_format(path, None) == 'image'
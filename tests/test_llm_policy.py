@@ -0,0 +1,45 @@
+from llm_parser import UniversalParser
+from llm_policy import FIELDS, SKIP, LLMPolicy
+from section_splitter import UniversalSectionSplitter
+
+CLEAN_CV = """Jane Doe
+Senior Software Engineer
+
+Summary
+Backend engineer with 8 years of experience building Python services.
+
+Experience
+Senior Software Engineer, Acme Corp (2018 - 2024)
+Software Engineer, Beta Ltd (2016 - 2018)
+
+Education
+Bachelor of Science in Computer Science, State University, 2016
+
+Skills
+Python
+SQL
+Docker
+Kubernetes
+PostgreSQL
+"""
+
+
+def _confidence(text):
+    sections = UniversalSectionSplitter().split_into_sections(text)
+    _, confidence = UniversalParser(api_key=None)._truly_universal_parse_with_confidence(text, sections)
+    return confidence
+
+
+def test_clean_cv_skips_the_llm_in_fields_mode():
+    assert LLMPolicy(FIELDS).decide(_confidence(CLEAN_CV)) == (SKIP, [])
+
+
+def test_empty_optional_lists_and_missing_summary_are_not_low():
+    confidence = _confidence(CLEAN_CV.replace("Summary\n", ""))
+    for field in ('certifications', 'languages', 'key_achievements', 'summary'):
+        assert confidence[field] >= LLMPolicy().threshold
+
+
+def test_unread_section_is_requested():
+    confidence = _confidence(CLEAN_CV + "\nLanguages\nFluent Klingon\n")
+    assert LLMPolicy(FIELDS).decide(confidence) == (FIELDS, ['languages'])
@@ -0,0 +1,61 @@
+from main import ResumeQueryBuilder
+
+TEMPLATE = """{name}
+{title}
+
+Summary
+Engineer with a track record of delivering reliable backend systems, mentoring engineers
+and working closely with product teams on planning, estimation and delivery.
+
+Experience
+{title}, Acme Corp (2018 - 2024)
+Designed and operated services handling millions of requests per day, led migrations to
+managed databases, introduced automated testing and continuous delivery pipelines, and
+reduced infrastructure cost through capacity planning and careful performance work.
+Software Engineer, Beta Ltd (2016 - 2018)
+Built internal tools and reporting pipelines, maintained legacy services and on-call rotas,
+automated release processes, wrote runbooks and documentation, and trained new hires on the
+deployment tooling, monitoring dashboards and incident response procedures of the team.
+
+Education
+Bachelor of Science in Computer Science, State University, 2016
+
+Skills
+Python
+SQL
+Docker
+Kubernetes
+PostgreSQL
+"""
+
+
+def _process(builder, tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return builder.process_resume(str(path), 'txt')
+
+
+def test_near_duplicate_reuse_rederives_personal_fields(tmp_path):
+    builder = ResumeQueryBuilder(use_cache=True, cache_dir=str(tmp_path / 'cache'))
+    _process(builder, tmp_path, 'alice.txt', TEMPLATE.format(name='Alice Smith', title='Platform Engineer'))
+    result = _process(builder, tmp_path, 'bob.txt', TEMPLATE.format(name='Bob Jones', title='Data Engineer'))
+
+    assert result['near_duplicate'] is not None
+    parsed = result['parsed_data'].dict()
+    assert 'Alice' not in repr(parsed) and 'Platform Engineer' not in repr(parsed)
+    assert 'Platform Engineer' not in result['job_query']
+    assert 'Data Engineer' in repr(parsed['job_titles'])
+
+
+def test_near_duplicate_index_is_per_tenant(tmp_path, monkeypatch):
+    monkeypatch.setenv('CV_LLM_STUB', '1')
+    monkeypatch.setenv('CV_LLM_STUB_LATENCY', '0')
+    cache_dir = str(tmp_path / 'cache')
+    first = ResumeQueryBuilder('key-one', use_cache=True, cache_dir=cache_dir)
+    second = ResumeQueryBuilder('key-two', use_cache=True, cache_dir=cache_dir)
+    _process(first, tmp_path, 'alice.txt', TEMPLATE.format(name='Alice Smith', title='Platform Engineer'))
+    bob = TEMPLATE.format(name='Bob Jones', title='Data Engineer')
+    carol = TEMPLATE.format(name='Carol White', title='Data Engineer')
+
+    assert _process(second, tmp_path, 'bob.txt', bob)['near_duplicate'] is None
+    assert _process(first, tmp_path, 'carol.txt', carol)['near_duplicate'] is not None